@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+
+""" Archive of recorded games in segment files with an offset index """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+import mmap
+import os
+import struct
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class GameArchive:
+    # Directory layout: the records of the games (usually event logs, see
+    # eventlog) are appended to segment files "segment-<n>.dat" of at most
+    # segment_size bytes. The file "index.dat" has a header followed by one
+    # fixed-width entry per game, the game id is the position of the entry:
+    # segment, offset and length of the record in the segment, seed,
+    # winner (-1 if there is none) and number of turns. A game is fetched
+    # with one entry of the index and a slice of the memory mapped segment,
+    # opening the archive does not read the index.
+    #
+    # Appends are serialized over all processes by a lock on the file
+    # "lock". The record is written to the segment before its entry is
+    # appended to the index, so readers never see an entry without its
+    # record. Every process must open its own GameArchive.
+    magic           = b"DSGA"
+    version         = 1
+    header          = struct.Struct("<4sHH")
+    entry           = struct.Struct("<HIIQbH11x")
+
+    def __init__(self, directory, segment_size=1 << 30):
+        if segment_size >= 1 << 32:
+            raise ValueError("Segmente können höchstens 4 GiB gross sein")
+        self.directory = directory
+        self.segment_size = segment_size
+        os.makedirs(directory, exist_ok=True)
+        self.lock_file = open(os.path.join(directory, "lock"), "a+b")
+
+        index_path = os.path.join(directory, "index.dat")
+        self.acquire()
+        try:
+            self.index_file = open(index_path, "a+b")
+            if os.fstat(self.index_file.fileno()).st_size == 0:
+                self.index_file.write(self.header.pack(self.magic, self.version,
+                                                       self.entry.size))
+                self.index_file.flush()
+        finally:
+            self.release()
+        self.index_file.seek(0)
+        magic, version, entry_size = self.header.unpack(self.index_file.read(self.header.size))
+        if magic != self.magic or version != self.version or entry_size != self.entry.size:
+            raise ValueError(directory + " is not a Drecksau game archive")
+
+        self.index_map = None
+        self.segment_maps = dict()
+        self.segment_files = dict()
+
+    def acquire(self):
+        """
+        Waits for the lock of the archive.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if fcntl is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.lock_file.seek(0)
+            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def release(self):
+        """
+        Releases the lock of the archive.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if fcntl is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.lock_file.seek(0)
+            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def get_segment_path(self, n_segment):
+        """
+        Returns the path of a segment file.
+
+        Parameters
+        ----------
+        n_segment : int
+            Number of the segment.
+
+        Returns
+        -------
+        path : string
+            The path.
+
+        """
+        return os.path.join(self.directory, "segment-%05d.dat" % n_segment)
+
+    def __len__(self):
+        size = os.fstat(self.index_file.fileno()).st_size
+        return (size - self.header.size) // self.entry.size
+
+    def add_games(self, games):
+        """
+        Appends games to the archive.
+
+        Parameters
+        ----------
+        games : list
+            (record : bytes, seed : int, winner : int, turns : int) tuples,
+            winner is None if the game has no winner.
+
+        Returns
+        -------
+        game_id : int
+            Id of the first game, the others follow in order.
+
+        """
+        self.acquire()
+        try:
+            index_fd = self.index_file.fileno()
+            size = os.fstat(index_fd).st_size
+            n_games = (size - self.header.size) // self.entry.size
+            # an entry of an interrupted append is removed
+            if size != self.header.size + n_games * self.entry.size:
+                os.ftruncate(index_fd, self.header.size + n_games * self.entry.size)
+            # records of an interrupted append stay in the segment, the
+            # offsets start behind them
+            n_segment = self.get_entry(n_games - 1, refresh=True)[0] if n_games else 0
+            offset = self.get_segment_size(n_segment)
+
+            entries = bytearray()
+            records = list()
+            for record, seed, winner, turns in games:
+                if offset + len(record) > self.segment_size and offset:
+                    self.write_segment(n_segment, records)
+                    records = list()
+                    n_segment += 1
+                    offset = self.get_segment_size(n_segment)
+                entries += self.entry.pack(n_segment, offset, len(record), seed,
+                                           -1 if winner is None else winner, turns)
+                records.append(record)
+                offset += len(record)
+            self.write_segment(n_segment, records)
+            os.lseek(index_fd, 0, os.SEEK_END)
+            os.write(index_fd, entries)
+        finally:
+            self.release()
+        return n_games
+
+    def add_game(self, record, seed=0, winner=None, turns=0):
+        """
+        Appends one game to the archive.
+
+        Parameters
+        ----------
+        record : bytes
+            The record of the game.
+        seed : int
+            Seed of the game.
+        winner : int
+            Index of the winner, None if the game has no winner.
+        turns : int
+            Number of turns.
+
+        Returns
+        -------
+        game_id : int
+            Id of the game.
+
+        """
+        return self.add_games([(record, seed, winner, turns)])
+
+    def get_segment_size(self, n_segment):
+        """
+        Returns the size of a segment file.
+
+        Parameters
+        ----------
+        n_segment : int
+            Number of the segment.
+
+        Returns
+        -------
+        size : int
+            Size in bytes, 0 if the segment does not exist yet.
+
+        """
+        path = self.get_segment_path(n_segment)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def write_segment(self, n_segment, records):
+        """
+        Appends records to a segment file.
+
+        Parameters
+        ----------
+        n_segment : int
+            Number of the segment.
+        records : list
+            The records.
+
+        Returns
+        -------
+        None.
+
+        """
+        with open(self.get_segment_path(n_segment), "ab") as file:
+            file.write(b"".join(records))
+
+    def get_entry(self, game_id, refresh=False):
+        """
+        Returns the index entry of a game.
+
+        Parameters
+        ----------
+        game_id : int
+            Id of the game.
+        refresh : bool
+            Maps the index again even if the entry is already mapped.
+
+        Returns
+        -------
+        (segment, offset, length, seed, winner, turns) : tuple
+            The entry, winner is -1 if the game has no winner.
+
+        """
+        position = self.header.size + game_id * self.entry.size
+        if game_id < 0:
+            raise IndexError("Spiel %d existiert nicht" % game_id)
+        if refresh or self.index_map is None or position + self.entry.size > len(self.index_map):
+            # the index has grown since it was mapped
+            if self.index_map is not None:
+                self.index_map.close()
+            self.index_map = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if position + self.entry.size > len(self.index_map):
+                raise IndexError("Spiel %d existiert nicht" % game_id)
+        return self.entry.unpack_from(self.index_map, position)
+
+    def get_game(self, game_id):
+        """
+        Returns the record of a game.
+
+        Parameters
+        ----------
+        game_id : int
+            Id of the game.
+
+        Returns
+        -------
+        record : bytes
+            The record.
+
+        """
+        n_segment, offset, length = self.get_entry(game_id)[:3]
+        segment_map = self.segment_maps.get(n_segment)
+        if segment_map is None or offset + length > len(segment_map):
+            if segment_map is not None:
+                segment_map.close()
+            else:
+                self.segment_files[n_segment] = open(self.get_segment_path(n_segment), "rb")
+            segment_map = mmap.mmap(self.segment_files[n_segment].fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+            self.segment_maps[n_segment] = segment_map
+        return segment_map[offset:offset + length]
+
+    def get_info(self, game_id):
+        """
+        Returns the seed, the winner and the number of turns of a game.
+
+        Parameters
+        ----------
+        game_id : int
+            Id of the game.
+
+        Returns
+        -------
+        info : dict
+            The information of the index.
+
+        """
+        n_segment, offset, length, seed, winner, turns = self.get_entry(game_id)
+        return {"seed": seed, "winner": None if winner < 0 else winner, "turns": turns,
+                "length": length}
+
+    def close(self):
+        """
+        Closes the memory maps and the files.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.index_map is not None:
+            self.index_map.close()
+        for segment_map in self.segment_maps.values():
+            segment_map.close()
+        for file in self.segment_files.values():
+            file.close()
+        self.index_file.close()
+        self.lock_file.close()
+
+
+def record_games(directory, first_seed, n_games, batch_size=100, segment_size=1 << 30):
+    """
+    Plays bot games and appends their event logs to an archive. Used by the
+    worker processes of the demo.
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the archive.
+    first_seed : int
+        Seed of the first game, the games have consecutive seeds.
+    n_games : int
+        Number of games.
+    batch_size : int
+        Number of games per append.
+    segment_size : int
+        Maximum size of a segment file.
+
+    Returns
+    -------
+    None.
+
+    """
+    from eventlog import EventLog
+    from game import Game
+    from greedybot import GreedyBot
+    from player import Player
+    import random
+
+    archive = GameArchive(directory, segment_size)
+    batch = list()
+    for seed in range(first_seed, first_seed + n_games):
+        random.seed(seed)
+        log = EventLog()
+        game = Game()
+        game.output = lambda text: None
+        game.players = [Player("Anja"), Player("Lars")]
+        game.add_listener(log)
+        winner = game.run_bot_game([GreedyBot(), GreedyBot()])
+        batch.append((log.get_data(), seed, winner, game.round_counter))
+        if len(batch) == batch_size:
+            archive.add_games(batch)
+            batch = list()
+    if batch:
+        archive.add_games(batch)
+    archive.close()
+
+
+if __name__ == "__main__":
+    from eventlog import read_events
+    import multiprocessing
+    import random
+    import shutil
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    n_workers = 4
+    n_games = 500
+
+    print("\nTest: appends of %d processes" % n_workers)
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=record_games,
+                                 args=(directory, i * n_games, n_games, 25, 1 << 16))
+                 for i in range(n_workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    start = time.perf_counter()
+    archive = GameArchive(directory)
+    print("Open: %.1f µs" % ((time.perf_counter() - start) * 1e6))
+    print("(Expected value: %d). Value:" % (n_workers * n_games), len(archive))
+    seeds = set()
+    errors = 0
+    for game_id in range(len(archive)):
+        info = archive.get_info(game_id)
+        seeds.add(info["seed"])
+        events = list(read_events(archive.get_game(game_id)))
+        turns = sum(event[0] in ("play", "change", "change_all") for event in events)
+        errors += (events[0][0] != "setup" or events[-1] != ("winner", info["winner"])
+                   or turns != info["turns"])
+    print("(Expected value: %d). Value:" % (n_workers * n_games), len(seeds))
+    print("(Expected value: 0). Value:", errors)
+    print("Segments:", len([name for name in os.listdir(directory) if name.startswith("segment")]))
+
+    print("\nBenchmark: random reads")
+    ids = [random.randrange(len(archive)) for i in range(100000)]
+    start = time.perf_counter()
+    for game_id in ids:
+        archive.get_game(game_id)
+    print("%.2f µs per game" % ((time.perf_counter() - start) / len(ids) * 1e6))
+    archive.close()
+
+    print("\nTest: a new segment with records of an interrupted append")
+    archive = GameArchive(os.path.join(directory, "rollover"), segment_size=8)
+    archive.add_games([(b"first", 1, None, 0)])
+    with open(archive.get_segment_path(1), "wb") as file:
+        file.write(b"interrupted")
+    archive.add_games([(b"second", 2, None, 0), (b"third", 3, None, 0)])
+    print("(Expected value: [b'first', b'second', b'third']). Value:",
+          [bytes(archive.get_game(game_id)) for game_id in range(len(archive))])
+    archive.close()
+    shutil.rmtree(directory)
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+""" Batched decisions of the bots of all server games """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from greedybot import GreedyBot
+from tablestate import TableState
+
+from collections import deque
+import asyncio
+import time
+
+
+class BotScheduler:
+
+    def __init__(self, bot=None, max_delay=0.002, max_batch=256, max_latencies=10000):
+        # The bots of all games of the event loop ask the scheduler for their
+        # decisions. The requests are collected for at most max_delay seconds
+        # or until max_batch requests are waiting and then decided together:
+        # every different (table, card) pair of the batch is scored only once
+        # and all games are woken up by one callback. A larger max_delay gives
+        # larger batches and more throughput, but the bots answer later.
+        # The latencies of the last max_latencies decisions are kept for the
+        # statistics, so a long running server does not collect them all.
+        self.bot = bot or GreedyBot()
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.pending = list()
+        self.timer = None
+
+        self.batches = 0
+        self.decisions = 0
+        self.cards_scored = 0
+        self.max_batch_size = 0
+        self.latencies = deque(maxlen=max_latencies)
+
+    def decide(self, table, hand):
+        """
+        Adds a decision to the next batch.
+
+        Parameters
+        ----------
+        table : TableState
+            The tables, the active player is the bot.
+        hand : list
+            The key words of the hand cards of the bot.
+
+        Returns
+        -------
+        future : asyncio.Future
+            Gets the chosen option (see TableState.get_options).
+
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((table, hand, future, time.perf_counter()))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        """
+        Decides all waiting requests.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch = self.pending
+        self.pending = list()
+        if not batch:
+            return
+        options = self.evaluate([(table, hand) for table, hand, future, start in batch])
+        now = time.perf_counter()
+        for (table, hand, future, start), option in zip(batch, options):
+            self.latencies.append(now - start)
+            if not future.done():
+                future.set_result(option)
+        self.batches += 1
+        self.decisions += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+    def evaluate(self, requests):
+        """
+        Chooses the options of a batch of decisions. Every different card on
+        every different table is scored once.
+
+        Parameters
+        ----------
+        requests : list
+            (table : TableState, hand : list) tuples.
+
+        Returns
+        -------
+        options : list
+            The chosen option of every request.
+
+        """
+        bot = self.bot
+        scores = dict()
+        options = list()
+        for table, hand in requests:
+            hand_scores = dict()
+            for card_type in dict.fromkeys(hand):
+                key = (table, card_type)
+                score = scores.get(key)
+                if score is None:
+                    score = scores[key] = bot.score_card(table, card_type)
+                hand_scores[card_type] = score
+            options.append(bot.select_option(hand_scores))
+        self.cards_scored += len(scores)
+        return options
+
+    def get_statistics(self):
+        """
+        Returns the batch sizes and the time the bots waited for their
+        decisions, the latencies are those of the last max_latencies
+        decisions.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        statistics : dict
+            The statistics.
+
+        """
+        latencies = sorted(self.latencies) or [0.0]
+        return {
+            "batches"           : self.batches,
+            "decisions"         : self.decisions,
+            "mean_batch_size"   : self.decisions / self.batches if self.batches else 0.0,
+            "max_batch_size"    : self.max_batch_size,
+            "cards_scored"      : self.cards_scored,
+            "latency_p50"       : latencies[len(latencies) // 2],
+            "latency_p99"       : latencies[int(len(latencies) * 0.99)],
+        }
+
+
+class BotSeat:
+    # Answers the questions of Game.run_game_async for a bot player. The
+    # option is decided by the scheduler at the first question of a turn,
+    # the following questions are answered from it. With a Speculator the
+    # options of the next turn are prepared while the player before the bot
+    # is thinking (see prepare), a prepared option is used without waiting
+    # for the scheduler.
+    __slots__ = ("scheduler", "speculator", "option", "prepared", "prepare_time")
+
+    def __init__(self, scheduler, speculator=None):
+        self.scheduler = scheduler
+        self.speculator = speculator
+        self.option = None
+        # maps (TableState, hand) to the prepared option
+        self.prepared = dict()
+        self.prepare_time = 0.0
+
+    @staticmethod
+    def get_card_number(player, card_type):
+        """
+        Returns the number of the first hand card of a type.
+
+        Parameters
+        ----------
+        player : Player
+            The bot player.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        n_card : int
+            The number of the card (1-3).
+
+        """
+        for n_card, card in enumerate(player.get_cards_hand(), 1):
+            if card.get_card_type() == card_type:
+                return n_card
+
+    def prepare(self, game):
+        """
+        Decides the next turn of the bot for the most likely outcomes of the
+        turn of the active player (see Speculator.get_next_tables). The
+        outcomes are scored in one batch like the batches of the scheduler.
+        The hand of the bot does not change before its turn, so a prepared
+        option is the option the scheduler would choose.
+
+        Parameters
+        ----------
+        game : Game
+            The running game, the player before the bot is thinking.
+
+        Returns
+        -------
+        None.
+
+        """
+        start = time.perf_counter()
+        n_player, tables = self.speculator.get_next_tables(game)
+        hand = tuple(card.get_card_type() for card in game.players[n_player].get_cards_hand())
+        options = self.scheduler.evaluate([(table, hand) for table in tables])
+        self.prepared = {(table, hand): option for table, option in zip(tables, options)}
+        self.prepare_time = (time.perf_counter() - start) / max(len(tables), 1)
+
+    async def answer(self, game, prompt_key):
+        """
+        Answers a question of the game.
+
+        Parameters
+        ----------
+        game : Game
+            The running game, the bot is the active player.
+        prompt_key : string
+            The key of the question in Game.prompts.
+
+        Returns
+        -------
+        answer : string
+            The answer.
+
+        """
+        player = game.active_player
+        if prompt_key in ("play_or_change", "change_one_or_all"):
+            hand = tuple(card.get_card_type() for card in player.get_cards_hand())
+            table = TableState.from_game(game)
+            self.option = self.prepared.get((table, hand))
+            self.prepared = dict()
+            if self.speculator is not None:
+                self.speculator.record_lookup(self.option is not None, self.prepare_time)
+            if self.option is None:
+                self.option = await self.scheduler.decide(table, list(hand))
+        option = self.option
+        if prompt_key == "play_or_change":
+            return "1" if option[0] == "PLAY" else "2"
+        if prompt_key == "change_one_or_all":
+            return "1" if option[0] == "CHANGE" else "2"
+        if prompt_key in ("play_card", "change_card"):
+            return str(self.get_card_number(player, option[1]))
+        # move: the first pig of the chosen player and bucket
+        n_player, flags = option[2]
+        card = player.get_card_hand(self.get_card_number(player, option[1]))
+        for n_move, (owner, pig) in enumerate(game.get_possible_moves_for_card(card), 1):
+            if game.players.index(owner) == n_player and TableState.pig_to_flags(pig) == flags:
+                return str(n_move)
+        return "1"
+
+
+if __name__ == "__main__":
+    from compactgame import CompactGame
+    import random
+
+    rng = random.Random(5)
+    positions = list()
+    while len(positions) < 2000:
+        game = CompactGame.new_game(2, 5, rng)
+        for i in range(int(rng.random() * 30)):
+            if game.winner is not None:
+                break
+            game.play_random_option(GreedyBot().choose_option(game), rng)
+        if game.winner is None:
+            positions.append((game.table, game.hands[game.table.active]))
+
+    async def run(scheduler):
+        futures = [scheduler.decide(table, hand) for table, hand in positions]
+        return await asyncio.gather(*futures)
+
+    print("\nTest: batched decisions are the decisions of the bot")
+    scheduler = BotScheduler(max_batch=500)
+    options = asyncio.run(run(scheduler))
+    bot = GreedyBot()
+    print("(Expected value: True). Value:",
+          options == [bot.choose(table, hand) for table, hand in positions])
+    print("(Expected value: 4). Value:", scheduler.get_statistics()["batches"])
+    print("Cards scored: %d for %d decisions" % (scheduler.cards_scored, scheduler.decisions))
+
+    print("\nTest: only the latest latencies are kept")
+    scheduler = BotScheduler(max_batch=500, max_latencies=1000)
+    asyncio.run(run(scheduler))
+    print("(Expected value: 2000 1000). Value:", scheduler.decisions, len(scheduler.latencies))
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+""" Card counter """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from gameconfig import GameConfig
+
+
+class CardCounter:
+    card_types = list(Card.action_card_types) + list(Card.upgrade_card_types)
+    card_index = {card_type: i for i, card_type in enumerate(card_types)}
+
+    def __init__(self, n_player, card_counts=None):
+        # Follows the game from the view of the player with index n_player and
+        # is registered with Game.add_listener before the cards are dealt.
+        # Until the first reshuffle the draw deck and the hands of the
+        # opponents are drawn from the same shuffled deck, so only their sum
+        # (unseen_counts) matters. After a reshuffle the draw deck is known
+        # exactly (draw_counts) and the cards dealt to the opponents are
+        # moved out of it by their expected composition (hidden_counts).
+        if card_counts is None:
+            card_counts = GameConfig().card_counts
+        n_types = len(self.card_types)
+        self.n_player = n_player
+        self.pooled = True
+        self.unseen_counts = [card_counts[card_type] for card_type in self.card_types]
+        self.unseen_total = sum(self.unseen_counts)
+        self.draw_counts = [0.0] * n_types
+        self.draw_total = 0.0
+        self.hidden_counts = [0.0] * n_types
+        self.discard_counts = [0] * n_types
+        self.discard_total = 0
+        self.draw_size = self.unseen_total
+
+        self.handlers = {
+            "deal": self.deal, "discard": self.discard, "play": self.play,
+            "destroyed": self.destroyed, "reshuffle": self.reshuffle}
+
+    def __call__(self, event, *args):
+        # the other events do not change the cards that can be drawn
+        handler = self.handlers.get(event)
+        if handler is not None:
+            handler(*args)
+
+    def remove_unseen(self, i):
+        """
+        Removes a card that an opponent had in his hand from the unseen
+        cards.
+
+        Parameters
+        ----------
+        i : int
+            Index of the card type.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.pooled:
+            self.unseen_counts[i] -= 1
+            self.unseen_total -= 1
+            return
+        # the card was in the hand of the opponent. If the expected number of
+        # these cards in the hands is too small, the rest must have been
+        # dealt from the draw deck.
+        hidden = self.hidden_counts[i]
+        if hidden >= 1.0:
+            self.hidden_counts[i] = hidden - 1.0
+        else:
+            self.hidden_counts[i] = 0.0
+            removed = min(1.0 - hidden, self.draw_counts[i])
+            self.draw_counts[i] -= removed
+            self.draw_total -= removed
+
+    def deal(self, n_player, card_type):
+        """
+        A card is dealt. Only the own cards are known.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player who gets the card.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.draw_size -= 1
+        if n_player == self.n_player:
+            i = self.card_index[card_type]
+            if self.pooled:
+                self.unseen_counts[i] -= 1
+                self.unseen_total -= 1
+            else:
+                removed = min(1.0, self.draw_counts[i])
+                self.draw_counts[i] -= removed
+                self.draw_total -= removed
+        elif not self.pooled and self.draw_total > 0:
+            # the unknown card has the composition of the draw deck, this
+            # does not change the draw probabilities
+            share = min(1.0, self.draw_total) / self.draw_total
+            for i, count in enumerate(self.draw_counts):
+                if count:
+                    self.hidden_counts[i] += count * share
+                    self.draw_counts[i] = count - count * share
+            self.draw_total -= min(1.0, self.draw_total)
+
+    def discard(self, n_player, card_type):
+        """
+        A hand card is discarded, it is visible for all players.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player who discards the card.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        i = self.card_index[card_type]
+        self.discard_counts[i] += 1
+        self.discard_total += 1
+        if n_player != self.n_player:
+            self.remove_unseen(i)
+
+    def play(self, n_player, card_type, target=None):
+        """
+        A card is played. Played action cards are discarded afterwards (see
+        discard), played upgrades stay on the table.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player who plays the card.
+        card_type : string
+            Key word of the card.
+        target : tuple
+            The target pig, not needed.
+
+        Returns
+        -------
+        None.
+
+        """
+        if n_player != self.n_player and card_type in Card.upgrade_card_types:
+            self.remove_unseen(self.card_index[card_type])
+
+    def destroyed(self, card_type):
+        """
+        A destroyed upgrade goes from the table to the discard pile.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.discard_counts[self.card_index[card_type]] += 1
+        self.discard_total += 1
+
+    def reshuffle(self):
+        """
+        The discard pile becomes the new draw deck. The unseen cards that are
+        left are all in the hands of the opponents.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.pooled:
+            self.hidden_counts = [float(count) for count in self.unseen_counts]
+            self.pooled = False
+        else:
+            self.hidden_counts = [hidden + count for hidden, count
+                                  in zip(self.hidden_counts, self.draw_counts)]
+        self.draw_counts = [float(count) for count in self.discard_counts]
+        self.draw_total = float(self.discard_total)
+        self.draw_size = self.discard_total
+        self.discard_counts = [0] * len(self.card_types)
+        self.discard_total = 0
+
+    def get_draw_probability(self, card_type):
+        """
+        Probability that the next card from the draw deck has a card type.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        probability : float
+            The probability, 0.0 if there are no cards at all.
+
+        """
+        i = self.card_index[card_type]
+        if self.draw_size <= 0:
+            # the next card comes from the reshuffled discard pile
+            if not self.discard_total:
+                return 0.0
+            return self.discard_counts[i] / self.discard_total
+        if self.pooled:
+            return self.unseen_counts[i] / self.unseen_total if self.unseen_total else 0.0
+        return self.draw_counts[i] / self.draw_total if self.draw_total > 0 else 0.0
+
+    def get_draw_probabilities(self):
+        """
+        Probabilities of all card types for the next card from the draw deck.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        probabilities : dict
+            Maps the key words of the card types to the probabilities.
+
+        """
+        return {card_type: self.get_draw_probability(card_type)
+                for card_type in self.card_types}
+
+    def get_expected_draws_until(self, card_type="MUD"):
+        """
+        Expected number of cards that are drawn until a card of a card type
+        comes up, counting the card itself. In a random order of n cards
+        with m cards of the type, the first one is expected at position
+        (n + 1) / (m + 1), m is the expected number of cards of the type in
+        the draw deck. If the draw deck has none, it comes from the
+        reshuffled discard pile.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        draws : float
+            The expected number of draws, inf if there is no such card in the
+            draw deck and the discard pile.
+
+        """
+        n_cards = max(self.draw_size, 0)
+        if n_cards:
+            n_type = self.get_draw_probability(card_type) * n_cards
+            if n_type > 0.0:
+                return (n_cards + 1) / (n_type + 1)
+        n_discarded = self.discard_counts[self.card_index[card_type]]
+        if not n_discarded:
+            return float("inf")
+        return n_cards + (self.discard_total + 1) / (n_discarded + 1)
+
+
+if __name__ == "__main__":
+    from game import Game
+    from player import Player
+    from pigcard import PigCard
+    from greedybot import GreedyBot
+    import random
+    import time
+
+    # a game without input: both players use the greedy bot
+    random.seed(4)
+    game = Game()
+    counter = CardCounter(0)
+    game.add_listener(counter)
+    for name in ("Anja", "Salah"):
+        game.players.append(Player(name))
+    for player in game.players:
+        for n in range(5):
+            player.add_card_to_table(PigCard(n + 1))
+    game.init_cards_hand()
+
+    print("\nTest: probabilities after dealing")
+    hand = [card.get_card_type() for card in game.players[0].get_cards_hand()]
+    n_mud = 21 - hand.count("MUD")
+    print("(Expected value: %.4f). Value: %.4f"
+          % (n_mud / (55 - 3), counter.get_draw_probability("MUD")))
+
+    bot = GreedyBot()
+    reshuffles = 0
+    counter_time = 0.0
+    queries = 0
+    for turn in range(400):
+        game.active_player = game.players[turn % 2]
+        reshuffles += not game.deck.deck_has_cards()
+        option = bot.choose_for_game(game)
+        hand = game.active_player.get_cards_hand()
+        if option[0] == "CHANGE_ALL":
+            game.change_all_cards()
+            continue
+        card = next(card for card in hand if card.get_card_type() == option[1])
+        if option[0] == "PLAY":
+            # the tables are not changed, only the cards are followed
+            game.notify("play", turn % 2, option[1])
+        game.replace_hand_card(card)
+        if option[0] == "CHANGE" or option[1] not in Card.upgrade_card_types:
+            game.discard_card(card)
+        start = time.perf_counter()
+        for card_type in ("STORM", "LIGHTNING", "RAIN"):
+            counter.get_draw_probability(card_type)
+        counter.get_expected_draws_until("MUD")
+        counter_time += time.perf_counter() - start
+        queries += 4
+
+    print("\nTest: draw deck size after", reshuffles, "reshuffles")
+    print("(Expected value: %d). Value: %d" % (len(game.deck.draw_deck), counter.draw_size))
+    print("Probability STORM/LIGHTNING/RAIN: %.3f %.3f %.3f"
+          % tuple(counter.get_draw_probability(card_type)
+                  for card_type in ("STORM", "LIGHTNING", "RAIN")))
+    counts = game.deck.draw_deck
+    print("True share of MUD in draw deck: %.3f, counted: %.3f"
+          % (sum(card.get_card_type() == "MUD" for card in counts) / max(len(counts), 1),
+             counter.get_draw_probability("MUD")))
+    print("Expected draws until MUD: %.2f" % counter.get_expected_draws_until("MUD"))
+    print("%.2f µs per query" % (counter_time / queries * 1e6))
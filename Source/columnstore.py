@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+""" Columnar NumPy files of game results for analyses """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from statesync import card_types
+
+import json
+import numpy as np
+import os
+import shutil
+
+
+# The columns and their types. plays_<card> is the number of plays per card
+# type (see statesync.card_types), winner is -1 if the game has no winner.
+COLUMNS = {
+    "seed"              : "<u8",
+    "n_players"         : "u1",
+    "n_pigs"            : "u1",
+    "winner"            : "i1",
+    "turns"             : "<u2",
+    "reshuffles"        : "<u2",
+    "blocked_turns"     : "<u2",
+}
+COLUMNS.update({"plays_" + card_type: "<u2" for card_type in card_types})
+
+
+class ColumnWriter:
+
+    def __init__(self, directory, chunk_size=1 << 20):
+        # Collects game results in one NumPy array per column and writes
+        # every chunk_size games a chunk: a directory "chunk-<n>" with one
+        # .npy file per column. The file "manifest.json" lists the columns
+        # and the chunks with their number of games, it is replaced after
+        # the chunk is complete, so readers only see complete chunks. There
+        # is one writer per directory.
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as file:
+                self.manifest = json.load(file)
+            if self.manifest["columns"] != COLUMNS:
+                raise ValueError(directory + " has other columns")
+        else:
+            self.manifest = {"columns": COLUMNS, "chunks": []}
+        self.buffer = {name: np.zeros(chunk_size, dtype) for name, dtype in COLUMNS.items()}
+        self.n_rows = 0
+
+    def add(self, seed, n_pigs, result):
+        """
+        Adds the result of a game.
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the game.
+        n_pigs : int
+            Number of pigs per player (see Game.number_of_pigs).
+        result : GameResult
+            The result (see gamestats).
+
+        Returns
+        -------
+        None.
+
+        """
+        buffer = self.buffer
+        row = self.n_rows
+        buffer["seed"][row] = seed
+        buffer["n_players"][row] = result.n_players
+        buffer["n_pigs"][row] = n_pigs
+        buffer["winner"][row] = -1 if result.winner is None else result.winner
+        buffer["turns"][row] = result.turns
+        buffer["reshuffles"][row] = result.reshuffles
+        buffer["blocked_turns"][row] = result.blocked_turns
+        for card_type in card_types:
+            buffer["plays_" + card_type][row] = result.plays.get(card_type, 0)
+        self.n_rows += 1
+        if self.n_rows == self.chunk_size:
+            self.flush()
+
+    def add_batch(self, columns):
+        """
+        Adds the results of many games at once, e.g. from a vectorized
+        simulation.
+
+        Parameters
+        ----------
+        columns : dict
+            One array per column of COLUMNS, all of the same length.
+
+        Returns
+        -------
+        None.
+
+        """
+        n_rows = len(columns["seed"])
+        done = 0
+        while done < n_rows:
+            size = min(n_rows - done, self.chunk_size - self.n_rows)
+            for name in COLUMNS:
+                self.buffer[name][self.n_rows:self.n_rows + size] = \
+                    columns[name][done:done + size]
+            self.n_rows += size
+            done += size
+            if self.n_rows == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes the collected games as a chunk.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.n_rows:
+            return
+        name = "chunk-%06d" % len(self.manifest["chunks"])
+        path = os.path.join(self.directory, name)
+        # a chunk that is not in the manifest is left over from a crash
+        # before the manifest was replaced, it is written again
+        for leftover in (path + ".tmp", path):
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        os.makedirs(path + ".tmp")
+        for column, values in self.buffer.items():
+            np.save(os.path.join(path + ".tmp", column + ".npy"), values[:self.n_rows])
+        os.replace(path + ".tmp", path)
+        self.manifest["chunks"].append({"name": name, "rows": self.n_rows})
+        with open(self.manifest_path + ".tmp", "w") as file:
+            json.dump(self.manifest, file, indent=1)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        self.n_rows = 0
+
+
+class ColumnReader:
+
+    def __init__(self, directory):
+        # Reads the chunks of the manifest. The columns are memory mapped,
+        # so an analysis only reads the columns and chunks it uses.
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as file:
+            manifest = json.load(file)
+        self.columns = manifest["columns"]
+        self.chunks = manifest["chunks"]
+
+    def __len__(self):
+        return sum(chunk["rows"] for chunk in self.chunks)
+
+    def get_chunk(self, n_chunk, columns):
+        """
+        Returns columns of a chunk.
+
+        Parameters
+        ----------
+        n_chunk : int
+            Number of the chunk.
+        columns : list
+            Names of the columns.
+
+        Returns
+        -------
+        arrays : dict
+            Memory mapped array per column.
+
+        """
+        path = os.path.join(self.directory, self.chunks[n_chunk]["name"])
+        return {column: np.load(os.path.join(path, column + ".npy"), mmap_mode="r")
+                for column in columns}
+
+    def iter_chunks(self, columns):
+        """
+        Yields the columns of every chunk.
+
+        Parameters
+        ----------
+        columns : list
+            Names of the columns.
+
+        Yields
+        ------
+        arrays : dict
+            Memory mapped array per column.
+
+        """
+        for n_chunk in range(len(self.chunks)):
+            yield self.get_chunk(n_chunk, columns)
+
+    def sum(self, column):
+        """
+        Returns the sum of a column.
+
+        Parameters
+        ----------
+        column : string
+            Name of the column.
+
+        Returns
+        -------
+        total : int
+            The sum.
+
+        """
+        return sum(int(arrays[column].sum(dtype=np.int64))
+                   for arrays in self.iter_chunks([column]))
+
+    def bincount(self, column, where=None):
+        """
+        Counts the games per value of a column.
+
+        Parameters
+        ----------
+        column : string
+            Name of the column. Negative values, e.g. games without a
+            winner, are not counted.
+        where : tuple
+            (column, value): only games with this value are counted.
+
+        Returns
+        -------
+        counts : numpy.ndarray
+            counts[v] is the number of games with the value v.
+
+        """
+        names = [column] if where is None else [column, where[0]]
+        counts = np.zeros(0, np.int64)
+        for arrays in self.iter_chunks(names):
+            values = arrays[column]
+            if where is not None:
+                values = values[arrays[where[0]] == where[1]]
+            if values.dtype.kind == "i":
+                values = values[values >= 0]
+            chunk_counts = np.bincount(values)
+            if len(chunk_counts) > len(counts):
+                counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+            counts[:len(chunk_counts)] += chunk_counts
+        return counts
+
+    def get_win_rates(self):
+        """
+        Returns the win rate of every seat per number of players.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        win_rates : dict
+            (number of players, seat) -> win rate.
+
+        """
+        win_rates = dict()
+        games = self.bincount("n_players")
+        for n_players in np.nonzero(games)[0]:
+            wins = np.zeros(n_players, np.int64)
+            for arrays in self.iter_chunks(["n_players", "winner"]):
+                winners = arrays["winner"][arrays["n_players"] == n_players]
+                wins += np.bincount(winners[winners >= 0], minlength=n_players)
+            for seat in range(n_players):
+                win_rates[(int(n_players), seat)] = float(wins[seat] / games[n_players])
+        return win_rates
+
+
+def write_archive(archive, directory, chunk_size=1 << 20, config=None):
+    """
+    Writes the results of all games of an archive (see GameArchive) as
+    columns. The number of pigs is read from the SETUP event of every log,
+    so archives of other GameConfigs keep their number of pigs.
+
+    Parameters
+    ----------
+    archive : GameArchive
+        The archive.
+    directory : string
+        Directory of the columns.
+    chunk_size : int
+        Number of games per chunk.
+    config : GameConfig
+        The deck composition of the games for the replays (see
+        gamestats.parse_games), by default the rules of the game.
+
+    Returns
+    -------
+    writer : ColumnWriter
+        The writer, all chunks are written.
+
+    """
+    from gamestats import parse_games, read_archive
+
+    writer = ColumnWriter(directory, chunk_size)
+    for game_id, result in enumerate(parse_games(read_archive(archive), config)):
+        # the low 3 bits of the SETUP event are the number of pigs
+        n_pigs = archive.get_game(game_id)[0] & 7
+        writer.add(archive.get_info(game_id)["seed"], n_pigs, result)
+    writer.flush()
+    return writer
+
+
+if __name__ == "__main__":
+    from archive import GameArchive, record_games
+    from gamestats import GameStatistics, parse_games, read_archive
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    record_games(os.path.join(directory, "archive"), 0, 2000, 100)
+    archive = GameArchive(os.path.join(directory, "archive"))
+    write_archive(archive, os.path.join(directory, "columns"), chunk_size=512)
+    reader = ColumnReader(os.path.join(directory, "columns"))
+
+    print("\nTest: the columns give the statistics of the event logs")
+    report = GameStatistics().consume(parse_games(read_archive(archive))).get_report()
+    print("(Expected value: %d). Value:" % len(archive), len(reader))
+    print("(Expected value: True). Value:", reader.get_win_rates() == report["win_rate"])
+    print("(Expected value: True). Value:",
+          all(reader.sum("plays_" + card_type) == report["plays"][card_type]
+              for card_type in card_types))
+    print("(Expected value: %.4f). Value: %.4f"
+          % (report["turns_mean"], reader.sum("turns") / len(reader)))
+    print("(Expected value: [%d]). Value:" % len(reader), reader.bincount("n_pigs")[5:].tolist())
+
+    print("\nTest: a chunk left over from a crash is written again")
+    writer = ColumnWriter(os.path.join(directory, "crash"), chunk_size=2)
+    columns = {name: np.zeros(2, dtype) for name, dtype in COLUMNS.items()}
+    os.makedirs(os.path.join(directory, "crash", "chunk-000000"))
+    np.save(os.path.join(directory, "crash", "chunk-000000", "seed.npy"), np.ones(5))
+    writer.add_batch(columns)
+    print("(Expected value: 2). Value:", len(ColumnReader(os.path.join(directory, "crash"))))
+
+    print("\nTest: games without a winner are not counted")
+    writer = ColumnWriter(os.path.join(directory, "no_winner"))
+    columns = {name: np.zeros(3, dtype) for name, dtype in COLUMNS.items()}
+    columns["winner"][:] = (-1, 1, 1)
+    writer.add_batch(columns)
+    writer.flush()
+    print("(Expected value: [0, 2]). Value:",
+          ColumnReader(os.path.join(directory, "no_winner")).bincount("winner").tolist())
+
+    print("\nBenchmark: reductions over 20 million games")
+    rng = np.random.default_rng(1)
+    writer = ColumnWriter(os.path.join(directory, "large"))
+    n_games = 20000000
+    for i in range(0, n_games, 1 << 20):
+        size = min(1 << 20, n_games - i)
+        columns = {name: np.zeros(size, dtype) for name, dtype in COLUMNS.items()}
+        columns["seed"][:] = np.arange(i, i + size)
+        columns["n_players"][:] = 2
+        columns["n_pigs"][:] = 5
+        columns["winner"][:] = rng.integers(0, 2, size)
+        columns["turns"][:] = rng.integers(5, 120, size)
+        writer.add_batch(columns)
+    writer.flush()
+    reader = ColumnReader(os.path.join(directory, "large"))
+    start = time.perf_counter()
+    win_rates = reader.get_win_rates()
+    histogram = reader.bincount("turns")
+    short_wins = reader.bincount("winner", where=("turns", 20))
+    elapsed = time.perf_counter() - start
+    print("Win rates:", {key: round(value, 4) for key, value in win_rates.items()})
+    print("Games with 20 turns:", histogram[20], "won by seat:", short_wins.tolist())
+    print("%.2f s for three reductions over %d games" % (elapsed, len(reader)))
+    shutil.rmtree(directory)
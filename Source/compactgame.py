@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+
+""" Compact game state """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from deck import Deck
+from tablestate import TableState
+
+
+class CompactGame:
+    # The compact game holds the complete state of a game without any card
+    # objects: the tables as pig histograms (see TableState), the hands as
+    # lists of card key words and the draw deck and discard pile as number of
+    # cards per card type. Drawing a random card of the draw deck is the same
+    # as taking the top card of the shuffled deck.
+    card_types = list(Card.action_card_types) + list(Card.upgrade_card_types)
+    card_index = {card_type: i for i, card_type in enumerate(card_types)}
+    hand_size = 3
+
+    def __init__(self, table, hands, draw_counts, discard_counts, turn=0):
+        self.table = table
+        self.hands = hands
+        self.draw_counts = draw_counts
+        self.discard_counts = discard_counts
+        self.turn = turn
+        self.winner = None
+
+    @classmethod
+    def new_game(cls, n_players, n_pigs, rng):
+        """
+        Creates the state at the start of a game and deals the hand cards.
+
+        Parameters
+        ----------
+        n_players : int
+            Number of players.
+        n_pigs : int
+            Number of pigs of every player (see Game.number_of_pigs).
+        rng : random.Random
+            Random number generator for dealing the cards.
+
+        Returns
+        -------
+        game : CompactGame
+            The new game.
+
+        """
+        card_counts = Deck().get_card_counts()
+        draw_counts = [card_counts[card_type] for card_type in cls.card_types]
+        game = cls(TableState.initial(n_players, n_pigs),
+                   [list() for i in range(n_players)],
+                   draw_counts, [0] * len(cls.card_types))
+        for n_player in range(n_players):
+            for i in range(cls.hand_size):
+                game.deal_card(game.choose_random_card(rng), n_player)
+        return game
+
+    @classmethod
+    def from_game(cls, game, turn=0):
+        """
+        Creates the compact state of a running game.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+        turn : int
+            Number of turns played so far. If not given, it is set to 0.
+
+        Returns
+        -------
+        compact_game : CompactGame
+            The compact state of the game.
+
+        """
+        draw_counts = [0] * len(cls.card_types)
+        for card in game.deck.draw_deck:
+            draw_counts[cls.card_index[card.get_card_type()]] += 1
+        discard_counts = [0] * len(cls.card_types)
+        for card in game.deck.discard_pile:
+            discard_counts[cls.card_index[card.get_card_type()]] += 1
+        hands = [[card.get_card_type() for card in player.get_cards_hand()]
+                 for player in game.players]
+        return cls(TableState.from_game(game), hands, draw_counts,
+                   discard_counts, turn)
+
+    def copy(self):
+        """
+        Returns a copy of the state, which can be modified independently.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        game : CompactGame
+            The copy.
+
+        """
+        game = CompactGame(self.table, [list(hand) for hand in self.hands],
+                           list(self.draw_counts), list(self.discard_counts),
+                           self.turn)
+        game.winner = self.winner
+        return game
+
+    def get_active_player(self):
+        """
+        Returns the index of the active player.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        active : int
+            Index of the active player.
+
+        """
+        return self.table.active
+
+    def get_options(self):
+        """
+        Returns the options of the active player (see TableState.get_options).
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        options : list
+            List of the option tuples.
+
+        """
+        return self.table.get_options(self.hands[self.table.active])
+
+    def get_draw_probabilities(self):
+        """
+        Returns the probability of every card type for the next card that is
+        dealt. If the draw deck is empty, the discard pile is shuffled to a
+        new draw deck first (see Deck.deal_card).
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        draw_probabilities : list
+            List of tuples (card_type, probability).
+
+        """
+        counts = self.draw_counts
+        if not any(counts):
+            counts = self.discard_counts
+        n_cards = sum(counts)
+        return [(self.card_types[i], count / n_cards)
+                for i, count in enumerate(counts) if count]
+
+    def deal_card(self, card_type, n_player=None):
+        """
+        Deals a card of the given type from the draw deck to a player. If the
+        draw deck is empty, a new draw deck is created from the discard pile
+        (see Deck.create_new_draw_deck).
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the dealt card.
+        n_player : int
+            Index of the player. If not given, the card is dealt to the
+            active player.
+
+        Returns
+        -------
+        None.
+
+        """
+        if n_player is None:
+            n_player = self.table.active
+        if not any(self.draw_counts):
+            self.draw_counts = self.discard_counts
+            self.discard_counts = [0] * len(self.card_types)
+        self.draw_counts[self.card_index[card_type]] -= 1
+        self.hands[n_player].append(card_type)
+
+    def choose_random_card(self, rng):
+        """
+        Chooses the type of the next card of the draw deck randomly. If the
+        draw deck is empty, the card is chosen from the discard pile, which
+        becomes the new draw deck. The card is not removed, see deal_card.
+
+        Parameters
+        ----------
+        rng : random.Random
+            Random number generator.
+
+        Returns
+        -------
+        card_type : string
+            Key word of the chosen card.
+
+        """
+        counts = self.draw_counts
+        if not any(counts):
+            counts = self.discard_counts
+        position = int(rng.random() * sum(counts))
+        for i, count in enumerate(counts):
+            if position < count:
+                return self.card_types[i]
+            position -= count
+        raise ValueError("draw deck and discard pile are empty")
+
+    def discard_card(self, card_type):
+        """
+        Adds a card to the discard pile.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.discard_counts[self.card_index[card_type]] += 1
+
+    def play_option(self, option, draw):
+        """
+        Executes an option of the active player in the same order as
+        Game.run_game: the played card is replaced first and discarded
+        afterwards, destroyed upgrades go to the discard pile, played upgrade
+        cards stay on the table. Afterwards the winner is checked and the
+        next player gets active.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+        draw : function
+            Called without arguments whenever a card has to be dealt. Returns
+            the key word of the dealt card.
+
+        Returns
+        -------
+        destroyed_cards : list
+            The key words of the destroyed upgrade cards.
+
+        """
+        active = self.table.active
+        hand = self.hands[active]
+        destroyed_cards = list()
+        if option[0] == "PLAY":
+            card_type = option[1]
+            self.table, destroyed_cards = self.table.play_card(card_type, option[2])
+            hand.remove(card_type)
+            self.deal_card(draw())
+            if card_type not in Card.upgrade_card_types:
+                self.discard_card(card_type)
+            for destroyed_card in destroyed_cards:
+                self.discard_card(destroyed_card)
+        elif option[0] == "CHANGE":
+            hand.remove(option[1])
+            self.deal_card(draw())
+            self.discard_card(option[1])
+        else:
+            for i in range(len(hand)):
+                self.discard_card(hand.pop(0))
+                self.deal_card(draw())
+        if self.table.is_winner(active):
+            self.winner = active
+        else:
+            self.table = self.table.next_turn()
+        self.turn += 1
+        return destroyed_cards
+
+    def play_random_option(self, option, rng):
+        """
+        Executes an option, the dealt cards are drawn randomly.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+        rng : random.Random
+            Random number generator.
+
+        Returns
+        -------
+        destroyed_cards : list
+            The key words of the destroyed upgrade cards.
+
+        """
+        return self.play_option(option, lambda: self.choose_random_card(rng))
+
+    def get_outcomes(self, option):
+        """
+        Returns all the states that can follow an option with their
+        probability. Every dealt card is a chance event depending on the
+        number of cards left in the draw deck (or the discard pile after a
+        reshuffle). Equal states are merged.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+
+        Returns
+        -------
+        outcomes : list
+            List of tuples (probability, CompactGame).
+
+        """
+        outcomes = dict()
+        pending = [(1.0, [])]
+        while pending:
+            probability, drawn = pending.pop()
+            game = self.copy()
+            draws = iter(drawn)
+            branch = list()
+
+            def draw():
+                card_type = next(draws, None)
+                if card_type is None:
+                    # first card which is not decided yet: branch here, the
+                    # rest of this run is thrown away
+                    if not branch:
+                        branch.extend(game.get_draw_probabilities())
+                    card_type = branch[0][0]
+                return card_type
+
+            game.play_option(option, draw)
+            if branch:
+                for card_type, p in branch:
+                    pending.append((probability * p, drawn + [card_type]))
+                continue
+            key = game.get_key()
+            if key in outcomes:
+                outcomes[key] = (outcomes[key][0] + probability, outcomes[key][1])
+            else:
+                outcomes[key] = (probability, game)
+        return list(outcomes.values())
+
+    def get_key(self):
+        """
+        Returns a hashable key of the state. Hands are sorted, as the order of
+        the hand cards does not matter.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        key : tuple
+            The key of the state.
+
+        """
+        return (self.table.tables, self.table.active,
+                tuple(tuple(sorted(hand)) for hand in self.hands),
+                tuple(self.draw_counts), tuple(self.discard_counts), self.winner)
+
+
+if __name__ == "__main__":
+    import random
+
+    rng = random.Random(1)
+    game = CompactGame.new_game(2, 5, rng)
+
+    print("\nTest: method new_game")
+    print("(Expected value: 49). Value:", sum(game.draw_counts))
+    print("Hands:", game.hands)
+
+    print("\nTest: method get_outcomes")
+    option = game.get_options()[0]
+    outcomes = game.get_outcomes(option)
+    print("Option:", option)
+    print("(Expected value: 1.0). Value: %.4f" % sum(p for p, outcome in outcomes))
+
+    print("\nTest: random game")
+    while game.winner is None:
+        options = game.get_options()
+        game.play_random_option(options[int(rng.random() * len(options))], rng)
+    n_cards = sum(game.draw_counts) + sum(game.discard_counts) + \
+        sum(len(hand) for hand in game.hands)
+    n_upgrades = sum(count * bin(flags >> 1).count("1")
+                     for table in game.table.tables for flags, count in enumerate(table))
+    print("Winner:", game.winner, "Turns:", game.turn)
+    print("(Expected value: 55). Value:", n_cards + n_upgrades)
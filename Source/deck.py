@@ -16,30 +16,35 @@ __status__     = 'done'
 from actioncard import ActionCard
 from upgradecard import UpgradeCard
 from card import Card
+from gameconfig import GameConfig
 
 import random
 
 class Deck:
 
-    def __init__(self):
-        # Defining amount per card type
-        # ACTIONCARDS
-        MUDS                 = [ActionCard("MUD")] * 21
-        RAINS                = [ActionCard("RAIN")] * 4
-        LIGHTNINGS           = [ActionCard("LIGHTNING")] * 4
-        FARMER_CLEANS        = [ActionCard("FARMER_CLEANS")] * 8
-        STORM                = [ActionCard("STORM")] * 1
-
-        # UPGRADECARDS
-        STALLS               = [UpgradeCard("STALL")] * 9
-        LIGHTNING_CONDUCTORS = [UpgradeCard("LIGHTNING_CONDUCTOR")] * 4
-        ANNOY_FARMER         = [UpgradeCard("ANNOY_FARMER")] * 4
-
+    # order in which the cards are put together before the shuffle, so a
+    # seed always gives the same deck
+    card_order = ("MUD", "RAIN", "LIGHTNING", "FARMER_CLEANS", "STALL",
+                  "LIGHTNING_CONDUCTOR", "ANNOY_FARMER", "STORM")
+
+    def __init__(self, config=None, draw_deck=None):
+        # The amount per card type comes from the GameConfig, by default the
+        # rules of the game: 21 MUD, 4 RAIN, 4 LIGHTNING, 8 FARMER_CLEANS,
+        # 1 STORM, 9 STALL, 4 LIGHTNING_CONDUCTOR and 4 ANNOY_FARMER.
+        # draw_deck are the cards of a restored game (see hibernation), then
+        # nothing is built or shuffled.
+        if config is None:
+            config = GameConfig()
         # Initializing Deck and Discard pile
         # DECK
-        self.draw_deck = MUDS + RAINS + LIGHTNINGS + FARMER_CLEANS + STALLS \
-        + LIGHTNING_CONDUCTORS + ANNOY_FARMER + STORM
-        random.shuffle(self.draw_deck)
+        if draw_deck is not None:
+            self.draw_deck = draw_deck
+        else:
+            self.draw_deck = list()
+            for card_type in self.card_order:
+                card_class = ActionCard if card_type in Card.action_card_types else UpgradeCard
+                self.draw_deck += [card_class(card_type)] * config.card_counts[card_type]
+            random.shuffle(self.draw_deck)
 
         # DISCARD PILE
         self.discard_pile = list()
@@ -133,6 +138,27 @@ class Deck:
         self.discard_pile.append(UpgradeCard(card_type))
         return True
 
+    def get_card_counts(self):
+        """
+        Counts the cards per card type in the draw deck and the discard pile.
+        For a new deck this is the card composition of the game.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        card_counts : dict
+            Maps the key word of every action and upgrade card type to the
+            number of cards of this type
+        """
+        card_counts = dict.fromkeys(
+            list(Card.action_card_types) + list(Card.upgrade_card_types), 0)
+        for card in self.draw_deck + self.discard_pile:
+            card_counts[card.get_card_type()] += 1
+        return card_counts
+
 
 if __name__ == "__main__":
     #helper function for testing
@@ -163,6 +189,10 @@ if __name__ == "__main__":
     print("Status:", check_number_of_cards(deck, 55))
     print("Expected: False")
     print("Status:", check_number_of_cards(deck, 32))
+
+    print("\nTest number of cards of a configured deck")
+    print("Expected: True")
+    print("Status:", check_number_of_cards(Deck(GameConfig({"MUD": 25, "STORM": 0})), 58))
     
     print("\nTest deal_card with number of cards in deck")
     card1 = deck.deal_card()
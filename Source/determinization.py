@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+
+""" Determinization sampler """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from compactgame import CompactGame
+
+from functools import partial
+
+
+class DeterminizationSampler:
+
+    def __init__(self, n_player, n_players, hand_size=3):
+        # n_player is the seat that observes the game. For every opponent the
+        # sampler keeps one constraint per hand card: the set of card types
+        # the card can have, or None if nothing is known about it.
+        # Until the first reshuffle the draw deck and the hands of the
+        # opponents come from the same shuffled deck, so only their sum
+        # (get_unseen_counts) matters. After a reshuffle the draw deck is the
+        # known discard pile, only the cards the opponents held at the
+        # reshuffle (hidden_counts, old_cards per opponent) are unknown, as in
+        # CardCounter.
+        self.n_player = n_player
+        self.hand_size = hand_size
+        self.slots = {opponent: [None] * hand_size
+                      for opponent in range(n_players) if opponent != n_player}
+        self.pooled = True
+        self.hidden_counts = [0] * len(CompactGame.card_types)
+        self.old_cards = {opponent: 0 for opponent in self.slots}
+
+    def remove_slot(self, n_player, card_type):
+        """
+        Removes the hand card of an opponent that has been played or changed.
+        The least constrained card that can have this type is removed, the
+        new card from the draw deck is unknown.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the opponent.
+        card_type : string
+            Key word of the card that left the hand.
+
+        Returns
+        -------
+        None.
+
+        """
+        slots = self.slots[n_player]
+        candidates = [i for i, allowed in enumerate(slots)
+                      if allowed is None or card_type in allowed]
+        if candidates:
+            i = max(candidates, key=lambda i: len(CompactGame.card_types)
+                    if slots[i] is None else len(slots[i]))
+            slots.pop(i)
+        else:
+            # the observations contradict each other, forget the oldest
+            slots.pop(0)
+        slots.append(None)
+
+    def remove_card(self, n_player, card_type):
+        """
+        Removes a card that left the hand of an opponent after a reshuffle.
+        If the opponent still holds cards from before the reshuffle and such
+        a card can have this type, the card is taken from hidden_counts,
+        otherwise it was dealt from the known draw deck.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the opponent.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        i = CompactGame.card_index[card_type]
+        if self.old_cards[n_player] and self.hidden_counts[i]:
+            self.hidden_counts[i] -= 1
+            self.old_cards[n_player] -= 1
+
+    def observe_reshuffle(self, game, option):
+        """
+        Checks if the draw deck runs out during an option and the discard
+        pile becomes the new draw deck. At this moment the draw deck is
+        empty, so the unseen cards are exactly the hands of the opponents.
+        Must be called with the state before the option.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state before the option.
+        option : tuple
+            The executed option (see TableState.get_options).
+
+        Returns
+        -------
+        reshuffled : bool
+            True if the draw deck is created again during the option.
+
+        """
+        active = game.table.active
+        draw_size = sum(game.draw_counts)
+        n_dealt = len(game.hands[active]) if option[0] == "CHANGE_ALL" else 1
+        if draw_size >= n_dealt:
+            return False
+        hidden_counts = self.get_unseen_counts(game)
+        self.old_cards = {opponent: len(game.hands[opponent]) for opponent in self.slots}
+        if option[0] == "CHANGE_ALL":
+            # the last cards of the draw deck are dealt to the active player
+            # before the reshuffle, the shown hand goes to the discard pile
+            if active == self.n_player:
+                removed = game.draw_counts
+            else:
+                removed = [0] * len(hidden_counts)
+                for card_type in game.hands[active]:
+                    removed[CompactGame.card_index[card_type]] += 1
+                self.old_cards[active] = draw_size
+            hidden_counts = [count - removed[i] for i, count in enumerate(hidden_counts)]
+        self.hidden_counts = hidden_counts
+        self.pooled = False
+        return True
+
+    def observe_option(self, game, option):
+        """
+        Updates the constraints with an option that has been observed. Must be
+        called with the state before the option is executed. If an opponent
+        has to change cards, all his hand cards can not be played at this
+        moment (Game.run_game announces this).
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state before the option.
+        option : tuple
+            The executed option (see TableState.get_options).
+
+        Returns
+        -------
+        None.
+
+        """
+        active = game.table.active
+        reshuffled = self.observe_reshuffle(game, option)
+        if active == self.n_player:
+            return
+        if option[0] == "CHANGE_ALL":
+            # the changed cards are shown and go to the discard pile
+            if not self.pooled and not reshuffled:
+                for card_type in game.hands[active]:
+                    self.remove_card(active, card_type)
+                self.old_cards[active] = 0
+            self.slots[active] = [None] * self.hand_size
+            return
+        if not self.pooled:
+            self.remove_card(active, option[1])
+        can_play = any(choice[0] == "PLAY" for choice in game.get_options())
+        if not can_play:
+            unplayable = frozenset(card_type for card_type in CompactGame.card_types
+                                   if not game.table.can_play_card(card_type))
+            self.slots[active] = [unplayable if allowed is None else allowed & unplayable
+                                  for allowed in self.slots[active]]
+        self.remove_slot(active, option[1])
+
+    def get_unseen_counts(self, game):
+        """
+        Counts the cards the observer cannot see: the draw deck and the hands
+        of the opponents. Tables, discard pile and the own hand are known.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The true state of the game.
+
+        Returns
+        -------
+        unseen_counts : list
+            Number of unseen cards per card type (see CompactGame.card_types).
+
+        """
+        unseen_counts = list(game.draw_counts)
+        for opponent in self.slots:
+            for card_type in game.hands[opponent]:
+                unseen_counts[CompactGame.card_index[card_type]] += 1
+        return unseen_counts
+
+    @staticmethod
+    def pick(counts, allowed, rng):
+        """
+        Picks one card from the counts, only card types in allowed are
+        considered (all types if allowed is None). The card is removed from
+        the counts.
+
+        Parameters
+        ----------
+        counts : list
+            Number of cards per card type.
+        allowed : frozenset
+            Allowed card types or None.
+        rng : random.Random
+            Random number generator.
+
+        Returns
+        -------
+        card_type : string
+            The picked card type, None if no allowed card is left.
+
+        """
+        card_types = CompactGame.card_types
+        if allowed is None:
+            total = sum(counts)
+        else:
+            total = sum(counts[i] for i, card_type in enumerate(card_types)
+                        if card_type in allowed)
+        if not total:
+            return None
+        position = int(rng.random() * total)
+        for i, count in enumerate(counts):
+            if count and (allowed is None or card_types[i] in allowed):
+                if position < count:
+                    counts[i] -= 1
+                    return card_types[i]
+                position -= count
+        return None
+
+    @classmethod
+    def pick_pool(cls, pools, allowed, rng):
+        """
+        Picks one card from two pools of counts, the cards from before the
+        last reshuffle and the others. A pool that is None is skipped.
+
+        Parameters
+        ----------
+        pools : list
+            The counts of the old and of the new cards, or None.
+        allowed : frozenset
+            Allowed card types or None.
+        rng : random.Random
+            Random number generator.
+
+        Returns
+        -------
+        card_type : string
+            The picked card type, None if no allowed card is left.
+        old : bool
+            True if the card was picked from the old cards.
+
+        """
+        card_types = CompactGame.card_types
+        totals = [0 if counts is None else
+                  sum(count for i, count in enumerate(counts)
+                      if allowed is None or card_types[i] in allowed)
+                  for counts in pools]
+        if not sum(totals):
+            return None, False
+        old = rng.random() * sum(totals) < totals[0]
+        return cls.pick(pools[not old], allowed, rng), old
+
+    def sample(self, game, rng, unseen_counts=None):
+        """
+        Creates one determinization: the opponents get random hands that fit
+        the constraints, the remaining unseen cards form the draw deck. After
+        a reshuffle the hands only get the cards from before the reshuffle
+        that can still be hidden, the draw deck keeps the known cards. The
+        order of the draw deck is random by construction of CompactGame.
+        Constrained cards are dealt first, the most constrained first. If a
+        constraint cannot be fulfilled anymore, it is ignored.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The true state of the game. Only the parts the observer can see
+            are used.
+        rng : random.Random
+            Random number generator.
+        unseen_counts : list
+            The result of get_unseen_counts. If not given, it is computed.
+
+        Returns
+        -------
+        determinization : CompactGame
+            A state that is consistent with the observations.
+
+        """
+        if unseen_counts is None:
+            unseen_counts = self.get_unseen_counts(game)
+        if self.pooled:
+            counts = list(unseen_counts)
+            hidden_counts = None
+        else:
+            # the cards from before the reshuffle are dealt from hidden_counts,
+            # the other cards of the hands and the draw deck from the rest
+            hidden_counts = [min(hidden, unseen)
+                             for hidden, unseen in zip(self.hidden_counts, unseen_counts)]
+            counts = [unseen - hidden for unseen, hidden in zip(unseen_counts, hidden_counts)]
+        hands = list(game.hands)
+        for opponent, slots in self.slots.items():
+            n_old = 0 if self.pooled else self.old_cards[opponent]
+            n_new = len(game.hands[opponent]) - n_old
+            hand = list()
+            constrained = sorted((allowed for allowed in slots if allowed is not None), key=len)
+            for allowed in constrained[:len(game.hands[opponent])]:
+                pools = [hidden_counts if n_old else None, counts if n_new else None]
+                card_type, old = self.pick_pool(pools, allowed, rng)
+                if card_type is None:
+                    card_type, old = self.pick_pool(pools, None, rng)
+                if card_type is None:
+                    # the tracking contradicts the state, use any unseen card
+                    card_type, old = self.pick_pool([hidden_counts, counts], None, rng)
+                n_old -= old
+                n_new -= not old
+                hand.append(card_type)
+            for pools, n_cards in (([hidden_counts, None], n_old), ([None, counts], n_new)):
+                for i in range(n_cards):
+                    card_type, old = self.pick_pool(pools, None, rng)
+                    if card_type is None:
+                        card_type, old = self.pick_pool([hidden_counts, counts], None, rng)
+                    hand.append(card_type)
+            hands[opponent] = hand
+        if hidden_counts is not None:
+            # hidden cards that are left over were dealt from the draw deck
+            counts = [count + hidden for count, hidden in zip(counts, hidden_counts)]
+        determinization = CompactGame(game.table, [list(hand) for hand in hands],
+                                      counts, list(game.discard_counts), game.turn)
+        determinization.winner = game.winner
+        return determinization
+
+    def get_sampler(self, game):
+        """
+        Returns a function that creates determinizations of a state, e.g. for
+        MCTSBot.search.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The true state of the game.
+
+        Returns
+        -------
+        sample_root : function
+            Called with a random number generator, returns a determinization.
+            It can be pickled, e.g. for ParallelMCTS.
+
+        """
+        return partial(self.sample, game, unseen_counts=self.get_unseen_counts(game))
+
+
+if __name__ == "__main__":
+    from deck import Deck
+    import random
+    import time
+
+    rng = random.Random(11)
+    game = CompactGame.new_game(2, 5, rng)
+    sampler = DeterminizationSampler(0, 2)
+    while game.turn < 20 and game.winner is None:
+        options = game.get_options()
+        option = options[int(rng.random() * len(options))]
+        sampler.observe_option(game, option)
+        game.play_random_option(option, rng)
+
+    print("\nTest: method sample")
+    determinization = sampler.sample(game, rng)
+    print("Own hand unchanged. (Expected value: True). Value:",
+          determinization.hands[0] == game.hands[0])
+    print("Same number of unseen cards. (Expected value: True). Value:",
+          sum(determinization.draw_counts) + len(determinization.hands[1])
+          == sum(game.draw_counts) + len(game.hands[1]))
+    print("Constraints:", sampler.slots[1])
+
+    print("\nTest: after a reshuffle the draw deck keeps the known cards")
+    # games are played until the draw deck is created again before the end
+    while sampler.pooled or game.winner is not None:
+        if game.winner is not None:
+            game = CompactGame.new_game(2, 5, rng)
+            sampler = DeterminizationSampler(0, 2)
+        options = game.get_options()
+        option = options[int(rng.random() * len(options))]
+        sampler.observe_option(game, option)
+        game.play_random_option(option, rng)
+    unseen_counts = sampler.get_unseen_counts(game)
+    known_counts = [unseen - hidden
+                    for unseen, hidden in zip(unseen_counts, sampler.hidden_counts)]
+    print("True draw deck in the known cards. (Expected value: True). Value:",
+          all(map(int.__le__, game.draw_counts, known_counts)))
+    # a sampler without the history pools the draw deck and the hands
+    for test_sampler, expected in ((DeterminizationSampler(0, 2), "< 1000"),
+                                   (sampler, "1000")):
+        samples = [test_sampler.sample(game, rng) for i in range(1000)]
+        print("Samples with a draw deck of the known cards (Expected value: %s). Value:"
+              % expected, sum(all(map(int.__le__, sample.draw_counts, known_counts))
+                              for sample in samples))
+    print("Same number of cards. (Expected value: True). Value:",
+          all(sum(sample.draw_counts) == sum(game.draw_counts)
+              and len(sample.hands[1]) == len(game.hands[1]) for sample in samples))
+
+    print("\nBenchmark: determinizations per second")
+    n_samples = 20000
+    start = time.perf_counter()
+    sample_root = sampler.get_sampler(game)
+    for i in range(n_samples):
+        sample_root(rng)
+    print("%.0f determinizations/s" % (n_samples / (time.perf_counter() - start)))
+
+    print("\nBenchmark: rejection sampling from a fresh deck")
+    attempts = 0
+    accepted = 0
+    own_hand = sorted(game.hands[0])
+    start = time.perf_counter()
+    while time.perf_counter() - start < 1.0:
+        deck = Deck()
+        hand = sorted(deck.deal_card().get_card_type() for i in range(3))
+        attempts += 1
+        # the own hand has to match before the rest can even be checked
+        accepted += hand == own_hand
+    print("%d attempts/s, %.1f%% match the own hand alone"
+          % (attempts, 100 * accepted / attempts))
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+
+""" Compact binary event log of games """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from statesync import card_index, card_types
+
+
+# Every event starts with one byte, the high 3 bits are the kind of the
+# event, the low 5 bits its arguments:
+# SETUP:      players - 1 (2), pigs per player (3)
+# DEAL:       player (2), card (3)
+# PLAY:       card (3), target (1), 0 (1). If target is set, a second byte
+#             follows: player (4), pig number (4)
+# CHANGE:     card (3)
+# CHANGE_ALL: -
+# RESHUFFLE:  -
+# DESTROYED:  card (3)
+# WINNER:     player (2)
+# Cards are indices of statesync.card_types. The player of PLAY, CHANGE and
+# CHANGE_ALL is the active player, who follows from the number of turns.
+# Discarded cards are not logged, they follow from the rules. A SETUP event
+# starts a new game, so the logs of several games can be concatenated.
+SETUP       = 0
+DEAL        = 1
+PLAY        = 2
+CHANGE      = 3
+CHANGE_ALL  = 4
+RESHUFFLE   = 5
+DESTROYED   = 6
+WINNER      = 7
+
+
+class EventLog:
+
+    def __init__(self, file=None, buffer_size=65536):
+        # A listener of Game (see Game.add_listener) that appends every event
+        # to a buffer. If a binary file is given, the buffer is written to it
+        # when it holds buffer_size bytes and by flush, otherwise the events
+        # stay in memory (see get_data).
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.n_events = 0
+        self.n_bytes = 0
+
+        self.handlers = {
+            "setup": self.setup, "deal": self.deal, "play": self.play,
+            "change": self.change, "change_all": self.change_all,
+            "reshuffle": self.reshuffle, "destroyed": self.destroyed,
+            "winner": self.winner}
+
+    def __call__(self, event, *args):
+        # discarded cards are not logged
+        handler = self.handlers.get(event)
+        if handler is not None:
+            handler(*args)
+            self.n_events += 1
+            if self.file is not None and len(self.buffer) >= self.buffer_size:
+                self.flush()
+
+    def setup(self, n_players, n_pigs):
+        """
+        The pigs are on the table, a new game starts.
+
+        Parameters
+        ----------
+        n_players : int
+            Number of players.
+        n_pigs : int
+            Number of pigs per player.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(SETUP << 5 | (n_players - 1) << 3 | n_pigs)
+
+    def deal(self, n_player, card_type):
+        """
+        A card is dealt to a player.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(DEAL << 5 | n_player << 3 | card_index[card_type])
+
+    def play(self, n_player, card_type, target=None):
+        """
+        The active player plays a card.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+        card_type : string
+            Key word of the card.
+        target : tuple
+            (n_player, pig number) of the target pig, None for RAIN and STORM.
+
+        Returns
+        -------
+        None.
+
+        """
+        if target is None:
+            self.buffer.append(PLAY << 5 | card_index[card_type] << 2)
+        else:
+            self.buffer.append(PLAY << 5 | card_index[card_type] << 2 | 2)
+            self.buffer.append(target[0] << 4 | target[1])
+
+    def change(self, n_player, card_type):
+        """
+        The active player changes a card.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(CHANGE << 5 | card_index[card_type])
+
+    def change_all(self, n_player):
+        """
+        The active player changes all cards.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(CHANGE_ALL << 5)
+
+    def reshuffle(self):
+        """
+        The discard pile becomes the draw deck.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(RESHUFFLE << 5)
+
+    def destroyed(self, card_type):
+        """
+        A destroyed upgrade is discarded.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(DESTROYED << 5 | card_index[card_type])
+
+    def winner(self, n_player):
+        """
+        A player has won.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(WINNER << 5 | n_player)
+
+    def flush(self):
+        """
+        Writes the buffer to the file.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.file is not None and self.buffer:
+            self.file.write(self.buffer)
+            self.n_bytes += len(self.buffer)
+            self.buffer = bytearray()
+
+    def get_data(self):
+        """
+        Returns the events that were not written to a file.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        data : bytes
+            The encoded events.
+
+        """
+        return bytes(self.buffer)
+
+
+def read_events(data):
+    """
+    Decodes an event log. The events have the arguments of the game events
+    (see Game.add_listener).
+
+    Parameters
+    ----------
+    data : bytes
+        The encoded events of one or more games.
+
+    Yields
+    ------
+    event : tuple
+        The name of the event and its arguments.
+
+    """
+    n_players = 1
+    turn = 0
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        kind = byte >> 5
+        i += 1
+        if kind == DEAL:
+            yield ("deal", byte >> 3 & 3, card_types[byte & 7])
+        elif kind == PLAY:
+            target = None
+            if byte & 2:
+                target = (data[i] >> 4, data[i] & 15)
+                i += 1
+            yield ("play", turn % n_players, card_types[byte >> 2 & 7], target)
+            turn += 1
+        elif kind == CHANGE:
+            yield ("change", turn % n_players, card_types[byte & 7])
+            turn += 1
+        elif kind == CHANGE_ALL:
+            yield ("change_all", turn % n_players)
+            turn += 1
+        elif kind == RESHUFFLE:
+            yield ("reshuffle",)
+        elif kind == DESTROYED:
+            yield ("destroyed", card_types[byte & 7])
+        elif kind == WINNER:
+            yield ("winner", byte & 3)
+        else:
+            n_players = (byte >> 3 & 3) + 1
+            turn = 0
+            yield ("setup", n_players, byte & 7)
+
+
+def split_games(data):
+    """
+    Finds the games in an event log.
+
+    Parameters
+    ----------
+    data : bytes
+        The encoded events of one or more games.
+
+    Returns
+    -------
+    games : list
+        (start, end) of every game in data.
+
+    """
+    starts = list()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte >> 5 == SETUP:
+            starts.append(i)
+        # a PLAY with target has a second byte
+        i += 2 if byte >> 5 == PLAY and byte & 2 else 1
+    return list(zip(starts, starts[1:] + [len(data)]))
+
+
+if __name__ == "__main__":
+    from game import Game
+    from greedybot import GreedyBot
+    from player import Player
+    import io
+    import json
+    import random
+    import time
+
+    def play_game(listener):
+        game = Game()
+        game.output = lambda text: None
+        game.players = [Player("Anja"), Player("Lars")]
+        game.add_listener(listener)
+        game.run_bot_game([GreedyBot(), GreedyBot()])
+        return game
+
+    random.seed(2)
+    print("\nTest: decoded events are the events of the game")
+    events = list()
+    log = EventLog()
+
+    def listener(event, *args):
+        log(event, *args)
+        if event != "discard":
+            events.append((event,) + args)
+
+    game = play_game(listener)
+    print("(Expected value: True). Value:", list(read_events(log.get_data())) == events)
+    print("%d events, %d turns, %d bytes, %.2f bytes per event"
+          % (log.n_events, game.round_counter, len(log.get_data()),
+             len(log.get_data()) / log.n_events))
+    print("JSON: %d bytes" % len(json.dumps(events)))
+
+    print("\nBenchmark: cost of the log per turn")
+    n_games = 300
+    for with_log in (False, True):
+        random.seed(3)
+        file = io.BytesIO()
+        log = EventLog(file)
+        turns = 0
+        start = time.perf_counter()
+        for i in range(n_games):
+            turns += play_game(log if with_log else (lambda event, *args: None)).round_counter
+        log.flush()
+        elapsed = time.perf_counter() - start
+        print("Log: %-5s %.1f µs per turn, %d bytes" % (with_log, elapsed / turns * 1e6,
+                                                       len(file.getvalue())))
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+
+""" Expectimax bot """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from compactgame import CompactGame
+from determinization import DeterminizationSampler
+from tablestate import TableState
+
+from math import tanh
+import random
+import time
+
+
+class SearchTimeout(Exception):
+    # raised inside the search when the time budget is used up
+    pass
+
+
+class ExpectimaxBot:
+    # bounds of the node values (win estimate of the searching player)
+    L = 0.0
+    U = 1.0
+
+    def __init__(self, max_depth=4, time_budget=None, probing=False, n_samples=8,
+                 seed=None):
+        # max_depth: number of turns that are searched at most
+        # time_budget: seconds per decision, None for a fixed depth search.
+        # Without a time budget the bot is deterministic for a given seed.
+        # probing: use Star2 probing at chance nodes in addition to Star1.
+        # The probes cost more nodes than they save in most positions, so it
+        # is off by default.
+        # n_samples: number of determinizations that are searched. The hands
+        # of the opponents are hidden, the values of the options are averaged
+        # over states with sampled hands (see DeterminizationSampler).
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.probing = probing
+        self.n_samples = n_samples
+        self.rng = random.Random(seed)
+
+        self.root_player = None
+        self.deadline = None
+        self.nodes = 0
+        self.statistics = dict()
+
+    def evaluate_table(self, table, n_player):
+        """
+        Static evaluation of the tables from the view of a player. Fewer own
+        clean pigs and more clean pigs of the strongest opponent are good,
+        dirty pigs behind a door (safe from FARMER_CLEANS) and in a stall
+        (safe from RAIN) count a little extra.
+
+        Parameters
+        ----------
+        table : TableState
+            The tables.
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        value : float
+            Estimate of the win probability between L and U.
+
+        """
+        def strength(n):
+            counts = table.tables[n]
+            score = -table.clean_pigs(n)
+            for flags in range(1, TableState.n_buckets, 2):
+                if counts[flags]:
+                    if flags & TableState.DOOR:
+                        score += 0.3 * counts[flags]
+                    elif flags & TableState.STALL:
+                        score += 0.15 * counts[flags]
+            return score
+
+        opponent = max(strength(n) for n in range(len(table.tables)) if n != n_player)
+        return 0.5 + 0.5 * tanh((strength(n_player) - opponent) / 2)
+
+    def evaluate(self, game):
+        """
+        Evaluates a game state from the view of the searching player.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state.
+
+        Returns
+        -------
+        value : float
+            U if the searching player has won, L if another player has won,
+            the static evaluation otherwise.
+
+        """
+        if game.winner is not None:
+            return self.U if game.winner == self.root_player else self.L
+        return self.evaluate_table(game.table, self.root_player)
+
+    def order_options(self, game, options):
+        """
+        Sorts the options so that the most promising option for the active
+        player comes first: played cards by the static evaluation of the
+        resulting tables, then changing one card, changing all cards last.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state.
+        options : list
+            The options of the active player.
+
+        Returns
+        -------
+        options : list
+            The sorted options.
+
+        """
+        active = game.table.active
+        scored = list()
+        for i, option in enumerate(options):
+            if option[0] == "PLAY":
+                table = game.table.play_card(option[1], option[2])[0]
+                score = 2.0 if table.is_winner(active) else self.evaluate_table(table, active)
+            elif option[0] == "CHANGE":
+                score = -1.0
+            else:
+                score = -2.0
+            scored.append((-score, i, option))
+        scored.sort()
+        return [option for score, i, option in scored]
+
+    def check_time(self):
+        """
+        Counts a node and stops the search when the time budget is used up.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255 \
+                and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def search(self, game, depth, alpha, beta):
+        """
+        Decision node. The searching player maximizes the value, the
+        opponents minimize it (paranoid assumption).
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state.
+        depth : int
+            Number of turns left to search.
+        alpha : float
+            Lower bound of the search window.
+        beta : float
+            Upper bound of the search window.
+
+        Returns
+        -------
+        value : float
+            The value of the node (fail-soft).
+
+        """
+        self.check_time()
+        if game.winner is not None or depth == 0:
+            return self.evaluate(game)
+        options = self.order_options(game, game.get_options())
+        if game.table.active == self.root_player:
+            best = self.L
+            for option in options:
+                value = self.chance(game, option, depth, max(alpha, best), beta)
+                if value > best:
+                    best = value
+                    if best >= beta:
+                        break
+        else:
+            best = self.U
+            for option in options:
+                value = self.chance(game, option, depth, alpha, min(beta, best))
+                if value < best:
+                    best = value
+                    if best <= alpha:
+                        break
+        return best
+
+    def probe(self, game, depth):
+        """
+        Star2 probing: searches only the first option of a decision node.
+        For the searching player this is a lower bound of the node value, for
+        the opponents an upper bound.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state.
+        depth : int
+            Number of turns left to search.
+
+        Returns
+        -------
+        value : float
+            The bound.
+
+        """
+        self.check_time()
+        if game.winner is not None or depth == 0:
+            return self.evaluate(game)
+        option = self.order_options(game, game.get_options())[0]
+        return self.chance(game, option, depth, self.L, self.U)
+
+    def chance(self, game, option, depth, alpha, beta):
+        """
+        Chance node over the cards that are dealt after an option, pruned
+        with the Star1 bounds and optionally Star2 probing.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state before the option.
+        option : tuple
+            The option of the active player.
+        depth : int
+            Number of turns left to search, including this one.
+        alpha : float
+            Lower bound of the search window.
+        beta : float
+            Upper bound of the search window.
+
+        Returns
+        -------
+        value : float
+            The expected value of the option (fail-soft).
+
+        """
+        outcomes = game.get_outcomes(option)
+        outcomes.sort(key=lambda outcome: -outcome[0])
+        if len(outcomes) == 1:
+            return self.search(outcomes[0][1], depth - 1, alpha, beta)
+
+        # bounds of the children that are not searched yet
+        lower = [self.L] * len(outcomes)
+        upper = [self.U] * len(outcomes)
+        next_game = outcomes[0][1]
+        if self.probing and depth > 1 and next_game.winner is None:
+            maximizing = next_game.table.active == self.root_player
+            bound_sum = 0.0
+            for i, (p, child) in enumerate(outcomes):
+                if child.winner is not None:
+                    lower[i] = upper[i] = self.evaluate(child)
+                elif maximizing:
+                    lower[i] = self.probe(child, depth - 1)
+                else:
+                    upper[i] = self.probe(child, depth - 1)
+                bound_sum += p * (lower[i] if maximizing else upper[i])
+            if maximizing and bound_sum >= beta:
+                return bound_sum
+            if not maximizing and bound_sum <= alpha:
+                return bound_sum
+
+        lower_rest = sum(p * lower[i] for i, (p, child) in enumerate(outcomes))
+        upper_rest = sum(p * upper[i] for i, (p, child) in enumerate(outcomes))
+        value_sum = 0.0
+        for i, (p, child) in enumerate(outcomes):
+            lower_rest -= p * lower[i]
+            upper_rest -= p * upper[i]
+            child_alpha = (alpha - value_sum - upper_rest) / p
+            child_beta = (beta - value_sum - lower_rest) / p
+            value = self.search(child, depth - 1, max(self.L, child_alpha),
+                                min(self.U, child_beta))
+            value_sum += p * value
+            if value <= child_alpha:
+                return value_sum + upper_rest
+            if value >= child_beta:
+                return value_sum + lower_rest
+        return value_sum
+
+    def choose_option(self, game, sample_root=None):
+        """
+        Chooses the option of the active player with iterative deepening
+        until max_depth is reached or the time budget is used up. Every
+        iteration searches the same n_samples determinizations, the value of
+        an option is its mean value over them. The statistics of the search
+        are stored in self.statistics.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state. The active player is the searching player. The hands
+            of the opponents and the draw deck are not used.
+        sample_root : function
+            Called with the random number generator, returns a
+            determinization of game (see DeterminizationSampler.get_sampler).
+            If not given, a sampler without observations is used.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        start = time.perf_counter()
+        self.root_player = game.table.active
+        self.deadline = None if self.time_budget is None else start + self.time_budget
+        self.nodes = 0
+        if sample_root is None:
+            sample_root = DeterminizationSampler(
+                self.root_player, len(game.hands)).get_sampler(game)
+        roots = [sample_root(self.rng) for i in range(self.n_samples)]
+
+        options = self.order_options(game, game.get_options())
+        best_option = options[0]
+        best_value = None
+        depth_reached = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                # the values are averaged, so every option needs its exact
+                # value in every determinization, not only a bound
+                values = {option: sum(self.chance(root, option, depth, self.L, self.U)
+                                      for root in roots) / len(roots)
+                          for option in options}
+            except SearchTimeout:
+                break
+            # search the best option of this iteration first in the next one
+            options.sort(key=lambda option: -values[option])
+            best_option = options[0]
+            best_value = values[best_option]
+            depth_reached = depth
+            if best_value >= self.U:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.statistics = {
+            "nodes"             : self.nodes,
+            "depth"             : depth_reached,
+            "time"              : elapsed,
+            "nodes_per_second"  : self.nodes / elapsed if elapsed else 0.0,
+            "value"             : best_value,
+        }
+        return best_option
+
+
+if __name__ == "__main__":
+    import random
+
+    rng = random.Random(7)
+    game = CompactGame.new_game(2, 5, rng)
+    for i in range(6):
+        options = game.get_options()
+        game.play_random_option(options[int(rng.random() * len(options))], rng)
+
+    print("\nTest: fixed depth search is deterministic")
+    for probing in (False, True):
+        bot = ExpectimaxBot(max_depth=2, probing=probing, seed=1)
+        first = bot.choose_option(game)
+        second = ExpectimaxBot(max_depth=2, probing=probing, seed=1).choose_option(game)
+        print("Probing:", probing, "Option:", first, "Statistics:",
+              {key: round(value, 3) for key, value in bot.statistics.items()})
+        print("(Expected value: True). Value:", first == second)
+
+    print("\nTest: search with time budget")
+    bot = ExpectimaxBot(max_depth=8, time_budget=1.0)
+    option = bot.choose_option(game)
+    print("Option:", option, "Depth reached:", bot.statistics["depth"],
+          "Nodes/s: %.0f" % bot.statistics["nodes_per_second"])
+
+    print("\nTest: the hidden hands of the opponents are not used")
+    bot = ExpectimaxBot(max_depth=2, seed=1)
+    # other cards in the hand of the opponent and in the draw deck
+    other_game = DeterminizationSampler(game.table.active, 2).sample(game, rng)
+    opponent = 1 - game.table.active
+    print("Other hand. (Expected value: True). Value:",
+          other_game.hands[opponent] != game.hands[opponent])
+    print("Same option. (Expected value: True). Value:",
+          bot.choose_option(game) == ExpectimaxBot(max_depth=2, seed=1).choose_option(
+              other_game))
+
+    print("\nTest: expectimax (depth 2) against random player")
+    wins = 0
+    n_games = 10
+    bot = ExpectimaxBot(max_depth=2)
+    for n in range(n_games):
+        game = CompactGame.new_game(2, 5, rng)
+        while game.winner is None:
+            if game.table.active == n % 2:
+                option = bot.choose_option(game)
+            else:
+                options = game.get_options()
+                option = options[int(rng.random() * len(options))]
+            game.play_random_option(option, rng)
+        wins += game.winner == n % 2
+    print("Expectimax won", wins, "of", n_games, "games")
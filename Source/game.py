@@ -17,19 +17,53 @@ from validator import Validator
 from pigcard import PigCard
 from actioncard import ActionCard
 from upgradecard import UpgradeCard
+from card import Card
 from player import Player
 from deck import Deck
+from gameconfig import GameConfig
+from tablestate import TableState
 
 
 class Game:
-
-    def __init__(self):
-        self.validate = Validator()
-        self.deck = Deck()
+    # the questions to the players
+    prompts = {
+        "play_or_change"    : "\n1: Spiele eine Karte\n" +
+                              "2: Wechsle eine Karte\n" +
+                              "Willst du eine Karte spielen oder eine Karte wechseln? [1/2] ",
+        "change_one_or_all" : "\n1: Wechsle eine Karte\n" +
+                              "2: Wechsle alle Karten\n" +
+                              "Willst du eine Karte wechseln oder alle Karten wechseln? [1/2] ",
+        "play_card"         : "Welche Karte willst du spielen? [1/2/3] ",
+        "change_card"       : "Welche Karte willst du wechseln? [1/2/3] ",
+        "move"              : "Wo willst du diese Karte spielen? ",
+    }
+
+    def __init__(self, hint_engine=None, speculator=None, config=None, deck=None):
+        # function that shows the game to the players, the server replaces it
+        self.output = print
+        self.validate = Validator(lambda text: self.output(text))
+        # the deck composition and the pigs per player (see GameConfig)
+        self.config = config if config is not None else GameConfig()
+        # a new shuffled deck, or the deck of a restored game
+        self.deck = deck if deck is not None else Deck(self.config)
 
         self.players = list()  # a list of the players playing a game
         self.active_player = None
         self.running = False # True if done
+        self.round_counter = 0 # number of finished turns in run_game_async
+
+        # functions that are called with every game event, e.g. to count the
+        # cards (see add_listener)
+        self.listeners = list()
+
+        # optional HintEngine, which estimates the win probability of every
+        # option while the player is thinking and counts the cards
+        self.hint_engine = hint_engine
+        if hint_engine is not None:
+            hint_engine.attach(self)
+        # optional Speculator, which prepares the next turn while the player
+        # is thinking
+        self.speculator = speculator
 
         self.card_map = {
             "MUD": self.mud, "RAIN": self.rain, "LIGHTNING": self.lightning,
@@ -61,49 +95,322 @@ class Game:
             self.active_player = self.players[round_counter % len(self.players)]
             # get the hand cards of the active player
             hand_cards = self.active_player.get_cards_hand()
+            prepared = None
+            if self.speculator is not None:
+                prepared = self.speculator.lookup(self)
 
-            self.show_all_cards_on_table()
-            print(Back.CYAN + "\n" + self.active_player.get_name() + "'s Zug:" + Style.RESET_ALL)
-            self.active_player.show_cards_in_hand()
-
-            if self.can_player_play_card(hand_cards):  #if player can play a card
+            if prepared is not None:
+                self.output(prepared.frame)
+            else:
+                self.show_all_cards_on_table()
+            self.output(Back.CYAN + "\n" + self.active_player.get_name() + "'s Zug:" + Style.RESET_ALL)
+            self.output(self.active_player.get_cards_hand_text())
+            if self.hint_engine is not None:
+                self.hint_engine.start(self)
+                self.output("Gib h ein, um die Hinweise anzuzeigen.")
+            if self.speculator is not None:
+                self.speculator.start(self)
+
+            if prepared is not None:
+                can_play = prepared.can_play
+            else:
+                can_play = self.can_player_play_card(hand_cards)
+            if can_play:  #if player can play a card
                 choice = self.choose_play_or_change_card()
                 if choice == 1:
                     # play card
                     card, activations = self.play_card()
-                    # make changes
-                    destroyed_cards = self.activate_card(card, activations)
-                    # replace the played card
-                    self.replace_hand_card(card)
-                    if not card.get_card_type() in list(card.upgrade_card_types.keys()):
-                        self.deck.add_card_to_discard_pile(card)
-                    # move destroyed cards to discard pile
-                    if destroyed_cards:
-                        self.add_destroyed_cards_to_discard_pile(destroyed_cards)
+                    self.execute_play(card, activations)
                 else:
                     # change one card
                     n_card_to_change = self.choose_card(change=True)
-                    card = self.active_player.get_card_hand(n_card_to_change)
-                    self.replace_hand_card(card)
-                    self.deck.add_card_to_discard_pile(card)
+                    self.execute_change(self.active_player.get_card_hand(n_card_to_change))
             else:
                 # player has to change one card or all cards
                 choice = self.choose_to_change_one_or_all_cards()
                 if choice == 1:
                     # player chooses to change one card
                     n_card_to_change = self.choose_card(change=True)
-                    card = self.active_player.get_card_hand(n_card_to_change)
-                    self.replace_hand_card(card)
-                    self.deck.add_card_to_discard_pile(card)
+                    self.execute_change(self.active_player.get_card_hand(n_card_to_change))
                 else:
                     # player chooses to change all cards
-                    cards = self.active_player.get_cards_hand()
-                    cards_name = [card.get_name() for card in cards]
-                    self.change_all_cards()
-                    print("\n" + self.active_player.get_name() + " hat alle Karten gewechselt: " + ", ".join(cards_name))
+                    self.execute_change_all()
+            if self.hint_engine is not None:
+                self.hint_engine.stop()
             self.check_winner()
             round_counter += 1
-        print("Ende des Spiels")
+        if self.speculator is not None:
+            self.speculator.stop()
+        self.output("Ende des Spiels")
+
+    async def run_game_async(self, ask, tell, resume=False):
+        """
+        The turn loop of run_game as a coroutine, e.g. for the game server.
+        The players are already created, the decisions of the players are
+        awaited instead of read with input(). The hand cards and the errors
+        of the validator are only shown to the active player, everything
+        else goes to self.output.
+
+        Parameters
+        ----------
+        ask : coroutine function
+            Called with a player and a question, returns his answer.
+        tell : function
+            Called with a player and a text that only he should see.
+        resume : bool
+            True to continue a restored game at the start of the turn
+            self.round_counter. The table and the hand of this turn were
+            already shown, so the first question is asked directly.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.ask = ask
+        self.validate.output = lambda text: tell(self.active_player, text)
+        if not resume:
+            self.init_cards_table()
+            self.init_cards_hand()
+            self.round_counter = 0
+        self.running = True
+
+        while self.running:
+            self.active_player = self.players[self.round_counter % len(self.players)]
+            hand_cards = self.active_player.get_cards_hand()
+            show_turn = not resume
+            resume = False
+            if show_turn:
+                self.show_all_cards_on_table()
+                self.output(Back.CYAN + "\n" + self.active_player.get_name() + "'s Zug:" + Style.RESET_ALL)
+                tell(self.active_player, self.active_player.get_cards_hand_text())
+
+            if self.can_player_play_card(hand_cards):
+                choice = await self.ask_async(self.prompts["play_or_change"],
+                                              self.validate.choose_play_or_change_card)
+                if choice == 1:
+                    card, activations = await self.play_card_async()
+                    self.execute_play(card, activations)
+                else:
+                    n_card_to_change = await self.ask_async(self.prompts["change_card"],
+                                                            self.validate.choose_card)
+                    self.execute_change(self.active_player.get_card_hand(n_card_to_change))
+            else:
+                if show_turn:
+                    tell(self.active_player, "Du kannst keine Karte spielen")
+                choice = await self.ask_async(self.prompts["change_one_or_all"],
+                                              self.validate.choose_to_change_one_or_all_cards)
+                if choice == 1:
+                    n_card_to_change = await self.ask_async(self.prompts["change_card"],
+                                                            self.validate.choose_card)
+                    self.execute_change(self.active_player.get_card_hand(n_card_to_change))
+                else:
+                    self.execute_change_all()
+            self.check_winner()
+            self.round_counter += 1
+        self.output("Ende des Spiels")
+
+    async def ask_async(self, prompt, validation, *args):
+        """
+        Asks the active player until the answer is valid.
+
+        Parameters
+        ----------
+        prompt : string
+            The question (see self.prompts).
+        validation : function
+            The method of the validator that checks the answer.
+        args : tuple
+            Further arguments of the validation.
+
+        Returns
+        -------
+        choice : int
+            The valid answer.
+
+        """
+        valid_input = False
+        while not valid_input:
+            choice = await self.ask(self.active_player, prompt)
+            valid_input = validation(choice, *args)
+        return int(choice)
+
+    async def play_card_async(self):
+        """
+        Coroutine version of play_card.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        (card : Card , activations : list) : tuple
+
+        """
+        valid_input = False
+        while not valid_input:
+            n_card = await self.ask_async(self.prompts["play_card"], self.validate.choose_card)
+            card = self.active_player.get_card_hand(n_card)
+            possible_moves = self.get_possible_moves_for_card(card)
+            valid_input = self.validate.move_is_possible(possible_moves)
+        card_type = card.get_card_type()
+        if card_type == "RAIN" or card_type == "STORM":
+            return card, possible_moves
+        self.show_possible_moves(possible_moves)
+        n_move = await self.ask_async(self.prompts["move"], self.validate.choose_move,
+                                      possible_moves)
+        return card, [possible_moves[n_move - 1]]
+
+    def execute_play(self, card, activations):
+        """
+        Executes a played card: activates it, replaces it in the hand, moves
+        it to the discard pile if it is no upgrade and moves the destroyed
+        upgrades to the discard pile.
+
+        Parameters
+        ----------
+        card : Card
+            The played card.
+        activations : list
+            The player-pig combos the card is used on (see play_card).
+
+        Returns
+        -------
+        None.
+
+        """
+        # make changes
+        destroyed_cards = self.activate_card(card, activations)
+        card_type = card.get_card_type()
+        target = None
+        if card_type not in TableState.area_card_types:
+            target_player, target_pig = activations[0]
+            target = (self.players.index(target_player), target_pig.get_pig_number())
+        self.notify("play", self.players.index(self.active_player), card_type, target)
+        # replace the played card
+        self.replace_hand_card(card)
+        if not card.get_card_type() in list(card.upgrade_card_types.keys()):
+            self.discard_card(card)
+        # move destroyed cards to discard pile
+        if destroyed_cards:
+            self.add_destroyed_cards_to_discard_pile(destroyed_cards)
+
+    def execute_change(self, card):
+        """
+        Changes one hand card of the active player.
+
+        Parameters
+        ----------
+        card : Card
+            The card to change.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.notify("change", self.players.index(self.active_player), card.get_card_type())
+        self.replace_hand_card(card)
+        self.discard_card(card)
+
+    def execute_change_all(self):
+        """
+        Changes all hand cards of the active player and shows the changed
+        cards.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        cards = self.active_player.get_cards_hand()
+        cards_name = [card.get_name() for card in cards]
+        self.notify("change_all", self.players.index(self.active_player))
+        self.change_all_cards()
+        self.output("\n" + self.active_player.get_name() + " hat alle Karten gewechselt: " + ", ".join(cards_name))
+
+    def execute_option(self, option):
+        """
+        Executes an option of the active player, e.g. the decision of a bot.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+
+        Returns
+        -------
+        None.
+
+        Raises
+        ------
+        ValueError
+            If the card is not in the hand or cannot be played on the target,
+            nothing is executed.
+
+        """
+        if option[0] == "CHANGE_ALL":
+            self.execute_change_all()
+            return
+        for card in self.active_player.get_cards_hand():
+            if card.get_card_type() == option[1]:
+                break
+        else:
+            raise ValueError("Die Karte " + str(option[1]) + " ist nicht auf der Hand")
+        if option[0] == "CHANGE":
+            self.execute_change(card)
+            return
+        possible_moves = self.get_possible_moves_for_card(card)
+        if option[2] is None:
+            if not possible_moves:
+                raise ValueError("Die Karte " + option[1] + " kann nicht gespielt werden")
+            self.execute_play(card, possible_moves)
+            return
+        n_player, flags = option[2]
+        for target_player, target_pig in possible_moves:
+            if (self.players.index(target_player) == n_player
+                    and TableState.pig_to_flags(target_pig) == flags):
+                self.execute_play(card, [(target_player, target_pig)])
+                return
+        raise ValueError("Die Karte " + option[1] + " kann nicht auf dieses Schwein gespielt werden")
+
+    def run_bot_game(self, bots, max_turns=None):
+        """
+        Plays a game in which every player is a bot. The players are already
+        created.
+
+        Parameters
+        ----------
+        bots : list
+            One bot per player with a method choose_for_game, e.g. GreedyBot.
+        max_turns : int
+            The game stops after this many turns. If not given, it runs until
+            a player has won.
+
+        Returns
+        -------
+        winner : int
+            Index of the winner, None if max_turns was reached.
+
+        """
+        self.init_cards_table()
+        self.init_cards_hand()
+        self.running = True
+        self.round_counter = 0
+        while self.running:
+            if max_turns is not None and self.round_counter >= max_turns:
+                return None
+            n_player = self.round_counter % len(self.players)
+            self.active_player = self.players[n_player]
+            self.execute_option(bots[n_player].choose_for_game(self))
+            self.check_winner()
+            self.round_counter += 1
+        return n_player
 
     # init game
     def init_game(self):
@@ -120,11 +427,11 @@ class Game:
         None.
     
         """
-        print("Wilkommen bei Drecksau!")
+        self.output("Wilkommen bei Drecksau!")
         self.init_players()
         self.init_cards_table()
         self.init_cards_hand()
-        print("\nLass uns beginnen:")
+        self.output("\nLass uns beginnen:")
         self.running = True
 
     def init_players(self):
@@ -201,6 +508,7 @@ class Game:
         for player in self.players:
             for n in range(n_pigs):
                 player.add_card_to_table(PigCard(n + 1))
+        self.notify("setup", len(self.players), n_pigs)
 
     def number_of_pigs(self):
         """
@@ -215,14 +523,7 @@ class Game:
         None.
 
         """
-        n_players = len(self.players)
-        if n_players == 2:
-            n_pigs = 5
-        elif n_players == 3:
-            n_pigs = 4
-        elif n_players == 4:
-            n_pigs = 3
-        return n_pigs
+        return self.config.get_n_pigs(len(self.players))
 
     # init cards hand
     def init_cards_hand(self):
@@ -242,8 +543,7 @@ class Game:
         """
         for player in self.players:
             for i in range(3):
-                new_card = self.deck.deal_card()
-                player.add_card_to_hand(new_card)
+                self.deal_card(player)
 
 # game
     def play_card(self):
@@ -269,7 +569,7 @@ class Game:
             activations = possible_moves
             # in this case: the card is being used on all the pigcards
         else:
-            activations = [self.choose_move(possible_moves)]
+            activations = [self.choose_move(possible_moves, card_type)]
             # the card is only being used on the move the player chose
         return card, activations
 
@@ -314,9 +614,13 @@ class Game:
             All the cards that got destroyed and have to be created again.
 
         """
+        destroyed_cards = list()
         for target_player, target_pig in activations:
-            updated_pig, destroyed_cards = card.activate_card(target_pig)
+            updated_pig, destroyed = card.activate_card(target_pig)
             target_player.update_card_table(updated_pig)
+            # STORM can destroy the upgrades of several pigs at once
+            if destroyed:
+                destroyed_cards.extend(destroyed)
         return destroyed_cards
 
     def show_all_cards_on_table(self):
@@ -334,7 +638,7 @@ class Game:
 
         """
         for player in self.players:
-            player.show_cards_on_table()
+            self.output(player.get_cards_table_text())
 
     def replace_hand_card(self, card):
         """
@@ -351,8 +655,7 @@ class Game:
 
         """
         self.active_player.del_card_hand(card)
-        new_card = self.deck.deal_card()
-        self.active_player.add_card_to_hand(new_card)
+        self.deal_card(self.active_player)
 
     def change_all_cards(self):
         """
@@ -370,9 +673,8 @@ class Game:
         for i in range(3):
             old_card = self.active_player.get_card_hand(1)
             self.active_player.del_card_hand(old_card)
-            self.deck.add_card_to_discard_pile(old_card)
-            new_card = self.deck.deal_card()
-            self.active_player.add_card_to_hand(new_card)
+            self.discard_card(old_card)
+            self.deal_card(self.active_player)
 
     def add_destroyed_cards_to_discard_pile(self, cards_type):
         """
@@ -390,6 +692,95 @@ class Game:
         """
         for card_type in cards_type:
             self.deck.add_destroyed_card_to_discard_pile(card_type)
+            self.notify("destroyed", card_type)
+
+    def deal_card(self, player):
+        """
+        Deals a card from the deck to the hand of a player. If the draw deck
+        is empty, the deck creates a new one from the discard pile.
+
+        Parameters
+        ----------
+        player : Player
+            The player who gets the card.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.deck.deck_has_cards():
+            self.notify("reshuffle")
+        new_card = self.deck.deal_card()
+        player.add_card_to_hand(new_card)
+        self.notify("deal", self.players.index(player), new_card.get_card_type())
+
+    def discard_card(self, card):
+        """
+        Moves a card of the active player to the discard pile.
+
+        Parameters
+        ----------
+        card : Card
+            The card which is discarded.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.deck.add_card_to_discard_pile(card)
+        self.notify("discard", self.players.index(self.active_player),
+                    card.get_card_type())
+
+    def add_listener(self, listener):
+        """
+        Registers a function that is called with every game event. The
+        function gets the name of the event and its arguments, players are
+        given by their index in self.players and cards by their key word:
+        "setup", n_players, n_pigs      : the pigs are on the table
+        "deal", n_player, card_type     : a card is dealt to a player
+        "discard", n_player, card_type  : a hand card is discarded
+        "play", n_player, card_type, target
+                                        : a player has played a card, target
+                                          is (n_player, pig number) of the
+                                          pig, None for RAIN and STORM
+        "change", n_player, card_type   : a player changes a card
+        "change_all", n_player          : a player changes all cards
+        "destroyed", card_type          : a destroyed upgrade is discarded
+        "reshuffle"                     : the discard pile becomes the draw deck
+        "winner", n_player              : a player has won
+
+        Parameters
+        ----------
+        listener : function
+            The function to call.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.listeners.append(listener)
+
+    def notify(self, event, *args):
+        """
+        Calls all listeners with an event.
+
+        Parameters
+        ----------
+        event : string
+            Name of the event (see add_listener).
+        args : tuple
+            Arguments of the event.
+
+        Returns
+        -------
+        None.
+
+        """
+        for listener in self.listeners:
+            listener(event, *args)
 
     def can_player_play_card(self, hand_cards):
         """
@@ -433,7 +824,8 @@ class Game:
                 winner = False
         if winner:
             self.running = False
-            print(Back.GREEN + "\nDer Gewinner ist " + self.active_player.get_name() + Style.RESET_ALL)
+            self.notify("winner", self.players.index(self.active_player))
+            self.output(Back.GREEN + "\nDer Gewinner ist " + self.active_player.get_name() + Style.RESET_ALL)
 
 # interaction players
     def choose_play_or_change_card(self):
@@ -454,9 +846,7 @@ class Game:
         """
         valid_input = False
         while not valid_input:
-            choice = input("\n1: Spiele eine Karte\n" +
-                           "2: Wechsle eine Karte\n" +
-                           "Willst du eine Karte spielen oder eine Karte wechseln? [1/2] ")
+            choice = self.get_input(self.prompts["play_or_change"])
             valid_input = self.validate.choose_play_or_change_card(choice)
         return int(choice)
 
@@ -477,12 +867,10 @@ class Game:
             valid choice.
 
         """
-        print("Du kannst keine Karte spielen")
+        self.output("Du kannst keine Karte spielen")
         valid_input = False
         while not valid_input:
-            choice = input("\n1: Wechsle eine Karte\n" +
-                           "2: Wechsle alle Karten\n" +
-                           "Willst du eine Karte wechseln oder alle Karten wechseln? [1/2] ")
+            choice = self.get_input(self.prompts["change_one_or_all"])
             valid_input = self.validate.choose_to_change_one_or_all_cards(choice)
         return int(choice)
 
@@ -507,13 +895,13 @@ class Game:
         valid_input = False
         while not valid_input:
             if not change:
-                choice = input("Welche Karte willst du spielen? [1/2/3] ")
+                choice = self.get_input(self.prompts["play_card"])
             else:
-                choice = input("Welche Karte willst du wechseln? [1/2/3] ")
+                choice = self.get_input(self.prompts["change_card"])
             valid_input = self.validate.choose_card(choice)
         return int(choice)
 
-    def choose_move(self, possible_moves):
+    def choose_move(self, possible_moves, card_type=None):
         """
         Lets the user choose one of the possible moves. It will retry until the 
         user has entered a valid choice.
@@ -523,6 +911,9 @@ class Game:
         possible_moves : list
             This list contains all the possible moves in form of a tuple. The 
             tuple contains the player and the associated pig.
+        card_type : string
+            Key word of the played card, used for the hints. If not given, no
+            hints are shown next to the moves.
         
         Returns
         -------
@@ -533,8 +924,8 @@ class Game:
         """
         valid_input = False
         while not valid_input:
-            self.show_possible_moves(possible_moves)
-            choice = input("Wo willst du diese Karte spielen? ")
+            self.show_possible_moves(possible_moves, card_type)
+            choice = self.get_input(self.prompts["move"])
             valid_input = self.validate.choose_move(choice, possible_moves)
         move = possible_moves[int(choice) - 1]
         return move
@@ -562,7 +953,7 @@ class Game:
         possible_moves = self.card_map[card_type]()
         return possible_moves
 
-    def show_possible_moves(self, possible_moves):
+    def show_possible_moves(self, possible_moves, card_type=None):
         """
         Prints all the possible moves for a specific card in order to give the 
         player a selection of moves
@@ -572,6 +963,9 @@ class Game:
         possible_moves : list
             This list contains all the possible moves in form of a tuple. The 
             tuple contains the player and the associated pig.
+        card_type : string
+            Key word of the played card. If given and the hints are on, the
+            estimated win probability is shown next to every move.
         
         Returns
         -------
@@ -579,14 +973,107 @@ class Game:
 
         """
         counter = 1
-        print("\nMögliche Züge für diese Karte")
+        self.output("\nMögliche Züge für diese Karte")
         for player, pig in possible_moves:
             n_pig = pig.get_pig_number()
             player_name = player.get_name()
             if player == self.active_player:
                 player_name = "Eigenes"
-            print(str(counter) + ": " + player_name + "'s Schwein " + str(n_pig))
+            hint = ""
+            if card_type is not None and self.hint_engine is not None:
+                move = (self.players.index(player), TableState.pig_to_flags(pig))
+                hint = self.format_hint(("PLAY", card_type, move))
+            self.output(str(counter) + ": " + player_name + "'s Schwein " + str(n_pig) + hint)
+            counter += 1
+
+# hints
+    def get_input(self, prompt):
+        """
+        Asks the user for an input. If the hints are on, the user can enter h
+        to see the current estimates and is asked again.
+
+        Parameters
+        ----------
+        prompt : string
+            The text of the question.
+
+        Returns
+        -------
+        answer : string
+            The answer of the user.
+
+        """
+        answer = input(prompt)
+        while self.hint_engine is not None and answer.strip().lower() == "h":
+            self.show_hints()
+            answer = input(prompt)
+        return answer
+
+    def format_hint(self, option):
+        """
+        Returns the estimated win probability of an option as text.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+
+        Returns
+        -------
+        hint : string
+            The text, empty if there is no estimate yet.
+
+        """
+        win_probability, rollouts = self.hint_engine.get_estimate(option)
+        if win_probability is None:
+            return ""
+        return " (Gewinnchance %d%%, %d Simulationen)" % (round(100 * win_probability), rollouts)
+
+    def show_hints(self):
+        """
+        Prints the hint panel: for every hand card the estimated win
+        probability of its best move and of changing it, and of changing all
+        cards if this is possible. The last line shows the chances of the
+        next drawn card from the counted cards.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        estimates = self.hint_engine.get_estimates()
+        self.output("\nHinweise:")
+        counter = 1
+        for card in self.active_player.get_cards_hand():
+            card_type = card.get_card_type()
+            line = str(counter) + ": " + card.get_name()
+            plays = [option for option in estimates
+                     if option[0] == "PLAY" and option[1] == card_type
+                     and estimates[option][0] is not None]
+            if plays:
+                best = max(plays, key=lambda option: estimates[option][0])
+                line += ", spielen:" + self.format_hint(best)
+            change = self.format_hint(("CHANGE", card_type))
+            if change:
+                line += ", wechseln:" + change
+            self.output(line)
             counter += 1
+        change_all = self.format_hint(("CHANGE_ALL",))
+        if change_all:
+            self.output("Alle Karten wechseln:" + change_all)
+        probabilities, mud_draws = self.hint_engine.get_draw_outlook(
+            self.players.index(self.active_player))
+        if probabilities:
+            line = "Nächste Karte: " + ", ".join(
+                "%s %d%%" % (Card.action_card_types[card_type], round(100 * probability))
+                for card_type, probability in probabilities.items())
+            if mud_draws != float("inf"):
+                line += ", Matschkarte in %.1f Karten" % mud_draws
+            self.output(line)
 
     def mud(self):
         """
@@ -960,3 +1447,14 @@ if __name__ == "__main__":
     
     
 
+    # Method: execute_option
+    print("\nTest: method execute_option refuses illegal options")
+    drecksau.active_player = drecksau.players[0]
+    drecksau.players[0].cards_hand = [ActionCard("MUD"), ActionCard("MUD"), ActionCard("MUD")]
+    for option in (("CHANGE", "STORM"), ("PLAY", "STORM", None), ("PLAY", "MUD", (1, 0))):
+        try:
+            drecksau.execute_option(option)
+            print("(Expected value: ValueError). Value: None")
+        except ValueError:
+            print("(Expected value: ValueError). Value: ValueError")
+    print("(Expected value: 3). Value: ", len(drecksau.players[0].cards_hand))
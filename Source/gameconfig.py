@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+""" Configuration of the deck composition and the pigs per player """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+
+
+class GameConfig:
+    # The rules of the original game
+    default_card_counts = {
+        "MUD"                   : 21,
+        "RAIN"                  : 4,
+        "LIGHTNING"             : 4,
+        "FARMER_CLEANS"         : 8,
+        "STORM"                 : 1,
+        "STALL"                 : 9,
+        "LIGHTNING_CONDUCTOR"   : 4,
+        "ANNOY_FARMER"          : 4,
+    }
+    default_pigs = {2: 5, 3: 4, 4: 3}
+    hand_size = 3
+    max_deck_size = 255
+
+    def __init__(self, card_counts=None, pigs=None):
+        # card_counts: number of cards per action and upgrade card type,
+        # missing types keep the default count. pigs: number of pigs per
+        # player for every number of players, the game has 2 to 4 players.
+        # The number of pigs is a 3 bit field in the SETUP event of eventlog
+        # and in the keyframes of statesync, so there are at most 7 pigs per
+        # player. statesync sends the sizes of the draw deck and the discard
+        # pile in one byte each, so the deck has at most 255 cards. Action
+        # cards always go back to the discard pile, so there must be more of
+        # them than all hands can hold, otherwise a card could not be dealt.
+        self.card_counts = dict(self.default_card_counts)
+        if card_counts:
+            for card_type, count in card_counts.items():
+                if card_type not in self.card_counts:
+                    raise ValueError("Unbekannte Karte " + str(card_type))
+                self.card_counts[card_type] = count
+        self.pigs = dict(self.default_pigs)
+        if pigs:
+            self.pigs.update(pigs)
+
+        if any(n_players not in self.default_pigs for n_players in self.pigs):
+            raise ValueError("Das Spiel hat 2 bis 4 Spieler")
+        if any(count < 0 for count in self.card_counts.values()):
+            raise ValueError("Negative Anzahl Karten")
+        if any(not 1 <= n_pigs <= 7 for n_pigs in self.pigs.values()):
+            raise ValueError("Jeder Spieler braucht 1 bis 7 Schweine")
+        if self.get_deck_size() > self.max_deck_size:
+            raise ValueError("Das Deck hat höchstens %d Karten" % self.max_deck_size)
+        n_action_cards = sum(self.card_counts[card_type] for card_type in Card.action_card_types)
+        if n_action_cards <= self.hand_size * max(self.pigs):
+            raise ValueError("Zu wenige Aktionskarten für %d Spieler" % max(self.pigs))
+
+    def get_n_pigs(self, n_players):
+        """
+        Returns the number of pigs per player.
+
+        Parameters
+        ----------
+        n_players : int
+            Number of players.
+
+        Returns
+        -------
+        n_pigs : int
+            Number of pigs per player.
+
+        """
+        return self.pigs[n_players]
+
+    def get_deck_size(self):
+        """
+        Returns the number of cards of the deck.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        deck_size : int
+            Number of cards.
+
+        """
+        return sum(self.card_counts.values())
+
+    def get_key(self):
+        """
+        Returns a text that identifies the configuration, e.g. for the deck
+        column of resultdb.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        key : string
+            E.g. "MUD=21,RAIN=4,...;2=5,3=4,4=3".
+
+        """
+        return (",".join("%s=%d" % item for item in self.card_counts.items()) + ";"
+                + ",".join("%d=%d" % item for item in sorted(self.pigs.items())))
+
+    @staticmethod
+    def from_key(key):
+        """
+        Returns the configuration of a key (see get_key).
+
+        Parameters
+        ----------
+        key : string
+            E.g. "MUD=21,RAIN=4,...;2=5,3=4,4=3".
+
+        Returns
+        -------
+        config : GameConfig
+            The configuration.
+
+        """
+        cards, pigs = key.split(";")
+        card_counts = {card_type: int(count) for card_type, count
+                       in (item.split("=") for item in cards.split(","))}
+        return GameConfig(card_counts, {int(n_players): int(n_pigs) for n_players, n_pigs
+                                        in (item.split("=") for item in pigs.split(","))})
+
+    def replace(self, card_counts=None, pigs=None):
+        """
+        Returns a copy with other card counts or pigs.
+
+        Parameters
+        ----------
+        card_counts : dict
+            The changed card counts.
+        pigs : dict
+            The changed numbers of pigs per number of players.
+
+        Returns
+        -------
+        config : GameConfig
+            The new configuration.
+
+        """
+        return GameConfig({**self.card_counts, **(card_counts or {})},
+                          {**self.pigs, **(pigs or {})})
+
+    def __eq__(self, other):
+        return isinstance(other, GameConfig) and self.get_key() == other.get_key()
+
+    def __hash__(self):
+        return hash(self.get_key())
+
+    def __repr__(self):
+        return "GameConfig(" + self.get_key() + ")"
+
+
+if __name__ == "__main__":
+    print("\nTest: the default configuration has the rules of the game")
+    config = GameConfig()
+    print("(Expected value: 55). Value:", config.get_deck_size())
+    print("(Expected value: 4). Value:", config.get_n_pigs(3))
+
+    print("\nTest: replace changes only the given values")
+    changed = config.replace({"STORM": 3}, {2: 6})
+    print("(Expected value: 57). Value:", changed.get_deck_size())
+    print("(Expected value: 6). Value:", changed.get_n_pigs(2))
+    print("(Expected value: 21). Value:", changed.card_counts["MUD"])
+    print("(Expected value: True). Value:", config == GameConfig())
+    print("(Expected value: True). Value:", GameConfig.from_key(changed.get_key()) == changed)
+
+    print("\nTest: too few action cards are refused")
+    try:
+        GameConfig({"MUD": 0, "FARMER_CLEANS": 0})
+        print("Status: False")
+    except ValueError as error:
+        print("Status: True", error)
+
+    print("\nTest: other numbers of players are refused")
+    try:
+        GameConfig(pigs={5: 3})
+        print("Status: False")
+    except ValueError as error:
+        print("Status: True", error)
+
+    print("\nTest: decks with more than 255 cards are refused")
+    try:
+        GameConfig({"MUD": 240})
+        print("Status: False")
+    except ValueError as error:
+        print("Status: True", error)
@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+
+""" Secondary indexes over the game archive for content queries """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from eventlog import SETUP, PLAY, CHANGE, CHANGE_ALL, RESHUFFLE, DESTROYED
+from statesync import card_types
+
+from array import array
+import mmap
+import os
+import struct
+
+
+def get_features(data, winner=None):
+    """
+    Counts the events of a game (see eventlog) that the index knows. The
+    features are:
+    "play:<card>"               plays of a card type
+    "change"                    changed cards
+    "change_all"                changes of all cards
+    "reshuffle"                 reshuffles of the discard pile
+    "destroyed:<upgrade>:<card>" upgrades destroyed by a card type, e.g.
+                                "destroyed:STALL:STORM"
+    The features of the turns of the winner are counted again with the
+    prefix "winner:", e.g. "winner:change_all".
+
+    Parameters
+    ----------
+    data : bytes
+        The event log of one game.
+    winner : int
+        Index of the winner, None if the game has no winner.
+
+    Returns
+    -------
+    features : dict
+        Number of events per feature, features without events are missing.
+
+    """
+    features = dict()
+    n_players = 1
+    turn = 0
+    played = None
+    i = 0
+    end = len(data)
+    while i < end:
+        byte = data[i]
+        kind = byte >> 5
+        i += 1
+        if kind == PLAY:
+            if byte & 2:
+                i += 1
+            played = card_types[byte >> 2 & 7]
+            name = "play:" + played
+        elif kind == CHANGE:
+            name = "change"
+        elif kind == CHANGE_ALL:
+            name = "change_all"
+        elif kind == RESHUFFLE:
+            features["reshuffle"] = features.get("reshuffle", 0) + 1
+            continue
+        elif kind == DESTROYED:
+            name = "destroyed:" + card_types[byte & 7] + ":" + played
+            features[name] = features.get(name, 0) + 1
+            continue
+        else:
+            if kind == SETUP:
+                n_players = (byte >> 3 & 3) + 1
+            continue
+        # a turn
+        features[name] = features.get(name, 0) + 1
+        if turn % n_players == winner:
+            name = "winner:" + name
+            features[name] = features.get(name, 0) + 1
+        turn += 1
+    return features
+
+
+class IndexChunk:
+    # One index file covers n_games consecutive games of the archive,
+    # starting with first_id. It contains a header, a table with one entry
+    # per term and the data of the terms. A term is a feature (see
+    # get_features, and "turns", "winner" and "players" of the game) with a
+    # value, its data are the games of the chunk that have this value: a
+    # bitmap with one bit per game, or a posting list of 32 bit game numbers
+    # (relative to first_id) if that is smaller. Games with the value 0 of a
+    # count are not stored. Opening a chunk reads only the table.
+    magic           = b"DSGI"
+    version         = 1
+    header          = struct.Struct("<4sHIII")
+    term            = struct.Struct("<48sHBII")
+    BITMAP          = 0
+    POSTINGS        = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, first_id, n_games, n_terms = self.header.unpack_from(self.map, 0)
+        if magic != self.magic or version != self.version:
+            raise ValueError(path + " is not a Drecksau game index")
+        self.first_id = first_id
+        self.n_games = n_games
+        # values and data of every feature
+        self.terms = dict()
+        for i in range(n_terms):
+            name, value, kind, offset, length = self.term.unpack_from(
+                self.map, self.header.size + i * self.term.size)
+            name = name.rstrip(b"\0").decode()
+            self.terms.setdefault(name, dict())[value] = (kind, offset, length)
+
+    @classmethod
+    def write(cls, path, first_id, n_games, postings):
+        """
+        Writes an index file.
+
+        Parameters
+        ----------
+        path : string
+            Path of the file.
+        first_id : int
+            Id of the first game of the chunk.
+        n_games : int
+            Number of games of the chunk.
+        postings : dict
+            (feature, value) -> list of game numbers relative to first_id,
+            in ascending order.
+
+        Returns
+        -------
+        None.
+
+        """
+        table = bytearray()
+        blocks = list()
+        offset = cls.header.size + len(postings) * cls.term.size
+        for (name, value), numbers in sorted(postings.items()):
+            if len(numbers) * 32 > n_games:
+                block = bytearray((n_games + 7) // 8)
+                for number in numbers:
+                    block[number >> 3] |= 1 << (number & 7)
+                kind = cls.BITMAP
+            else:
+                block = array("I", numbers)
+                if block.itemsize != 4:
+                    block = array("L", numbers)
+                kind = cls.POSTINGS
+                block = block.tobytes()
+            table += cls.term.pack(name.encode(), value, kind, offset, len(block))
+            blocks.append(block)
+            offset += len(block)
+        # written to a temporary file, so readers never see half a chunk
+        with open(path + ".tmp", "wb") as file:
+            file.write(cls.header.pack(cls.magic, cls.version, first_id, n_games,
+                                       len(postings)))
+            file.write(table)
+            for block in blocks:
+                file.write(block)
+        os.replace(path + ".tmp", path)
+
+    def get_bitset(self, feature, value):
+        """
+        Returns the games of the chunk with a value of a feature.
+
+        Parameters
+        ----------
+        feature : string
+            Name of the feature.
+        value : int
+            The value.
+
+        Returns
+        -------
+        bitset : int
+            Bit i is set if game first_id + i has the value.
+
+        """
+        term = self.terms.get(feature, {}).get(value)
+        if term is None:
+            return 0
+        kind, offset, length = term
+        if kind == self.BITMAP:
+            return int.from_bytes(self.map[offset:offset + length], "little")
+        numbers = array("I")
+        if numbers.itemsize != 4:
+            numbers = array("L")
+        numbers.frombytes(self.map[offset:offset + length])
+        bitmap = bytearray((self.n_games + 7) // 8)
+        for number in numbers:
+            bitmap[number >> 3] |= 1 << (number & 7)
+        return int.from_bytes(bitmap, "little")
+
+    def select(self, feature, minimum=None, maximum=None):
+        """
+        Returns the games of the chunk with a feature value in a range.
+
+        Parameters
+        ----------
+        feature : string
+            Name of the feature.
+        minimum : int
+            Smallest value, None for no limit.
+        maximum : int
+            Largest value, None for no limit.
+
+        Returns
+        -------
+        bitset : int
+            Bit i is set if game first_id + i matches.
+
+        """
+        values = self.terms.get(feature, {})
+        low = minimum or 0
+        high = float("inf") if maximum is None else maximum
+        bitset = 0
+        if low > 0:
+            for value in values:
+                if low <= value <= high:
+                    bitset |= self.get_bitset(feature, value)
+            return bitset
+        # games without a term have the value 0 and match
+        for value in values:
+            if value > high:
+                bitset |= self.get_bitset(feature, value)
+        return ((1 << self.n_games) - 1) & ~bitset
+
+    def close(self):
+        """
+        Closes the memory map and the file.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.map.close()
+        self.file.close()
+
+
+class GameIndex:
+
+    def __init__(self, directory):
+        # The index files "index-<first id>.idx" of an archive directory
+        # (see GameArchive), built by build_index.
+        self.directory = directory
+        self.chunks = list()
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("index-") and name.endswith(".idx"):
+                self.chunks.append(IndexChunk(os.path.join(directory, name)))
+        self.chunks.sort(key=lambda chunk: chunk.first_id)
+
+    def __len__(self):
+        return sum(chunk.n_games for chunk in self.chunks)
+
+    def evaluate(self, chunk, conditions):
+        """
+        Returns the games of a chunk that meet all conditions.
+
+        Parameters
+        ----------
+        chunk : IndexChunk
+            The chunk.
+        conditions : list
+            (feature, minimum, maximum) tuples, see IndexChunk.select.
+
+        Returns
+        -------
+        bitset : int
+            Bit i is set if game chunk.first_id + i matches.
+
+        """
+        bitset = (1 << chunk.n_games) - 1
+        for feature, minimum, maximum in conditions:
+            bitset &= chunk.select(feature, minimum, maximum)
+            if not bitset:
+                break
+        return bitset
+
+    def query(self, conditions):
+        """
+        Returns the games that meet all conditions, e.g.
+        [("destroyed:STALL:STORM", 3, None), ("turns", None, 19)].
+
+        Parameters
+        ----------
+        conditions : list
+            (feature, minimum, maximum) tuples, None is no limit.
+
+        Returns
+        -------
+        game_ids : list
+            Ids of the matching games in ascending order.
+
+        """
+        game_ids = list()
+        for chunk in self.chunks:
+            bitmap = self.evaluate(chunk, conditions).to_bytes((chunk.n_games + 7) // 8,
+                                                              "little")
+            for n_byte, byte in enumerate(bitmap):
+                while byte:
+                    low_bit = byte & -byte
+                    game_ids.append(chunk.first_id + n_byte * 8 + low_bit.bit_length() - 1)
+                    byte ^= low_bit
+        return game_ids
+
+    def count(self, conditions):
+        """
+        Returns the number of games that meet all conditions.
+
+        Parameters
+        ----------
+        conditions : list
+            (feature, minimum, maximum) tuples, None is no limit.
+
+        Returns
+        -------
+        n_games : int
+            Number of matching games.
+
+        """
+        return sum(bin(self.evaluate(chunk, conditions)).count("1") for chunk in self.chunks)
+
+    def close(self):
+        """
+        Closes the index files.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        for chunk in self.chunks:
+            chunk.close()
+
+
+def build_index(archive, chunk_size=1 << 20):
+    """
+    Scans the archive once and writes the index files of its games. Chunks
+    that are complete already are kept, so after appending games only the
+    new ones are scanned.
+
+    Parameters
+    ----------
+    archive : GameArchive
+        The archive, the index files are written to its directory.
+    chunk_size : int
+        Number of games per index file.
+
+    Returns
+    -------
+    n_scanned : int
+        Number of scanned games.
+
+    """
+    n_games = len(archive)
+    n_scanned = 0
+    for first_id in range(0, n_games, chunk_size):
+        path = os.path.join(archive.directory, "index-%012d.idx" % first_id)
+        size = min(chunk_size, n_games - first_id)
+        if os.path.exists(path):
+            chunk = IndexChunk(path)
+            complete = chunk.n_games == size
+            chunk.close()
+            if complete:
+                continue
+        postings = dict()
+        for number in range(size):
+            game_id = first_id + number
+            data = archive.get_game(game_id)
+            info = archive.get_info(game_id)
+            features = get_features(data, info["winner"])
+            features["turns"] = info["turns"]
+            features["players"] = (data[0] >> 3 & 3) + 1
+            if info["winner"] is not None:
+                features["winner"] = info["winner"] + 1
+            for feature, value in features.items():
+                postings.setdefault((feature, min(value, 65535)), []).append(number)
+        IndexChunk.write(path, first_id, size, postings)
+        n_scanned += size
+    return n_scanned
+
+
+if __name__ == "__main__":
+    from archive import GameArchive, record_games
+    from eventlog import read_events
+    import shutil
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    record_games(directory, 0, 3000, 100)
+    archive = GameArchive(directory)
+
+    start = time.perf_counter()
+    print("\nScanned %d games" % build_index(archive, chunk_size=1024))
+    print("Build: %.1f µs per game" % ((time.perf_counter() - start) / len(archive) * 1e6))
+    record_games(directory, 3000, 500, 100)
+    print("After appending 500 games: scanned %d games" % build_index(archive, chunk_size=1024))
+    size = sum(os.path.getsize(os.path.join(directory, name))
+               for name in os.listdir(directory) if name.startswith("index-"))
+    print("Index: %.1f bytes per game" % (size / len(archive)))
+
+    def scan(game_id):
+        info = archive.get_info(game_id)
+        stalls = 0
+        winner_change_all = 0
+        played = None
+        for event in read_events(archive.get_game(game_id)):
+            if event[0] == "play":
+                played = event[2]
+            elif event == ("destroyed", "STALL") and played == "STORM":
+                stalls += 1
+            elif event[0] == "change_all" and event[1] == info["winner"]:
+                winner_change_all += 1
+        return stalls, info["turns"], winner_change_all
+
+    queries = [
+        ("STORM wiped three or more stalls", [("destroyed:STALL:STORM", 3, None)],
+         lambda stalls, turns, winner_change_all: stalls >= 3),
+        ("won in under 20 turns", [("winner", 1, None), ("turns", None, 19)],
+         lambda stalls, turns, winner_change_all: turns < 20),
+        ("winner changed all cards at least twice", [("winner:change_all", 2, None)],
+         lambda stalls, turns, winner_change_all: winner_change_all >= 2),
+        ("no reshuffle and over 40 turns", [("reshuffle", None, 0), ("turns", 41, None)],
+         None),
+    ]
+    index = GameIndex(directory)
+    scanned = [scan(game_id) for game_id in range(len(archive))]
+    print("\nTest: queries return the games of a full scan")
+    for title, conditions, check in queries:
+        start = time.perf_counter()
+        game_ids = index.query(conditions)
+        elapsed = time.perf_counter() - start
+        if check is not None:
+            expected = [game_id for game_id in range(len(archive)) if check(*scanned[game_id])]
+            print("(Expected value: True). Value:", game_ids == expected, end=" ")
+        print("%s: %d games, %.2f ms" % (title, len(game_ids), elapsed * 1000))
+    index.close()
+    archive.close()
+    shutil.rmtree(directory)
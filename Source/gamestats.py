@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+
+""" Streaming statistics of many games with mergeable sketches """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from eventlog import SETUP, PLAY, RESHUFFLE
+from replay import Replayer
+from statesync import card_types
+from tablestate import TableState
+
+from collections import Counter
+import math
+
+
+class QuantileSketch:
+
+    def __init__(self, relative_accuracy=0.01):
+        # Counts the values in buckets whose bounds grow by the factor gamma,
+        # so every quantile is returned with at most relative_accuracy
+        # relative error. The number of buckets grows only with the log of
+        # the largest value and two sketches are merged by adding their
+        # buckets. Values below 1 are counted in one bucket.
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.n_values = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value, count=1):
+        """
+        Adds a value.
+
+        Parameters
+        ----------
+        value : float
+            The value.
+        count : int
+            Number of times the value is added.
+
+        Returns
+        -------
+        None.
+
+        """
+        key = math.ceil(math.log(value) / self.log_gamma) if value >= 1 else 0
+        self.buckets[key] += count
+        self.n_values += count
+        self.total += value * count
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        """
+        Adds the values of another sketch with the same accuracy.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            The other sketch.
+
+        Returns
+        -------
+        None.
+
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches mit verschiedener Genauigkeit")
+        self.buckets.update(other.buckets)
+        self.n_values += other.n_values
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def get_quantile(self, q):
+        """
+        Returns a quantile of the values.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        value : float
+            The estimated quantile, None if there are no values.
+
+        """
+        if not self.n_values:
+            return None
+        rank = q * (self.n_values - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                break
+        if key == 0:
+            return max(self.minimum, 0.0) if self.minimum < 1 else 1.0
+        value = 2 * self.gamma ** key / (self.gamma + 1)
+        return min(max(value, self.minimum), self.maximum)
+
+    def get_mean(self):
+        """
+        Returns the mean of the values.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        mean : float
+            The mean, None if there are no values.
+
+        """
+        return self.total / self.n_values if self.n_values else None
+
+
+class GameResult:
+    # The result of one game: number of players, index of the winner (None
+    # if there is none), number of turns, plays per card type, number of
+    # turns in which the active player could not play a card (see
+    # Game.can_player_play_card) and number of reshuffles.
+    __slots__ = ("n_players", "winner", "turns", "plays", "blocked_turns", "reshuffles")
+
+    def __init__(self, n_players, winner, turns, plays, blocked_turns=0, reshuffles=0):
+        self.n_players = n_players
+        self.winner = winner
+        self.turns = turns
+        self.plays = plays
+        self.blocked_turns = blocked_turns
+        self.reshuffles = reshuffles
+
+
+class GameStatistics:
+
+    def __init__(self, relative_accuracy=0.01):
+        # Running aggregates of a stream of GameResult objects. The memory
+        # does not depend on the number of games: there are counters per
+        # (players, seat) and per card type and a QuantileSketch of the
+        # turns. Statistics of shards are combined with merge.
+        self.games = Counter()
+        self.wins = Counter()
+        self.plays = Counter({card_type: 0 for card_type in Card.all_types})
+        self.turns = QuantileSketch(relative_accuracy)
+        self.n_games = 0
+        self.n_turns = 0
+        self.blocked_turns = 0
+        self.blocked_games = 0
+        self.reshuffles = 0
+        self.reshuffled_games = 0
+
+    def add(self, result):
+        """
+        Adds the result of a game.
+
+        Parameters
+        ----------
+        result : GameResult
+            The result.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.n_games += 1
+        self.games[result.n_players] += 1
+        if result.winner is not None:
+            self.wins[(result.n_players, result.winner)] += 1
+        self.turns.add(result.turns)
+        self.n_turns += result.turns
+        self.plays.update(result.plays)
+        self.blocked_turns += result.blocked_turns
+        self.blocked_games += result.blocked_turns > 0
+        self.reshuffles += result.reshuffles
+        self.reshuffled_games += result.reshuffles > 0
+
+    def consume(self, results):
+        """
+        Adds all results of a stream.
+
+        Parameters
+        ----------
+        results : iterable
+            GameResult objects, e.g. from parse_games.
+
+        Returns
+        -------
+        statistics : GameStatistics
+            The statistics itself.
+
+        """
+        for result in results:
+            self.add(result)
+        return self
+
+    def merge(self, other):
+        """
+        Adds the statistics of another shard.
+
+        Parameters
+        ----------
+        other : GameStatistics
+            The statistics of the other shard.
+
+        Returns
+        -------
+        statistics : GameStatistics
+            The statistics itself.
+
+        """
+        self.games.update(other.games)
+        self.wins.update(other.wins)
+        self.plays.update(other.plays)
+        self.turns.merge(other.turns)
+        self.n_games += other.n_games
+        self.n_turns += other.n_turns
+        self.blocked_turns += other.blocked_turns
+        self.blocked_games += other.blocked_games
+        self.reshuffles += other.reshuffles
+        self.reshuffled_games += other.reshuffled_games
+        return self
+
+    def get_report(self):
+        """
+        Returns the statistics.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        report : dict
+            The statistics.
+
+        """
+        n_games = self.n_games or 1
+        n_turns = self.n_turns or 1
+        return {
+            "games"             : self.n_games,
+            "win_rate"          : {(n_players, seat): self.wins[(n_players, seat)] / n
+                                   for n_players, n in sorted(self.games.items())
+                                   for seat in range(n_players)},
+            "turns_mean"        : self.turns.get_mean(),
+            "turns_quantiles"   : {q: self.turns.get_quantile(q)
+                                   for q in (0.01, 0.1, 0.5, 0.9, 0.99)},
+            "plays"             : dict(self.plays),
+            "plays_per_game"    : {card_type: count / n_games
+                                   for card_type, count in self.plays.items()},
+            "blocked_turn_rate" : self.blocked_turns / n_turns,
+            "blocked_game_rate" : self.blocked_games / n_games,
+            "reshuffles_per_game": self.reshuffles / n_games,
+            "reshuffled_game_rate": self.reshuffled_games / n_games,
+        }
+
+
+def read_log_file(file, block_size=1 << 20):
+    """
+    Reads a file of concatenated event logs (see eventlog) block by block.
+
+    Parameters
+    ----------
+    file : file
+        The binary file.
+    block_size : int
+        Number of bytes per read.
+
+    Yields
+    ------
+    data : bytes
+        The event log of one game.
+
+    """
+    buffer = b""
+    begin = 0
+    i = 0
+    while True:
+        block = file.read(block_size)
+        buffer = buffer[begin:] + block
+        i -= begin
+        begin = 0
+        while i < len(buffer):
+            byte = buffer[i]
+            if byte >> 5 == SETUP and i > begin:
+                yield buffer[begin:i]
+                begin = i
+            # a PLAY with target has a second byte, it may be in the next block
+            step = 2 if byte >> 5 == PLAY and byte & 2 else 1
+            if i + step > len(buffer) and block:
+                break
+            i += step
+        if not block:
+            break
+    if begin < len(buffer):
+        yield buffer[begin:]
+
+
+def read_archive(archive, start=0, stop=None):
+    """
+    Reads the games of an archive (see GameArchive) one by one.
+
+    Parameters
+    ----------
+    archive : GameArchive
+        The archive.
+    start : int
+        Id of the first game.
+    stop : int
+        Id after the last game, None for the end of the archive.
+
+    Yields
+    ------
+    data : bytes
+        The event log of one game.
+
+    """
+    for game_id in range(start, len(archive) if stop is None else stop):
+        yield archive.get_game(game_id)
+
+
+def parse_games(logs, config=None):
+    """
+    Turns event logs into game results. The turns in which the active player
+    could not play a card are found by replaying the game.
+
+    Parameters
+    ----------
+    logs : iterable
+        The event logs, one per game.
+    config : GameConfig
+        The deck composition of the games, by default the rules of the game.
+
+    Yields
+    ------
+    result : GameResult
+        The result of the game.
+
+    """
+    n_cards = len(card_types)
+    for data in logs:
+        replayer = Replayer(data, keyframe_interval=1, config=config)
+        plays = [0] * n_cards
+        reshuffles = 0
+        i = 0
+        end = len(data)
+        while i < end:
+            byte = data[i]
+            kind = byte >> 5
+            if kind == PLAY:
+                plays[byte >> 2 & 7] += 1
+                if byte & 2:
+                    i += 1
+            elif kind == RESHUFFLE:
+                reshuffles += 1
+            i += 1
+
+        blocked_turns = 0
+        for offset, state in replayer.keyframes[:replayer.n_turns]:
+            n_players = len(state.pigs)
+            table = TableState([[flags_list.count(flags) for flags in range(16)]
+                                for flags_list in state.pigs], state.turn % n_players)
+            hand = state.hands[table.active]
+            if not any(table.can_play_card(card_types[card]) for card in set(hand)):
+                blocked_turns += 1
+        yield GameResult(len(replayer.keyframes[0][1].pigs), replayer.winner,
+                         replayer.n_turns,
+                         {card_types[card]: count for card, count in enumerate(plays) if count},
+                         blocked_turns, reshuffles)
+
+
+def compute_shard(directory, start, stop):
+    """
+    Computes the statistics of a range of an archive. Used by the worker
+    processes of the demo.
+
+    Parameters
+    ----------
+    directory : string
+        Directory of the archive.
+    start : int
+        Id of the first game.
+    stop : int
+        Id after the last game.
+
+    Returns
+    -------
+    statistics : GameStatistics
+        The statistics of the games.
+
+    """
+    from archive import GameArchive
+
+    archive = GameArchive(directory)
+    statistics = GameStatistics().consume(parse_games(read_archive(archive, start, stop)))
+    archive.close()
+    return statistics
+
+
+if __name__ == "__main__":
+    from archive import GameArchive, record_games
+    import multiprocessing
+    import os
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    directory = tempfile.mkdtemp()
+    record_games(directory, 0, 2000, 100)
+    archive = GameArchive(directory)
+
+    print("\nTest: merged shards give the statistics of one pass")
+    start = time.perf_counter()
+    whole = GameStatistics().consume(parse_games(read_archive(archive)))
+    elapsed = time.perf_counter() - start
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(4) as pool:
+        shards = pool.starmap(compute_shard, [(directory, i * 500, (i + 1) * 500)
+                                              for i in range(4)])
+    merged = GameStatistics()
+    for shard in shards:
+        merged.merge(shard)
+    print("(Expected value: True). Value:", merged.get_report() == whole.get_report())
+    print("%.1f µs per game" % (elapsed / whole.n_games * 1e6))
+
+    print("\nTest: a log file gives the statistics of the archive")
+    path = os.path.join(directory, "games.log")
+    with open(path, "wb") as file:
+        for data in read_archive(archive):
+            file.write(data)
+    with open(path, "rb") as file:
+        from_file = GameStatistics().consume(parse_games(read_log_file(file, 4096)))
+    print("(Expected value: True). Value:", from_file.get_report() == whole.get_report())
+
+    print("\nTest: the memory does not grow with the number of games")
+    for n_games in (200, 2000):
+        tracemalloc.start()
+        GameStatistics().consume(parse_games(read_archive(archive, 0, n_games)))
+        print("%5d games: peak %d kB" % (n_games, tracemalloc.get_traced_memory()[1] // 1024))
+        tracemalloc.stop()
+
+    report = whole.get_report()
+    print("\nWin rate (players, seat):", {key: round(value, 3)
+                                          for key, value in report["win_rate"].items()})
+    print("Turns: mean %.1f, quantiles %s" % (report["turns_mean"], report["turns_quantiles"]))
+    print("Plays per game:", {key: round(value, 2)
+                              for key, value in report["plays_per_game"].items()})
+    print("Blocked turns: %.3f, reshuffles per game: %.2f"
+          % (report["blocked_turn_rate"], report["reshuffles_per_game"]))
+    archive.close()
+    shutil.rmtree(directory)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+""" Greedy bot """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from compactgame import CompactGame
+from tablestate import TableState
+
+
+class GreedyBot:
+    # Weights of the static evaluation of a pig. The value of a table is the
+    # sum of the values of its pigs, so the value of every bucket is computed
+    # once and a move only changes the value of one bucket.
+    weights = {
+        "dirty"                 : 1.0,   # own dirty pigs
+        "stall"                 : 0.2,   # stalls protect against RAIN
+        "dirty_stall"           : 0.3,   # dirty pig which is safe from RAIN
+        "door"                  : 0.2,   # doors protect against FARMER_CLEANS
+        "dirty_door"            : 0.3,   # dirty pig which is safe from the farmer
+        "lightning_conductor"   : 0.15,  # stall is safe from LIGHTNING
+        "lightning_exposure"    : 0.1,   # stall without lightning conductor
+    }
+    win_score = 1000.0
+
+    def __init__(self, weights=None):
+        if weights is not None:
+            self.weights = dict(self.weights, **weights)
+        self.bucket_values = tuple(self.get_bucket_value(flags)
+                                   for flags in range(TableState.n_buckets))
+
+    def get_bucket_value(self, flags):
+        """
+        Computes the static value of one pig.
+
+        Parameters
+        ----------
+        flags : int
+            The bucket of the pig (see TableState).
+
+        Returns
+        -------
+        value : float
+            The value of the pig for its owner.
+
+        """
+        weights = self.weights
+        dirty = flags & TableState.DIRTY
+        value = weights["dirty"] if dirty else 0.0
+        if flags & TableState.STALL:
+            value += weights["stall"]
+            if dirty:
+                value += weights["dirty_stall"]
+            if flags & TableState.DOOR:
+                value += weights["door"]
+                if dirty:
+                    value += weights["dirty_door"]
+            if flags & TableState.LIGHTNING_CONDUCTOR:
+                value += weights["lightning_conductor"]
+            else:
+                value -= weights["lightning_exposure"] * (2 if dirty else 1)
+        return value
+
+    def score_card(self, table, card_type):
+        """
+        Scores all possible moves of a card by the change of the own table
+        value minus the change of the opponents table values.
+
+        Parameters
+        ----------
+        table : TableState
+            The tables, the active player is the deciding player.
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        best_score : float
+            Score of the best move, None if the card cannot be played.
+        best_move : tuple
+            The best move (None for RAIN and STORM).
+
+        """
+        active = table.active
+        values = self.bucket_values
+        playable = TableState.playable[card_type]
+        transitions = TableState.transitions[card_type]
+        clean_pigs = table.clean_pigs(active)
+        best_score = None
+        best_move = None
+
+        if card_type in TableState.area_card_types:
+            if not table.can_play_card(card_type):
+                return None, None
+            score = 0.0
+            own_clean = clean_pigs
+            for n_player in table.get_target_players(card_type):
+                counts = table.tables[n_player]
+                sign = 1.0 if n_player == active else -1.0
+                for flags in range(TableState.n_buckets):
+                    if counts[flags] and playable[flags]:
+                        new_flags = transitions[flags][0]
+                        score += sign * counts[flags] * (values[new_flags] - values[flags])
+                        if n_player == active:
+                            own_clean += counts[flags] * ((flags & 1) - (new_flags & 1))
+            if not own_clean:
+                score += self.win_score
+            return score, None
+
+        for n_player in table.get_target_players(card_type):
+            counts = table.tables[n_player]
+            for flags in range(TableState.n_buckets):
+                if counts[flags] and playable[flags]:
+                    new_flags = transitions[flags][0]
+                    if n_player == active:
+                        score = values[new_flags] - values[flags]
+                        if clean_pigs == 1 and not flags & 1 and new_flags & 1:
+                            score += self.win_score
+                    else:
+                        score = values[flags] - values[new_flags]
+                    if best_score is None or score > best_score:
+                        best_score = score
+                        best_move = (n_player, flags)
+        return best_score, best_move
+
+    def choose(self, table, hand):
+        """
+        Chooses the option for a hand. The best move is played if it improves
+        the position. Otherwise the card with the worst move is changed, or
+        all cards if no card can be played.
+
+        Parameters
+        ----------
+        table : TableState
+            The tables, the active player is the deciding player.
+        hand : list
+            The key words of the hand cards of the active player.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        return self.select_option({card_type: self.score_card(table, card_type)
+                                   for card_type in dict.fromkeys(hand)})
+
+    @staticmethod
+    def select_option(scores):
+        """
+        Chooses the option from the scores of the hand cards (see choose).
+
+        Parameters
+        ----------
+        scores : dict
+            Maps the key word of every different hand card to the result of
+            score_card, in the order of the hand.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        best = None
+        worst = None
+        can_play = False
+        for card_type, (score, move) in scores.items():
+            if score is None:
+                worst = (None, card_type)
+                continue
+            can_play = True
+            if best is None or score > best[0]:
+                best = (score, card_type, move)
+            if worst is None or (worst[0] is not None and score < worst[0]):
+                worst = (score, card_type)
+        if not can_play:
+            return ("CHANGE_ALL",)
+        if best[0] > 0:
+            return ("PLAY", best[1], best[2])
+        return ("CHANGE", worst[1])
+
+    def choose_option(self, game):
+        """
+        Chooses the option of the active player of a compact game. Only the
+        own hand and the tables are used.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        return self.choose(game.table, game.hands[game.table.active])
+
+    def choose_for_game(self, game):
+        """
+        Chooses the option of the active player of a running Game.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        hand = [card.get_card_type() for card in game.active_player.get_cards_hand()]
+        return self.choose(TableState.from_game(game), hand)
+
+    def playout(self, game, rng, max_turns=None):
+        """
+        Plays a compact game until a player has won, all players use this
+        bot.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state, it is modified.
+        rng : random.Random
+            Random number generator for the dealt cards.
+        max_turns : int
+            The playout stops after this many turns. If not given, it runs
+            until the game is over.
+
+        Returns
+        -------
+        winner : int
+            Index of the winner, None if max_turns was reached.
+
+        """
+        while game.winner is None:
+            if max_turns is not None and game.turn >= max_turns:
+                break
+            game.play_random_option(
+                self.choose(game.table, game.hands[game.table.active]), rng)
+        return game.winner
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rng = random.Random(3)
+    bot = GreedyBot()
+
+    print("\nTest: method choose")
+    table = TableState.initial(2, 5)
+    print("(Expected value: ('PLAY', 'MUD', (0, 0))). Value:",
+          bot.choose(table, ["RAIN", "MUD", "STALL"]))
+    print("(Expected value: ('CHANGE_ALL',)). Value:",
+          bot.choose(table, ["RAIN", "LIGHTNING", "FARMER_CLEANS"]))
+
+    print("\nBenchmark: time per decision")
+    positions = list()
+    while len(positions) < 2000:
+        game = CompactGame.new_game(2, 5, rng)
+        for i in range(int(rng.random() * 30)):
+            if game.winner is not None:
+                break
+            game.play_random_option(bot.choose_option(game), rng)
+        if game.winner is None:
+            positions.append((game.table, game.hands[game.table.active]))
+    start = time.perf_counter()
+    for table, hand in positions * 10:
+        bot.choose(table, hand)
+    elapsed = time.perf_counter() - start
+    print("%.1f µs per decision" % (elapsed / (len(positions) * 10) * 1e6))
+
+    print("\nBenchmark: greedy playouts")
+    n_games = 1000
+    start = time.perf_counter()
+    turns = 0
+    for i in range(n_games):
+        game = CompactGame.new_game(2, 5, rng)
+        bot.playout(game, rng)
+        turns += game.turn
+    elapsed = time.perf_counter() - start
+    print("%.0f games/s, %.1f turns per game" % (n_games / elapsed, turns / n_games))
+
+    print("\nTournament: greedy against random")
+    wins = 0
+    n_games = 500
+    for n in range(n_games):
+        game = CompactGame.new_game(2, 5, rng)
+        while game.winner is None:
+            if game.table.active == n % 2:
+                option = bot.choose_option(game)
+            else:
+                options = game.get_options()
+                option = options[int(rng.random() * len(options))]
+            game.play_random_option(option, rng)
+        wins += game.winner == n % 2
+    print("Greedy won", wins, "of", n_games, "games")
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+""" Hibernation of idle games on disk """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from actioncard import ActionCard
+from card import Card
+from deck import Deck
+from game import Game
+from gameconfig import GameConfig
+from player import Player
+from statesync import card_index, card_types
+from tablestate import TableState
+from upgradecard import UpgradeCard
+
+import os
+
+
+# Format of a hibernated game, all numbers are unsigned and big endian:
+# version (1 byte), round counter (4 bytes), length of the key of the
+# GameConfig (2 bytes), the key (see GameConfig.get_key), number of players
+# (1 byte) and per player: name length (1 byte), name (UTF-8), number of pigs (1 byte),
+# one byte per pig (pig number in the high 4 bits, bucket of TableState in
+# the low 4 bits), hand size (1 byte), one byte per hand card (index of
+# statesync.card_types). Then the draw deck and the discard pile: number of
+# cards (2 bytes) and two cards per byte (index of card_types, 4 bits each).
+VERSION = 2
+
+
+def pack_cards(cards):
+    """
+    Encodes a pile of cards with 4 bits per card.
+
+    Parameters
+    ----------
+    cards : list
+        List of Card objects.
+
+    Returns
+    -------
+    data : bytes
+        The number of cards and the cards.
+
+    """
+    indices = [card_index[card.get_card_type()] for card in cards]
+    if len(indices) % 2:
+        indices.append(0)
+    return (len(cards).to_bytes(2, "big")
+            + bytes((indices[i] << 4) | indices[i + 1] for i in range(0, len(indices), 2)))
+
+
+def unpack_cards(data, offset):
+    """
+    Decodes a pile of cards (see pack_cards).
+
+    Parameters
+    ----------
+    data : bytes
+        The hibernated game.
+    offset : int
+        Position of the pile in data.
+
+    Returns
+    -------
+    (cards : list, offset : int) : tuple
+        The Card objects and the position after the pile.
+
+    """
+    n_cards = int.from_bytes(data[offset:offset + 2], "big")
+    offset += 2
+    cards = list()
+    for i in range(n_cards):
+        byte = data[offset + i // 2]
+        cards.append(create_card(card_types[byte >> 4 if i % 2 == 0 else byte & 15]))
+    return cards, offset + (n_cards + 1) // 2
+
+
+def create_card(card_type):
+    """
+    Creates a card of the given type.
+
+    Parameters
+    ----------
+    card_type : string
+        The key word of the card.
+
+    Returns
+    -------
+    card : Card
+        An ActionCard or UpgradeCard.
+
+    """
+    if card_type in Card.action_card_types:
+        return ActionCard(card_type)
+    return UpgradeCard(card_type)
+
+
+def dump_game(game):
+    """
+    Encodes a game at the start of a turn, with everything that is needed to
+    continue it with Game.run_game_async(..., resume=True).
+
+    Parameters
+    ----------
+    game : Game
+        The running game.
+
+    Returns
+    -------
+    data : bytes
+        The hibernated game.
+
+    """
+    data = bytearray([VERSION])
+    data += game.round_counter.to_bytes(4, "big")
+    key = game.config.get_key().encode()
+    data += len(key).to_bytes(2, "big") + key
+    data.append(len(game.players))
+    for player in game.players:
+        name = player.get_name().encode()[:255]
+        data.append(len(name))
+        data += name
+        pigs = player.get_cards_table()
+        data.append(len(pigs))
+        data += bytes((pig.get_pig_number() << 4) | TableState.pig_to_flags(pig) for pig in pigs)
+        hand = player.get_cards_hand()
+        data.append(len(hand))
+        data += bytes(card_index[card.get_card_type()] for card in hand)
+    data += pack_cards(game.deck.draw_deck)
+    data += pack_cards(game.deck.discard_pile)
+    return bytes(data)
+
+
+def load_game(data):
+    """
+    Restores a game that was encoded with dump_game.
+
+    Parameters
+    ----------
+    data : bytes
+        The hibernated game.
+
+    Returns
+    -------
+    game : Game
+        The game with its GameConfig, ready to be continued at the start of
+        the turn.
+
+    """
+    if data[0] != VERSION:
+        raise ValueError("Unbekannte Version " + str(data[0]))
+    round_counter = int.from_bytes(data[1:5], "big")
+    length = int.from_bytes(data[5:7], "big")
+    config = GameConfig.from_key(data[7:7 + length].decode())
+    n_players = data[7 + length]
+    offset = 8 + length
+    players = list()
+    for n in range(n_players):
+        length = data[offset]
+        player = Player(data[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+        for byte in data[offset + 1:offset + 1 + data[offset]]:
+            player.add_card_to_table(TableState.flags_to_pig(byte & 15, byte >> 4))
+        offset += 1 + data[offset]
+        for index in data[offset + 1:offset + 1 + data[offset]]:
+            player.add_card_to_hand(create_card(card_types[index]))
+        offset += 1 + data[offset]
+        players.append(player)
+    draw_deck, offset = unpack_cards(data, offset)
+    # the piles are restored as they are, so no deck is shuffled
+    game = Game(config=config, deck=Deck(config, draw_deck))
+    game.deck.discard_pile, offset = unpack_cards(data, offset)
+    game.players = players
+    game.round_counter = round_counter
+    game.active_player = game.players[game.round_counter % len(game.players)]
+    return game
+
+
+class SessionStore:
+
+    def __init__(self, directory):
+        # One file per hibernated game in directory. A file is written to a
+        # temporary name first and then renamed, so a crash never leaves a
+        # half written game behind.
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.saved = 0
+        self.loaded = 0
+        self.bytes_written = 0
+
+    def get_path(self, game_id):
+        """
+        Returns the file of a game.
+
+        Parameters
+        ----------
+        game_id : int
+            The id of the game.
+
+        Returns
+        -------
+        path : string
+            The path of the file.
+
+        """
+        return os.path.join(self.directory, "%d.drecksau" % game_id)
+
+    def save(self, game_id, game):
+        """
+        Writes a game to disk.
+
+        Parameters
+        ----------
+        game_id : int
+            The id of the game.
+        game : Game
+            The game at the start of a turn.
+
+        Returns
+        -------
+        None.
+
+        """
+        data = dump_game(game)
+        path = self.get_path(game_id)
+        with open(path + ".tmp", "wb") as file:
+            file.write(data)
+        os.replace(path + ".tmp", path)
+        self.saved += 1
+        self.bytes_written += len(data)
+
+    def load(self, game_id):
+        """
+        Reads a game from disk and deletes the file.
+
+        Parameters
+        ----------
+        game_id : int
+            The id of the game.
+
+        Returns
+        -------
+        game : Game
+            The restored game.
+
+        """
+        path = self.get_path(game_id)
+        with open(path, "rb") as file:
+            game = load_game(file.read())
+        os.remove(path)
+        self.loaded += 1
+        return game
+
+    def delete(self, game_id):
+        """
+        Deletes the file of a game if it exists, e.g. after an aborted game.
+
+        Parameters
+        ----------
+        game_id : int
+            The id of the game.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            os.remove(self.get_path(game_id))
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    from pigcard import PigCard
+    import random
+    import tempfile
+
+    random.seed(4)
+    game = Game()
+    for name in ("Anja", "Ricky"):
+        game.players.append(Player(name))
+    game.init_cards_table()
+    game.init_cards_hand()
+    game.round_counter = 7
+    game.players[1].get_cards_table()[0].make_dirty()
+    for i in range(5):
+        game.deck.add_card_to_discard_pile(game.deck.deal_card())
+
+    def snapshot(game):
+        return ([(player.get_name(), [(pig.get_pig_number(), TableState.pig_to_flags(pig))
+                                      for pig in player.get_cards_table()],
+                  [card.get_card_type() for card in player.get_cards_hand()])
+                 for player in game.players],
+                [card.get_card_type() for card in game.deck.draw_deck],
+                [card.get_card_type() for card in game.deck.discard_pile],
+                game.round_counter)
+
+    data = dump_game(game)
+    print("\nTest: hibernated game is restored exactly")
+    print("(Expected value: True). Value:", snapshot(load_game(data)) == snapshot(game))
+    print("Size:", len(data), "bytes")
+
+    print("\nTest: active player of the restored game")
+    print("(Expected value: Ricky). Value:", load_game(data).active_player.get_name())
+
+    print("\nTest: SessionStore")
+    store = SessionStore(tempfile.mkdtemp())
+    store.save(1, game)
+    restored = store.load(1)
+    print("(Expected value: True False). Value:", snapshot(restored) == snapshot(game),
+          os.path.exists(store.get_path(1)))
+    print("(Expected value: True). Value:", isinstance(restored.players[0].get_cards_table()[0],
+                                                        PigCard))
+
+    print("\nTest: the configuration is restored and no deck is shuffled")
+    game.config = GameConfig({"STORM": 3}, {2: 6})
+    state = random.getstate()
+    restored = load_game(dump_game(game))
+    print("(Expected value: True True). Value:", restored.config == game.config,
+          random.getstate() == state)
+    print("(Expected value: 6). Value:", restored.number_of_pigs())
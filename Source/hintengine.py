@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+
+""" Hint engine """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from cardcounter import CardCounter
+from compactgame import CompactGame
+from determinization import DeterminizationSampler
+from greedybot import GreedyBot
+
+import random
+import threading
+import time
+
+
+class HintEngine:
+
+    def __init__(self, time_budget=30.0, max_playout_turns=200, seed=None):
+        # The estimates are computed in a background thread while the player
+        # is thinking. The thread stops when the player has answered, or
+        # after time_budget seconds at the latest. Every rollout starts from a
+        # determinization of the compact state, so the hidden hands of the
+        # opponents are not used, and is played with the GreedyBot.
+        self.time_budget = time_budget
+        self.max_playout_turns = max_playout_turns
+        self.rng = random.Random(seed)
+        self.playout_bot = GreedyBot()
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        # maps the options to [rollouts, wins]
+        self.results = dict()
+
+        # one CardCounter per seat, they follow the game from the setup on
+        # (see attach), so the draw probabilities are ready at every turn
+        self.card_counts = None
+        self.counters = list()
+
+    def attach(self, game):
+        """
+        Registers the engine as listener of a game before it is initialized,
+        so the card counters follow all dealt and discarded cards.
+
+        Parameters
+        ----------
+        game : Game
+            The game, not yet initialized.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.card_counts = game.config.card_counts
+        self.counters = list()
+        game.add_listener(self)
+
+    def __call__(self, event, *args):
+        # a new game creates the counters, the other events are counted
+        if event == "setup":
+            self.counters = [CardCounter(n_player, self.card_counts)
+                             for n_player in range(args[0])]
+            return
+        for counter in self.counters:
+            counter(event, *args)
+
+    def get_draw_outlook(self, n_player):
+        """
+        Returns what the player can expect from the draw deck, from the cards
+        the player has seen.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        probabilities : dict
+            Probability that the next card is a STORM, LIGHTNING or RAIN,
+            empty if the engine is not attached to the game.
+        mud_draws : float
+            Expected number of draws until a MUD comes up, inf if there is
+            none. None if the engine is not attached to the game.
+
+        """
+        if n_player >= len(self.counters):
+            return dict(), None
+        counter = self.counters[n_player]
+        probabilities = {card_type: counter.get_draw_probability(card_type)
+                         for card_type in ("STORM", "LIGHTNING", "RAIN")}
+        return probabilities, counter.get_expected_draws_until("MUD")
+
+    def start(self, game):
+        """
+        Starts the rollouts for the options of the active player of a
+        running game. Rollouts of a previous start are stopped.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.stop()
+        compact_game = CompactGame.from_game(game)
+        n_player = compact_game.table.active
+        sampler = DeterminizationSampler(n_player, len(compact_game.hands))
+        options = compact_game.get_options()
+        with self.lock:
+            self.results = {option: [0, 0.0] for option in options}
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run_rollouts,
+            args=(sampler.get_sampler(compact_game), options, n_player,
+                  time.perf_counter() + self.time_budget,
+                  random.Random(self.rng.getrandbits(32)), self.stop_event),
+            daemon=True)
+        self.thread.start()
+
+    def run_rollouts(self, sample_root, options, n_player, deadline, rng, stop_event):
+        """
+        Plays rollouts for all options in turn until the deadline or until
+        the engine is stopped. Runs in the background thread.
+
+        Parameters
+        ----------
+        sample_root : function
+            Returns a determinization of the state (see
+            DeterminizationSampler.get_sampler).
+        options : list
+            The options of the player.
+        n_player : int
+            Index of the player.
+        deadline : float
+            Time of time.perf_counter when the rollouts stop.
+        rng : random.Random
+            Random number generator of this thread.
+        stop_event : threading.Event
+            Set when the player has answered.
+
+        Returns
+        -------
+        None.
+
+        """
+        while not stop_event.is_set() and time.perf_counter() < deadline:
+            for option in options:
+                if stop_event.is_set():
+                    return
+                game = sample_root(rng)
+                game.play_random_option(option, rng)
+                winner = self.playout_bot.playout(
+                    game, rng, game.turn + self.max_playout_turns)
+                if winner is None:
+                    win = 0.5
+                else:
+                    win = 1.0 if winner == n_player else 0.0
+                with self.lock:
+                    result = self.results[option]
+                    result[0] += 1
+                    result[1] += win
+
+    def stop(self):
+        """
+        Stops the rollouts. The estimates are kept until the next start.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_estimate(self, option):
+        """
+        Returns the current estimate of an option.
+
+        Parameters
+        ----------
+        option : tuple
+            The option (see TableState.get_options).
+
+        Returns
+        -------
+        win_probability : float
+            Estimated win probability of the player, None if there is no
+            rollout for this option yet.
+        rollouts : int
+            Number of rollouts of the estimate.
+
+        """
+        with self.lock:
+            rollouts, wins = self.results.get(option, (0, 0.0))
+        if not rollouts:
+            return None, 0
+        return wins / rollouts, rollouts
+
+    def get_estimates(self):
+        """
+        Returns the current estimates of all options.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        estimates : dict
+            Maps the options to tuples (win_probability, rollouts), see
+            get_estimate.
+
+        """
+        with self.lock:
+            results = {option: tuple(result) for option, result in self.results.items()}
+        return {option: (wins / rollouts if rollouts else None, rollouts)
+                for option, (rollouts, wins) in results.items()}
+
+
+if __name__ == "__main__":
+    from game import Game
+    from player import Player
+    from pigcard import PigCard
+
+    random.seed(2)
+    game = Game()
+    for name in ("Anja", "Salah"):
+        game.players.append(Player(name))
+    for player in game.players:
+        for n in range(5):
+            player.add_card_to_table(PigCard(n + 1))
+    game.init_cards_hand()
+    game.active_player = game.players[0]
+
+    engine = HintEngine(seed=1)
+    print("\nTest: estimates refine while the player is thinking")
+    engine.start(game)
+    for wait in (0.2, 0.8):
+        time.sleep(wait)
+        estimates = engine.get_estimates()
+        print("Rollouts after %.1f s:" % wait,
+              sum(rollouts for p, rollouts in estimates.values()))
+    engine.stop()
+    for option, (p, rollouts) in sorted(engine.get_estimates().items(),
+                                         key=lambda item: -(item[1][0] or 0)):
+        print(option, "%.0f%%" % (100 * p), rollouts)
+
+    print("\nTest: stop does not wait for the deadline")
+    engine.start(game)
+    start = time.perf_counter()
+    engine.stop()
+    print("(Expected value: True). Value:", time.perf_counter() - start < 0.5)
+
+    print("\nTest: the counted cards give the chances of the next card")
+    random.seed(2)
+    game = Game(engine)
+    game.output = lambda text: None
+    game.players = [Player("Anja"), Player("Salah")]
+    game.init_cards_table()
+    game.init_cards_hand()
+    probabilities, mud_draws = engine.get_draw_outlook(0)
+    hand = [card.get_card_type() for card in game.players[0].get_cards_hand()]
+    print("(Expected value: %.4f). Value: %.4f"
+          % ((4 - hand.count("RAIN")) / 52, probabilities["RAIN"]))
+    print("Expected draws until MUD: %.2f" % mud_draws)
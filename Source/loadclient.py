@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+
+""" Load test client for the game server """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from statesync import StateDecoder, card_types, get_kind, prompt_keys
+from statesync import DELTA, KEYFRAME, QUESTION, TEXT
+from tablestate import TableState
+
+import asyncio
+import random
+import time
+
+
+class LoadClient:
+
+    def __init__(self, host="127.0.0.1", port=8765, seed=None, binary=False,
+                 think_time=0.0):
+        # Every simulated player answers the questions of the server like a
+        # beginner: he plays a card whenever he can, tries his cards in a
+        # random order and picks a random move. Invalid answers are possible
+        # and are rejected by the validator of the server. With binary=True
+        # the players use the binary state sync instead of the text output.
+        # Every answer takes think_time seconds.
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.binary = binary
+        self.think_time = think_time
+
+        # seconds from an answer until the first line and until the next
+        # question, which includes the turns of the bots
+        self.latencies = list()
+        self.response_times = list()
+        self.questions = 0
+        self.bytes_received = 0
+        self.turns = 0
+        self.connections_finished = 0
+        self.connections_failed = 0
+        self.rejected = 0
+        # seconds from connecting until the game starts
+        self.waits = list()
+        self.spectator_frames = 0
+        self.spectator_bytes = 0
+        self.spectators_closed_early = 0
+
+    def answer(self, question, n_moves):
+        """
+        Chooses the answer to a question of the server.
+
+        Parameters
+        ----------
+        question : string
+            The question without the leading "? ".
+        n_moves : int
+            Number of possible moves that were listed before the question.
+
+        Returns
+        -------
+        answer : string
+            The answer.
+
+        """
+        if "Name" in question:
+            return "Bot" + str(self.rng.getrandbits(16))
+        if "Wo willst" in question:
+            return str(self.rng.randint(1, max(n_moves, 1)))
+        if "[1/2/3]" in question:
+            return str(self.rng.randint(1, 3))
+        # play a card or change one card
+        return "1" if self.rng.random() < 0.9 else "2"
+
+    async def run_player(self):
+        """
+        Connects one player and plays until the server closes the connection.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self.connections_failed += 1
+            return
+        n_moves = 0
+        sent = None
+        answered = None
+        connected = time.perf_counter()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if sent is not None:
+                    self.latencies.append(time.perf_counter() - sent)
+                    sent = None
+                self.bytes_received += len(line)
+                text = line.decode(errors="replace")
+                if text.startswith("? "):
+                    if answered is not None:
+                        self.response_times.append(time.perf_counter() - answered)
+                    self.questions += 1
+                    answer = self.answer(text[2:], n_moves)
+                    if self.think_time and "Name" not in text:
+                        await asyncio.sleep(self.think_time)
+                    if self.binary and "Name" in text:
+                        writer.write(("/binary " + answer + "\n").encode())
+                        await self.run_binary_player(reader, writer, connected)
+                        break
+                    writer.write((answer + "\n").encode())
+                    # the answer to the name is not a turn
+                    if "Name" not in text:
+                        sent = answered = time.perf_counter()
+                    n_moves = 0
+                elif text[:1].isdigit() and "Schwein" in text:
+                    n_moves += 1
+                elif "s Zug:" in text:
+                    self.turns += 1
+                elif "Lass uns beginnen" in text:
+                    self.waits.append(time.perf_counter() - connected)
+                elif "Server ist voll" in text:
+                    self.rejected += 1
+            self.connections_finished += 1
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            self.connections_failed += 1
+        finally:
+            writer.close()
+
+    async def run_binary_player(self, reader, writer, connected):
+        """
+        Plays with the binary state sync until the server closes the
+        connection. The number of possible moves is computed from the state.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection.
+        writer : asyncio.StreamWriter
+            Writes to the connection.
+        connected : float
+            Time of the connection (time.perf_counter).
+
+        Returns
+        -------
+        None.
+
+        """
+        decoder = StateDecoder()
+        sent = None
+        answered = None
+        card_type = None
+        while True:
+            header = await reader.read(1)
+            if not header:
+                return
+            data = await reader.readexactly(header[0])
+            if sent is not None:
+                self.latencies.append(time.perf_counter() - sent)
+                sent = None
+            self.bytes_received += 1 + len(data)
+            kind = get_kind(data)
+            if kind == DELTA or kind == KEYFRAME:
+                if decoder.state is None and kind == KEYFRAME:
+                    self.waits.append(time.perf_counter() - connected)
+                decoder.decode(data)
+                self.turns += 1
+            elif kind == TEXT and b"Server ist voll" in data:
+                self.rejected += 1
+            elif kind == QUESTION:
+                if answered is not None:
+                    self.response_times.append(time.perf_counter() - answered)
+                self.questions += 1
+                prompt_key = prompt_keys[(data[0] >> 3) & 7]
+                state = decoder.state
+                if state is None:
+                    answer = "/resync"
+                elif prompt_key == "move":
+                    table = TableState([[0] * TableState.n_buckets] * len(state.pigs), state.active)
+                    playable = TableState.playable[card_type]
+                    n_moves = sum(playable[flags] for n_player in table.get_target_players(card_type)
+                                  for flags in state.pigs[n_player])
+                    answer = self.answer("Wo willst", n_moves)
+                else:
+                    answer = self.answer("[1/2/3]" if "card" in prompt_key else "", 0)
+                    if prompt_key == "play_card":
+                        card_type = card_types[state.hand[int(answer) - 1]]
+                if self.think_time:
+                    await asyncio.sleep(self.think_time)
+                writer.write((answer + "\n").encode())
+                sent = answered = time.perf_counter()
+
+    async def run_spectator(self, game_id="", read_delay=0.0):
+        """
+        Watches a game until the server closes the connection.
+
+        Parameters
+        ----------
+        game_id : string
+            The id of the game, empty for the latest game.
+        read_delay : float
+            Seconds to wait before every read, to simulate a slow spectator.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self.connections_failed += 1
+            return
+        decoder = StateDecoder()
+        ended = False
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or line.startswith(b"? "):
+                    break
+            writer.write(("/watch " + str(game_id) + "\n").encode())
+            while True:
+                if read_delay:
+                    await asyncio.sleep(read_delay)
+                header = await reader.read(1)
+                if not header:
+                    break
+                data = await reader.readexactly(header[0])
+                self.spectator_frames += 1
+                self.spectator_bytes += 1 + len(data)
+                kind = get_kind(data)
+                if kind == DELTA or kind == KEYFRAME:
+                    decoder.decode(data)
+                elif b"Ende" in data:
+                    ended = True
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+        if not ended:
+            self.spectators_closed_early += 1
+
+    async def run(self, n_players, ramp_up=0.0):
+        """
+        Runs the given number of players at the same time.
+
+        Parameters
+        ----------
+        n_players : int
+            Number of connections.
+        ramp_up : float
+            Seconds over which the connections are opened.
+
+        Returns
+        -------
+        statistics : dict
+            The results of the load test.
+
+        """
+        start = time.perf_counter()
+        tasks = list()
+        for i in range(n_players):
+            tasks.append(asyncio.ensure_future(self.run_player()))
+            if ramp_up:
+                await asyncio.sleep(ramp_up / n_players)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        latencies = sorted(self.latencies) or [0.0]
+        response_times = sorted(self.response_times) or [0.0]
+        waits = sorted(self.waits) or [0.0]
+        return {
+            "connections"           : n_players,
+            "finished"              : self.connections_finished,
+            "failed"                : self.connections_failed,
+            "time"                  : elapsed,
+            "questions_per_second"  : self.questions / elapsed,
+            "latency_p50"           : latencies[len(latencies) // 2],
+            "latency_p99"           : latencies[int(len(latencies) * 0.99)],
+            "response_p50"          : response_times[len(response_times) // 2],
+            "response_p99"          : response_times[int(len(response_times) * 0.99)],
+            "rejected"              : self.rejected,
+            "wait_p99"              : waits[int(len(waits) * 0.99)],
+            "bytes_received"        : self.bytes_received,
+            "bytes_per_turn"        : self.bytes_received / self.turns if self.turns else 0.0,
+            "spectator_frames"      : self.spectator_frames,
+            "spectator_bytes"       : self.spectator_bytes,
+            "spectators_closed"     : self.spectators_closed_early,
+        }
+
+
+if __name__ == "__main__":
+    from botscheduler import BotScheduler
+    from game import Game
+    from router import ShardRouter
+    from server import GameServer
+    from speculation import Speculator
+    import gc
+    import sys
+    import tracemalloc
+
+    # python loadclient.py [games] [host port] [--binary] [--think seconds]
+    #                       [--watch spectators] [--slow spectators]
+    #                       [--idle seconds] [--workers processes]
+    #                       [--bots bots] [--batch-delay seconds]
+    #                       [--max-games games] [--overload] [--speculate]
+    # Without host and port a server is started in this process. The
+    # spectators are spread over the games, slow spectators read ten frames
+    # per second. With --idle the server hibernates games whose active player
+    # thinks longer than the given seconds. With --workers a ShardRouter
+    # with the given number of worker processes is started instead. With
+    # --bots every client plays alone against the given number of bots, whose
+    # decisions are collected for up to --batch-delay seconds. With
+    # --speculate the bots prepare their turns while the client is thinking
+    # (see Speculator). --max-games
+    # turns on the admission control of the server. --overload offers 0.5 to
+    # 8 times --max-games games, with and without admission control.
+    def option(name, default):
+        if name in sys.argv:
+            i = sys.argv.index(name)
+            value = sys.argv[i + 1]
+            del sys.argv[i:i + 2]
+            return type(default)(value)
+        return default
+
+    binary = "--binary" in sys.argv
+    if binary:
+        sys.argv.remove("--binary")
+    think_time = option("--think", 0.0)
+    n_spectators = option("--watch", 0)
+    n_slow = option("--slow", 0)
+    idle_timeout = option("--idle", 0.0) or None
+    n_workers = option("--workers", 0)
+    n_bots = option("--bots", 0)
+    batch_delay = option("--batch-delay", 0.002)
+    n_players = 1 + n_bots if n_bots else 2
+    max_games = option("--max-games", 0) or None
+    overload = "--overload" in sys.argv
+    if overload:
+        sys.argv.remove("--overload")
+    speculate = "--speculate" in sys.argv
+    if speculate:
+        sys.argv.remove("--speculate")
+    n_games = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    async def main():
+        server = None
+        router = None
+        if len(sys.argv) > 3:
+            host, port = sys.argv[2], int(sys.argv[3])
+        elif n_workers:
+            router = ShardRouter(n_workers, n_players, "127.0.0.1", 0, idle_timeout)
+            await router.start()
+            host, port = router.host, router.port
+        else:
+            server = GameServer(n_players, "127.0.0.1", 0, idle_timeout, n_bots=n_bots,
+                                scheduler=BotScheduler(max_delay=batch_delay),
+                                speculator=Speculator() if speculate else None)
+            await server.start()
+            host, port = server.host, server.port
+        client = LoadClient(host, port, seed=1, binary=binary, think_time=think_time)
+        task = asyncio.ensure_future(client.run((n_players - n_bots) * n_games))
+        if server is not None:
+            # memory of the running games, measured when all have started
+            tracemalloc.start()
+            while server.games_started < n_games and not task.done():
+                await asyncio.sleep(0.05)
+            # with hibernation, wait until the players are thinking
+            await asyncio.sleep(think_time / 2)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            hibernating = server.games_hibernating
+            # a Game has reference cycles, it is freed by the garbage collector
+            gc.collect()
+            in_memory = sum(isinstance(obj, Game) for obj in gc.get_objects())
+        if router is not None:
+            while sum(router.games_started) < n_games and not task.done():
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.5)
+        spectators = [asyncio.ensure_future(client.run_spectator(
+                          i % n_games + 1, 0.1 if i < n_slow else 0.0))
+                      for i in range(n_spectators + n_slow)]
+        statistics = await task
+        await asyncio.gather(*spectators)
+        statistics["spectator_frames"] = client.spectator_frames
+        statistics["spectator_bytes"] = client.spectator_bytes
+        statistics["spectators_closed"] = client.spectators_closed_early
+        print("\nLoad test with", n_games, "games")
+        for key, value in statistics.items():
+            print("%-22s %s" % (key, round(value, 4) if isinstance(value, float) else value))
+        if server is not None:
+            print("%-22s %d / %d / %d" % ("started/finished/aborted", server.games_started,
+                                          server.games_finished, server.games_aborted))
+            print("%-22s %.1f KiB" % ("memory per game", current / n_games / 1024))
+            print("%-22s %d" % ("games in memory", in_memory))
+            print("%-22s %d" % ("spectators dropped", server.spectators_dropped))
+            if idle_timeout is not None:
+                print("%-22s %d" % ("hibernations", server.hibernations))
+                print("%-22s %d" % ("hibernating at measure", hibernating))
+                print("%-22s %.1f bytes" % ("bytes per hibernation", server.store.bytes_written
+                                            / max(server.store.saved, 1)))
+            if n_bots:
+                for key, value in server.scheduler.get_statistics().items():
+                    print("%-22s %s" % ("bots " + key, round(value, 4)))
+            if speculate:
+                for key, value in server.speculator.get_statistics().items():
+                    print("%-22s %s" % ("speculation " + key, round(value, 4)))
+            server.close()
+        if router is not None:
+            print("%-22s %s" % ("games per worker", router.games_started))
+            print("%-22s %s" % ("running games", router.games))
+            router.close()
+
+    async def overload_test():
+        capacity = max_games or 100
+        print("\nOverload test, capacity", capacity, "games, think time", think_time, "s")
+        print("%-10s %6s %10s %10s %9s %10s %8s" % ("admission", "games", "p50 [ms]", "p99 [ms]",
+                                                    "rejected", "wait p99", "time"))
+        for limit in (None, capacity):
+            for factor in (0.5, 1, 2, 4, 8):
+                server = GameServer(2, "127.0.0.1", 0, max_games=limit,
+                                    max_queue=limit and 2 * limit)
+                await server.start()
+                client = LoadClient(server.host, server.port, seed=1, binary=binary,
+                                    think_time=think_time)
+                statistics = await client.run(int(2 * capacity * factor))
+                server.close()
+                print("%-10s %6d %10.1f %10.1f %9d %9.1fs %7.1fs"
+                      % ("on" if limit else "off", capacity * factor,
+                         1000 * statistics["latency_p50"], 1000 * statistics["latency_p99"],
+                         server.players_rejected // 2, statistics["wait_p99"],
+                         statistics["time"]))
+
+    asyncio.run(overload_test() if overload else main())
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+""" Markov chain solver """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from deck import Deck
+from game import Game
+from greedybot import GreedyBot
+from player import Player
+from tablestate import TableState
+
+from array import array
+from itertools import combinations_with_replacement
+from math import factorial
+
+
+class MarkovSolver:
+
+    def __init__(self, n_players=2, n_pigs=None, policy="random"):
+        # A state of the chain are the tables of all players, rotated so that
+        # the active player comes first. The three hand cards of the active
+        # player are modelled as independent draws from the card distribution
+        # of the deck, so the hands are not part of the state.
+        self.n_players = n_players
+        if n_pigs is None:
+            game = Game()
+            game.players = [Player(str(i + 1)) for i in range(n_players)]
+            n_pigs = game.number_of_pigs()
+        self.n_pigs = n_pigs
+
+        policy_map = {
+            "random"    : self.random_policy,
+            "greedy"    : self.greedy_policy,
+        }
+        self.policy = policy_map.get(policy, policy)
+        self.greedy_bot = GreedyBot()
+
+        card_counts = Deck().get_card_counts()
+        self.hand_distribution = self.get_hand_distribution(card_counts)
+
+        # sparse transition matrix in CSR format, filled by build
+        self.states = list()
+        self.indptr = array("l", [0])
+        self.indices = array("l")
+        self.probabilities = array("d")
+        self.win_probabilities = array("d")
+
+    @classmethod
+    def get_hand_distribution(cls, card_counts, hand_size=3):
+        """
+        Computes the probability of every hand for independent draws. Hands
+        with the same distinct card types lead to the same options, so they
+        are merged.
+
+        Parameters
+        ----------
+        card_counts : dict
+            Number of cards per card type (see Deck.get_card_counts).
+        hand_size : int
+            Number of cards in a hand. If not given, it is set to 3.
+
+        Returns
+        -------
+        hand_distribution : list
+            List of tuples (hand, probability), hand is a tuple of the
+            distinct card types.
+
+        """
+        n_cards = sum(card_counts.values())
+        distribution = dict()
+        for hand in combinations_with_replacement(list(card_counts), hand_size):
+            probability = factorial(hand_size)
+            for card_type in set(hand):
+                count = hand.count(card_type)
+                probability *= (card_counts[card_type] / n_cards) ** count / factorial(count)
+            key = tuple(sorted(set(hand), key=hand.index))
+            distribution[key] = distribution.get(key, 0.0) + probability
+        return [(hand, probability) for hand, probability in distribution.items()
+                if probability > 0]
+
+    def random_policy(self, state, options):
+        """
+        Chooses every option with the same probability.
+
+        Parameters
+        ----------
+        state : TableState
+            The tables, the active player is 0.
+        options : list
+            The options of the active player (see TableState.get_options).
+
+        Returns
+        -------
+        choices : list
+            List of tuples (probability, option).
+
+        """
+        probability = 1 / len(options)
+        return [(probability, option) for option in options]
+
+    def greedy_policy(self, state, options):
+        """
+        Chooses the option of the GreedyBot. The hand is not part of the
+        state, so it is reconstructed from the card types in the options.
+
+        Parameters
+        ----------
+        state : TableState
+            The tables, the active player is 0.
+        options : list
+            The options of the active player (see TableState.get_options).
+
+        Returns
+        -------
+        choices : list
+            List of tuples (probability, option).
+
+        """
+        hand = [option[1] for option in options if option[0] == "CHANGE"]
+        return [(1.0, self.greedy_bot.choose(state, hand))]
+
+    def get_transitions(self, state):
+        """
+        Computes the probabilities of the next states and the probability
+        that the active player wins in this turn.
+
+        Parameters
+        ----------
+        state : TableState
+            The tables, the active player is 0.
+
+        Returns
+        -------
+        transitions : dict
+            Maps the next states (rotated to the next player) to their
+            probability.
+        win_probability : float
+            Probability that the active player wins in this turn.
+
+        """
+        transitions = dict()
+        win_probability = 0.0
+        results = dict()
+        for hand, hand_probability in self.hand_distribution:
+            options = state.get_options(hand)
+            for probability, option in self.policy(state, options):
+                probability *= hand_probability
+                if option[0] != "PLAY":
+                    new_state = state
+                else:
+                    key = (option[1], option[2])
+                    if key not in results:
+                        results[key] = state.play_card(option[1], option[2])[0]
+                    new_state = results[key]
+                if new_state.is_winner(0):
+                    win_probability += probability
+                else:
+                    next_state = TableState(new_state.tables[1:] + new_state.tables[:1])
+                    transitions[next_state] = transitions.get(next_state, 0.0) + probability
+        return transitions, win_probability
+
+    def build(self):
+        """
+        Explores all states that can be reached from the start of the game
+        and builds the sparse transition matrix.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        n_states : int
+            Number of reachable states.
+
+        """
+        start = TableState.initial(self.n_players, self.n_pigs)
+        index = {start: 0}
+        self.states = [start]
+        position = 0
+        while position < len(self.states):
+            transitions, win_probability = self.get_transitions(self.states[position])
+            for next_state, probability in transitions.items():
+                if next_state not in index:
+                    index[next_state] = len(self.states)
+                    self.states.append(next_state)
+                self.indices.append(index[next_state])
+                self.probabilities.append(probability)
+            self.indptr.append(len(self.indices))
+            self.win_probabilities.append(win_probability)
+            position += 1
+        return len(self.states)
+
+    def solve(self, tolerance=1e-9, max_iterations=100000):
+        """
+        Solves the linear equations of the chain with Gauss-Seidel iterations.
+        E[s]    : expected number of turns until the game ends
+        W[s][k] : probability that the player k seats after the active
+                  player wins
+
+        E[s]    = 1 + sum_t P[s, t] * E[t]
+        W[s][k] = win[s] * (k == 0) + sum_t P[s, t] * W[t][k - 1]
+
+        Parameters
+        ----------
+        tolerance : float
+            The iteration stops, if no value changes more than tolerance.
+        max_iterations : int
+            Maximum number of iterations.
+
+        Returns
+        -------
+        expected_turns : float
+            Expected number of turns of a game.
+        seat_win_probabilities : list
+            Win probability of every seat, the first seat starts the game.
+
+        """
+        if not self.states:
+            self.build()
+        n_states = len(self.states)
+        n_players = self.n_players
+        indptr, indices, probabilities = self.indptr, self.indices, self.probabilities
+        turns = [0.0] * n_states
+        wins = [[0.0] * n_players for i in range(n_states)]
+
+        for iteration in range(max_iterations):
+            delta = 0.0
+            for s in range(n_states):
+                expected = 1.0
+                win = [0.0] * n_players
+                win[0] = self.win_probabilities[s]
+                for i in range(indptr[s], indptr[s + 1]):
+                    p = probabilities[i]
+                    t = indices[i]
+                    expected += p * turns[t]
+                    next_win = wins[t]
+                    for k in range(n_players):
+                        win[k] += p * next_win[k - 1]
+                delta = max(delta, abs(expected - turns[s]),
+                            max(abs(w - v) for w, v in zip(win, wins[s])))
+                turns[s] = expected
+                wins[s] = win
+            if delta < tolerance:
+                break
+        return turns[0], wins[0]
+
+
+if __name__ == "__main__":
+    import time
+
+    for policy in ("random", "greedy"):
+        for n_pigs in (1, 2):
+            solver = MarkovSolver(n_players=2, n_pigs=n_pigs, policy=policy)
+            start = time.perf_counter()
+            n_states = solver.build()
+            expected_turns, seat_win_probabilities = solver.solve(tolerance=1e-7)
+            print("\nPolicy:", policy, "Pigs:", n_pigs, "States:", n_states,
+                  "Time: %.1f s" % (time.perf_counter() - start))
+            print("Expected turns: %.3f" % expected_turns)
+            print("Win probability per seat:",
+                  ", ".join("%.4f" % w for w in seat_win_probabilities))
+            print("(Expected value: 1.0). Value: %.4f" % sum(seat_win_probabilities))
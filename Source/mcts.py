@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+
+""" Monte Carlo tree search """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from compactgame import CompactGame
+from greedybot import GreedyBot
+
+from math import log, sqrt
+from multiprocessing import shared_memory
+import multiprocessing
+import random
+import time
+
+
+class MCTSNode:
+    # visits: number of iterations through this node
+    # wins: wins of the player who made the move leading to this node
+    # children: maps the options to the child nodes
+    __slots__ = ("visits", "wins", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.wins = 0.0
+        self.children = dict()
+
+
+class MCTSBot:
+
+    def __init__(self, time_budget=1.0, iterations=None, exploration=0.7,
+                 max_playout_turns=300, seed=None):
+        # The search stops after time_budget seconds or after the given
+        # number of iterations, whatever comes first. Playouts use the
+        # GreedyBot for all players.
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.exploration = exploration
+        self.max_playout_turns = max_playout_turns
+        self.rng = random.Random(seed)
+        self.playout_bot = GreedyBot()
+        self.statistics = dict()
+
+    def select(self, node, options):
+        """
+        Selects the child with the highest UCT value. Options which are
+        not expanded yet are selected first.
+
+        Parameters
+        ----------
+        node : MCTSNode
+            The parent node.
+        options : list
+            The options that are possible in the current state.
+
+        Returns
+        -------
+        option : tuple
+            The selected option.
+
+        """
+        untried = [option for option in options if option not in node.children]
+        if untried:
+            return untried[int(self.rng.random() * len(untried))]
+        log_visits = log(node.visits)
+        best_value = -1.0
+        best_option = None
+        for option in options:
+            child = node.children[option]
+            value = child.wins / child.visits \
+                + self.exploration * sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_value = value
+                best_option = option
+        return best_option
+
+    def run_iteration(self, root, game):
+        """
+        Runs one iteration: selection and expansion in the tree, a greedy
+        playout and the backpropagation of the winner. The tree is open loop:
+        a node stands for a sequence of options, the dealt cards are drawn
+        again in every iteration.
+
+        Parameters
+        ----------
+        root : MCTSNode
+            The root node.
+        game : CompactGame
+            A copy of the root state, it is modified.
+
+        Returns
+        -------
+        None.
+
+        """
+        rng = self.rng
+        node = root
+        path = [(root, None)]
+        while game.winner is None:
+            options = game.get_options()
+            option = self.select(node, options)
+            mover = game.table.active
+            expand = option not in node.children
+            if expand:
+                node.children[option] = MCTSNode()
+            node = node.children[option]
+            game.play_random_option(option, rng)
+            path.append((node, mover))
+            if expand:
+                break
+        winner = self.playout_bot.playout(game, rng, game.turn + self.max_playout_turns)
+        for node, mover in path:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == mover:
+                node.wins += 1.0
+
+    def search(self, game, sample_root=None):
+        """
+        Builds the search tree for a state.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The root state.
+        sample_root : function
+            Called with the random number generator at the start of every
+            iteration, returns the state the iteration starts from (e.g. a
+            determinization of the hidden cards). If not given, a copy of
+            game is used.
+
+        Returns
+        -------
+        root : MCTSNode
+            The root of the tree.
+
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        root = MCTSNode()
+        iterations = 0
+        while self.iterations is None or iterations < self.iterations:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if sample_root is None:
+                self.run_iteration(root, game.copy())
+            else:
+                self.run_iteration(root, sample_root(self.rng))
+            iterations += 1
+        elapsed = time.perf_counter() - start
+        self.statistics = {
+            "iterations"                : iterations,
+            "time"                      : elapsed,
+            "iterations_per_second"     : iterations / elapsed if elapsed else 0.0,
+        }
+        return root
+
+    def choose_option(self, game, sample_root=None):
+        """
+        Chooses the most visited option of the root.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state, the active player is the deciding player.
+        sample_root : function
+            See search.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        root = self.search(game, sample_root)
+        options = game.get_options()
+        return max(options, key=lambda option: root.children[option].visits
+                   if option in root.children else -1)
+
+
+def run_search_worker(game, seed, time_budget, exploration, sample_root, memory_name, row):
+    """
+    Runs the search of one worker process and writes the visits and wins of
+    every root option to its row of the shared memory block of the
+    ParallelMCTS, two doubles per option in the order of game.get_options().
+
+    Parameters
+    ----------
+    game : CompactGame
+        The root state.
+    seed : int
+        Seed of the random number generator of this worker.
+    time_budget : float
+        Search time in seconds.
+    exploration : float
+        UCT exploration constant.
+    sample_root : function
+        See MCTSBot.search.
+    memory_name : string
+        Name of the shared memory block.
+    row : int
+        Row of this worker.
+
+    Returns
+    -------
+    iterations : int
+        Number of iterations of this worker.
+
+    """
+    bot = MCTSBot(time_budget=time_budget, exploration=exploration, seed=seed)
+    root = bot.search(game, sample_root)
+    options = game.get_options()
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        values = memory.buf.cast("d")
+        base = row * 2 * ParallelMCTS.max_options
+        for i, option in enumerate(options):
+            child = root.children.get(option)
+            values[base + 2 * i] = child.visits if child is not None else 0
+            values[base + 2 * i + 1] = child.wins if child is not None else 0.0
+        values.release()
+    finally:
+        memory.close()
+    return bot.statistics["iterations"]
+
+
+class ParallelMCTS:
+    # more options than a hand of three cards can have on the tables of the
+    # largest GameConfig
+    max_options = 256
+
+    def __init__(self, n_workers=None, time_budget=1.0, exploration=0.7, seed=None):
+        # Root parallelization: every worker process builds its own tree from
+        # the same root for the same time, the parent adds up the visits per
+        # root option. The worker processes and the shared memory block, one
+        # row of max_options (visits, wins) per worker, are created once and
+        # reused for every decision. The block is removed by close.
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        # created before the pool, so the workers share the resource tracker
+        # of this process and the block is only registered once
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=8 * 2 * self.max_options * self.n_workers)
+        self.values = self.memory.buf.cast("d")
+        self.pool = multiprocessing.Pool(self.n_workers)
+        self.statistics = dict()
+
+    def choose_option(self, game, sample_root=None):
+        """
+        Chooses the option with the most visits over all workers.
+
+        Parameters
+        ----------
+        game : CompactGame
+            The state, the active player is the deciding player.
+        sample_root : function
+            See MCTSBot.search. It is sent to the workers, so it must be
+            picklable (see DeterminizationSampler.get_sampler).
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        start = time.perf_counter()
+        options = game.get_options()
+        if len(options) == 1:
+            return options[0]
+        if len(options) > self.max_options:
+            raise ValueError("Zu viele Optionen: " + str(len(options)))
+        jobs = [self.pool.apply_async(
+                    run_search_worker,
+                    (game, self.rng.getrandbits(32), self.time_budget, self.exploration,
+                     sample_root, self.memory.name, row))
+                for row in range(self.n_workers)]
+        iterations = sum(job.get() for job in jobs)
+        visits = [0.0] * len(options)
+        wins = [0.0] * len(options)
+        for row in range(self.n_workers):
+            base = row * 2 * self.max_options
+            for i in range(len(options)):
+                visits[i] += self.values[base + 2 * i]
+                wins[i] += self.values[base + 2 * i + 1]
+        elapsed = time.perf_counter() - start
+        self.statistics = {
+            "iterations"                : iterations,
+            "time"                      : elapsed,
+            "iterations_per_second"     : iterations / elapsed if elapsed else 0.0,
+            "visits"                    : dict(zip(options, visits)),
+        }
+        return options[max(range(len(options)), key=visits.__getitem__)]
+
+    def close(self):
+        """
+        Stops the worker processes and removes the shared memory block.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.pool.close()
+        self.pool.join()
+        self.values.release()
+        self.memory.close()
+        self.memory.unlink()
+
+
+if __name__ == "__main__":
+    import sys
+
+    time_budget = 0.2
+    n_games = 4
+    n_positions = 10
+    reference_iterations = 5000
+    worker_counts = sorted({1, 2, multiprocessing.cpu_count()})
+    if len(sys.argv) > 1:
+        worker_counts = [int(n) for n in sys.argv[1:]]
+
+    print("\nTest: parallel search from determinizations")
+    from determinization import DeterminizationSampler
+    rng = random.Random(6)
+    game = CompactGame.new_game(2, 5, rng)
+    search = ParallelMCTS(2, 0.1, seed=1)
+    sample_root = DeterminizationSampler(game.table.active, 2).get_sampler(game)
+    option = search.choose_option(game, sample_root)
+    search.close()
+    print("(Expected value: True). Value:", option in game.get_options())
+
+    print("\nBenchmark: decision quality with", time_budget, "s budget per decision")
+    # The reference decision of a position is the decision of a search with
+    # many more iterations. The more workers, the more iterations per
+    # decision and the more often the decision is the reference decision.
+    rng = random.Random(5)
+    positions = list()
+    while len(positions) < n_positions:
+        game = CompactGame.new_game(2, 5, rng)
+        for i in range(rng.randrange(1, 30)):
+            if game.winner is not None:
+                break
+            game.play_random_option(GreedyBot().choose_option(game), rng)
+        if game.winner is None and len(game.get_options()) > 1:
+            positions.append(game)
+    reference = MCTSBot(time_budget=None, iterations=reference_iterations, seed=4)
+    reference_options = [reference.choose_option(game) for game in positions]
+    for n_workers in worker_counts:
+        search = ParallelMCTS(n_workers, time_budget, seed=1)
+        agreements = 0
+        iterations = 0
+        for game, reference_option in zip(positions, reference_options):
+            agreements += search.choose_option(game) == reference_option
+            iterations += search.statistics["iterations"]
+        search.close()
+        print("Workers: %d, iterations per decision: %d, reference decision: %d of %d"
+              % (n_workers, iterations / len(positions), agreements, len(positions)))
+
+    print("\nBenchmark: parallel search against single process search")
+    for n_workers in worker_counts[1:]:
+        search = ParallelMCTS(n_workers, time_budget, seed=2)
+        single = MCTSBot(time_budget=time_budget, seed=3)
+        wins = 0
+        for n in range(n_games):
+            game = CompactGame.new_game(2, 5, rng)
+            while game.winner is None:
+                if game.table.active == n % 2:
+                    option = search.choose_option(game)
+                else:
+                    option = single.choose_option(game)
+                game.play_random_option(option, rng)
+            wins += game.winner == n % 2
+        search.close()
+        print("Workers:", n_workers, "won", wins, "of", n_games, "games")
@@ -106,11 +106,27 @@ class Player:
         -------
         None.
         """
-        print("\n" + self.name + "'s Tischkarten:")
+        print(self.get_cards_table_text())
+
+    def get_cards_table_text(self):
+        """
+        Returns the text that show_cards_on_table prints.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        text : str
+            The cards on the table, one line per pig.
+        """
+        lines = ["\n" + self.name + "'s Tischkarten:"]
         for pig in self.cards_table:
             pig_number = pig.get_pig_number()
             current_status = pig.get_current_status()
-            print("Schwein " + str(pig_number) + ": " + ", ".join(current_status))
+            lines.append("Schwein " + str(pig_number) + ": " + ", ".join(current_status))
+        return "\n".join(lines)
 
     # Cards on hand
     def get_card_hand(self, n_card):
@@ -189,11 +205,27 @@ class Player:
         -------
         None.
         """
+        print(self.get_cards_hand_text())
+
+    def get_cards_hand_text(self):
+        """
+        Returns the text that show_cards_in_hand prints.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        text : str
+            The cards in the hand, one line per card.
+        """
         counter = 1
-        print("\nHandkarten:")
+        lines = ["\nHandkarten:"]
         for card in self.cards_hand:
-            print(str(counter) + ": " + card.get_name())
+            lines.append(str(counter) + ": " + card.get_name())
             counter += 1
+        return "\n".join(lines)
 
 
 if __name__ == "__main__":
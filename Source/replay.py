@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+""" Replay of recorded games """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from eventlog import SETUP, DEAL, PLAY, CHANGE, RESHUFFLE, DESTROYED, WINNER
+from eventlog import split_games
+from gameconfig import GameConfig
+from player import Player
+from statesync import card_types
+from tablestate import TableState
+
+
+class ReplayState:
+    # The position at the start of a turn: the bucket of every pig (see
+    # TableState) in table order, the hand cards (indices of
+    # statesync.card_types) of every player, the sizes of the draw deck and
+    # the discard pile and the winner (None while the game is running).
+    __slots__ = ("turn", "pigs", "hands", "draw_size", "discard_size", "winner")
+
+    def __init__(self, turn, pigs, hands, draw_size, discard_size, winner=None):
+        self.turn = turn
+        self.pigs = pigs
+        self.hands = hands
+        self.draw_size = draw_size
+        self.discard_size = discard_size
+        self.winner = winner
+
+    def copy(self):
+        """
+        Returns an independent copy of the state.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        state : ReplayState
+            The copy.
+
+        """
+        return ReplayState(self.turn, [list(flags_list) for flags_list in self.pigs],
+                           [list(hand) for hand in self.hands], self.draw_size,
+                           self.discard_size, self.winner)
+
+
+class Replayer:
+    # For every card (index of card_types): the new bucket of a pig in every
+    # bucket, if the card can be played on the bucket, the target players
+    # (see TableState.card_targets) and if the card stays on the table. The
+    # tables come from TableState, which computes them with the rules of
+    # ActionCard and UpgradeCard.
+    new_flags = [tuple(transition[0] for transition in TableState.transitions[card_type])
+                 for card_type in card_types]
+    playable = [TableState.playable[card_type] for card_type in card_types]
+    targets = [TableState.card_targets[card_type] for card_type in card_types]
+    is_upgrade = [card_type in Card.upgrade_card_types for card_type in card_types]
+
+    def __init__(self, data, keyframe_interval=16, config=None):
+        # Replays the event log of one game (see eventlog), which was played
+        # with the GameConfig config (default: the rules of the game). The
+        # game is replayed once and every keyframe_interval turns a copy of
+        # the state is stored, so seeking a turn replays at most
+        # keyframe_interval turns.
+        self.data = data
+        self.keyframe_interval = keyframe_interval
+        if config is None:
+            config = GameConfig()
+        self.deck_size = config.get_deck_size()
+        self.keyframes = list()
+        self.events_applied = 0
+
+        state = None
+        offset = 0
+        while True:
+            state, offset = self.apply(state, offset, len(self.keyframes) * keyframe_interval)
+            if offset >= len(data) and state.turn < len(self.keyframes) * keyframe_interval:
+                break
+            self.keyframes.append((offset, state.copy()))
+            if offset >= len(data):
+                break
+        self.n_turns = state.turn
+        self.winner = state.winner
+
+    def apply(self, state, offset, stop_turn):
+        """
+        Applies the events from an offset until the start of a turn.
+
+        Parameters
+        ----------
+        state : ReplayState
+            The state at the offset, it is modified. None at the start of the
+            game.
+        offset : int
+            Position of the next event in the data.
+        stop_turn : int
+            Number of the turn to stop at.
+
+        Returns
+        -------
+        (state : ReplayState, offset : int) : tuple
+            The state at the start of stop_turn, or at the end of the game,
+            and the position of the next event.
+
+        """
+        data = self.data
+        new_flags = self.new_flags
+        playable = self.playable
+        is_upgrade = self.is_upgrade
+        end = len(data)
+        start = offset
+        if state is None:
+            byte = data[offset]
+            if byte >> 5 != SETUP:
+                raise ValueError("Das Spiel beginnt nicht mit SETUP")
+            n_players = (byte >> 3 & 3) + 1
+            state = ReplayState(0, [[0] * (byte & 7) for i in range(n_players)],
+                                [list() for i in range(n_players)], self.deck_size, 0)
+            offset += 1
+        pigs = state.pigs
+        hands = state.hands
+        n_players = len(pigs)
+        turn = state.turn
+        draw_size = state.draw_size
+        discard_size = state.discard_size
+        # Game discards a played or changed card after its replacement is
+        # dealt, so a reshuffle for that deal does not take the card
+        pending = 0
+
+        while offset < end:
+            byte = data[offset]
+            kind = byte >> 5
+            if kind == DEAL:
+                hands[byte >> 3 & 3].append(byte & 7)
+                draw_size -= 1
+                offset += 1
+                if pending:
+                    discard_size += 1
+                    pending -= 1
+                continue
+            if kind == DESTROYED:
+                discard_size += 1
+                offset += 1
+                continue
+            if kind == RESHUFFLE:
+                draw_size = discard_size
+                discard_size = 0
+                offset += 1
+                continue
+            if kind == WINNER:
+                state.winner = byte & 3
+                offset += 1
+                continue
+            if kind == SETUP:
+                break
+            # a turn
+            if turn == stop_turn:
+                break
+            active = turn % n_players
+            hand = hands[active]
+            if kind == PLAY:
+                card = byte >> 2 & 7
+                hand.remove(card)
+                transitions = new_flags[card]
+                if byte & 2:
+                    target = data[offset + 1]
+                    table = pigs[target >> 4]
+                    n_pig = (target & 15) - 1
+                    table[n_pig] = transitions[table[n_pig]]
+                    offset += 2
+                else:
+                    can_play = playable[card]
+                    mode = self.targets[card]
+                    for n_player in range(n_players):
+                        if mode == "ALL" or (n_player == active) == (mode == "OWN"):
+                            table = pigs[n_player]
+                            for n_pig, flags in enumerate(table):
+                                if can_play[flags]:
+                                    table[n_pig] = transitions[flags]
+                    offset += 1
+                if not is_upgrade[card]:
+                    pending = 1
+            elif kind == CHANGE:
+                hand.remove(byte & 7)
+                pending = 1
+                offset += 1
+            else:
+                # every card is discarded before its new card is dealt
+                discard_size += 1
+                pending = len(hand) - 1
+                del hand[:]
+                offset += 1
+            turn += 1
+
+        state.turn = turn
+        state.discard_size = discard_size + pending
+        state.draw_size = draw_size
+        self.events_applied += offset - start
+        return state, offset
+
+    def seek(self, turn):
+        """
+        Returns the position at the start of a turn.
+
+        Parameters
+        ----------
+        turn : int
+            Number of the turn, 0 is the first turn. Turns after the end of
+            the game give the final position.
+
+        Returns
+        -------
+        state : ReplayState
+            The position.
+
+        """
+        n_keyframe = min(turn // self.keyframe_interval, len(self.keyframes) - 1)
+        offset, keyframe = self.keyframes[n_keyframe]
+        state, offset = self.apply(keyframe.copy(), offset, turn)
+        return state
+
+    def render(self, state, names=None):
+        """
+        Returns the text of a position in the format of
+        Game.show_all_cards_on_table.
+
+        Parameters
+        ----------
+        state : ReplayState
+            The position.
+        names : list
+            The names of the players. If not given, the players are numbered.
+
+        Returns
+        -------
+        text : string
+            The tables of all players.
+
+        """
+        texts = list()
+        for n_player, flags_list in enumerate(state.pigs):
+            name = names[n_player] if names else "Spieler " + str(n_player + 1)
+            player = Player(name)
+            for n_pig, flags in enumerate(flags_list):
+                player.add_card_to_table(TableState.flags_to_pig(flags, n_pig + 1))
+            texts.append(player.get_cards_table_text())
+        return "\n".join(texts)
+
+
+if __name__ == "__main__":
+    from eventlog import EventLog
+    from game import Game
+    from greedybot import GreedyBot
+    import random
+    import sys
+    import time
+
+    def record_game(seed, snapshots=None):
+        # plays a bot game and stores the position at the start of every turn
+        class RecordingBot(GreedyBot):
+            def choose_for_game(self, game):
+                if snapshots is not None:
+                    snapshots.append(
+                        ([[TableState.pig_to_flags(pig) for pig in player.get_cards_table()]
+                          for player in game.players],
+                         [[card_types.index(card.get_card_type())
+                           for card in player.get_cards_hand()] for player in game.players],
+                         len(game.deck.draw_deck), len(game.deck.discard_pile)))
+                return super().choose_for_game(game)
+
+        random.seed(seed)
+        log = EventLog()
+        game = Game()
+        game.output = lambda text: None
+        game.players = [Player("Anja"), Player("Lars")]
+        game.add_listener(log)
+        game.run_bot_game([RecordingBot(), RecordingBot()])
+        return log.get_data()
+
+    if "--test" in sys.argv:
+        print("\nTest: every turn of 50 games is replayed exactly")
+        mismatches = 0
+        turns = 0
+        for seed in range(50):
+            snapshots = list()
+            replayer = Replayer(record_game(seed, snapshots), keyframe_interval=8)
+            for turn, snapshot in enumerate(snapshots):
+                state = replayer.seek(turn)
+                mismatches += snapshot != (state.pigs, state.hands, state.draw_size,
+                                           state.discard_size)
+            turns += len(snapshots)
+        print("(Expected value: 0). Value:", mismatches, "of", turns, "turns")
+
+        print("\nBenchmark: replay speed")
+        data = b"".join(record_game(seed) for seed in range(200))
+        games = split_games(data)
+        start = time.perf_counter()
+        replayers = [Replayer(data[begin:end], keyframe_interval=1 << 30)
+                     for begin, end in games]
+        elapsed = time.perf_counter() - start
+        events = sum(replayer.events_applied for replayer in replayers)
+        print("%.2f million events per second" % (events / elapsed / 1e6))
+        replayer = Replayer(data[games[0][0]:games[0][1]], keyframe_interval=8)
+        start = time.perf_counter()
+        for i in range(1000):
+            replayer.seek(i % (replayer.n_turns + 1))
+        print("%.1f µs per seek" % ((time.perf_counter() - start) / 1000 * 1e6))
+        sys.exit()
+
+    # python replay.py [log file] [game] [turn]
+    # Without a log file a game is recorded. Without a turn the turns are
+    # shown one after the other.
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as file:
+            data = file.read()
+    else:
+        data = record_game(random.randrange(1 << 30))
+    games = split_games(data)
+    n_game = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    begin, end = games[n_game]
+    replayer = Replayer(data[begin:end])
+    turn = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    while True:
+        state = replayer.seek(turn)
+        print("\nSpiel %d von %d, Zug %d von %d" % (n_game + 1, len(games), state.turn,
+                                                 replayer.n_turns))
+        print(replayer.render(state))
+        if state.winner is not None:
+            print("Der Gewinner ist Spieler", state.winner + 1)
+        elif state.turn < replayer.n_turns:
+            n_player = state.turn % len(state.pigs)
+            print("Spieler %d ist am Zug mit: %s" % (n_player + 1, ", ".join(
+                Card(card_types[card]).get_name() for card in state.hands[n_player])))
+        if len(sys.argv) > 3:
+            break
+        answer = input("\nEnter: nächster Zug, Zahl: Zug anzeigen, q: beenden ")
+        if answer == "q":
+            break
+        turn = int(answer) if answer.isdigit() else min(turn + 1, replayer.n_turns)
@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+
+""" Results of simulated and played games in a SQLite database """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from eventlog import read_events
+
+import queue
+import sqlite3
+import threading
+
+
+# games: one row per game, deck is the card composition (see format_deck)
+# seats: one row per player of a game with the policy (name of the bot) and
+#        if the player has won
+# turns: one row per turn, action is PLAY, CHANGE or CHANGE_ALL, card is
+#        NULL for CHANGE_ALL, destroyed is the number of upgrades the turn
+#        destroyed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id              INTEGER PRIMARY KEY,
+    seed            INTEGER,
+    source          TEXT,
+    deck            TEXT,
+    n_players       INTEGER,
+    n_pigs          INTEGER,
+    winner          INTEGER,
+    turns           INTEGER,
+    reshuffles      INTEGER
+);
+CREATE TABLE IF NOT EXISTS seats (
+    game_id         INTEGER,
+    seat            INTEGER,
+    policy          TEXT,
+    won             INTEGER
+);
+CREATE TABLE IF NOT EXISTS turns (
+    game_id         INTEGER,
+    turn            INTEGER,
+    player          INTEGER,
+    action          TEXT,
+    card            TEXT,
+    destroyed       INTEGER
+);
+"""
+
+# SQLite assigns the id of a game, so several writers can share a file
+INSERT_GAME = "INSERT INTO games VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_SEAT = "INSERT INTO seats VALUES (?, ?, ?, ?)"
+INSERT_TURN = "INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def format_deck(card_counts):
+    """
+    Returns the text of a card composition for the deck column.
+
+    Parameters
+    ----------
+    card_counts : dict
+        Number of cards per card type, see Deck.get_card_counts.
+
+    Returns
+    -------
+    deck : string
+        E.g. "MUD=21,RAIN=4,...".
+
+    """
+    return ",".join("%s=%d" % item for item in card_counts.items())
+
+
+def get_turn_rows(data):
+    """
+    Returns the turn summaries of an event log (see eventlog).
+
+    Parameters
+    ----------
+    data : bytes
+        The event log of one game.
+
+    Returns
+    -------
+    (turn_rows : list, reshuffles : int) : tuple
+        (turn, player, action, card, destroyed) per turn and the number of
+        reshuffles.
+
+    """
+    rows = list()
+    reshuffles = 0
+    for event in read_events(data):
+        kind = event[0]
+        if kind == "play":
+            rows.append([len(rows), event[1], "PLAY", event[2], 0])
+        elif kind == "change":
+            rows.append([len(rows), event[1], "CHANGE", event[2], 0])
+        elif kind == "change_all":
+            rows.append([len(rows), event[1], "CHANGE_ALL", None, 0])
+        elif kind == "destroyed":
+            rows[-1][4] += 1
+        elif kind == "reshuffle":
+            reshuffles += 1
+    return [tuple(row) for row in rows], reshuffles
+
+
+class ResultWriter:
+
+    def __init__(self, path, results=None, batch_size=20000):
+        # A thread that is the only writer of the database. Producers put
+        # their results (see add_game) into the queue results and continue
+        # without waiting for the database, the thread writes the waiting
+        # results with prepared statements in one transaction per
+        # batch_size rows. The queue can be a multiprocessing queue, then
+        # worker processes put their results directly. If the thread fails,
+        # its exception is raised again by the next add_game or close.
+        self.path = path
+        self.results = results if results is not None else queue.SimpleQueue()
+        self.batch_size = batch_size
+        self.thread = None
+        self.error = None
+        self.games_written = 0
+        self.rows_written = 0
+        self.transactions = 0
+
+    def start(self):
+        """
+        Starts the writer thread.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add_game(self, seed, policies, winner, turns, source="sim", deck="", n_pigs=0,
+                 reshuffles=0, turn_rows=()):
+        """
+        Puts the result of a game into the queue.
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the game.
+        policies : list
+            Name of the policy of every seat.
+        winner : int
+            Index of the winner, None if there is none.
+        turns : int
+            Number of turns.
+        source : string
+            Where the game comes from, e.g. "sim" or "server".
+        deck : string
+            Card composition, see format_deck.
+        n_pigs : int
+            Number of pigs per player.
+        reshuffles : int
+            Number of reshuffles.
+        turn_rows : list
+            (turn, player, action, card, destroyed) per turn, see
+            get_turn_rows.
+
+        Returns
+        -------
+        None.
+
+        Raises
+        ------
+        Exception
+            The exception of the writer thread if it has failed.
+
+        """
+        self.check_error()
+        self.results.put((seed, tuple(policies), winner, turns, source, deck, n_pigs,
+                          reshuffles, tuple(turn_rows)))
+
+    def close(self):
+        """
+        Writes the remaining results and stops the writer thread.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        Raises
+        ------
+        Exception
+            The exception of the writer thread if it has failed.
+
+        """
+        self.results.put(None)
+        self.thread.join()
+        self.check_error()
+
+    def check_error(self):
+        """
+        Raises the exception of the writer thread again if it has failed, so
+        the results are not lost silently.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        """
+        The writer thread: writes the results of the queue until it gets
+        None.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            connection = open_database(self.path)
+        except Exception as error:
+            self.error = error
+            return
+        try:
+            running = True
+            while running:
+                results = list()
+                n_rows = 0
+                result = self.results.get()
+                while True:
+                    if result is None:
+                        running = False
+                        break
+                    results.append(result)
+                    n_rows += 1 + len(result[1]) + len(result[8])
+                    if n_rows >= self.batch_size:
+                        break
+                    # take what is waiting, but do not wait for more
+                    try:
+                        result = self.results.get_nowait()
+                    except queue.Empty:
+                        break
+                if results:
+                    self.write(connection, results)
+                    self.games_written += len(results)
+                    self.rows_written += n_rows
+                    self.transactions += 1
+        except Exception as error:
+            self.error = error
+        finally:
+            connection.close()
+
+    @staticmethod
+    def write(connection, results):
+        """
+        Writes results in one transaction. The games are inserted one by one
+        to get the ids SQLite assigns, the seats and turns with one statement
+        each.
+
+        Parameters
+        ----------
+        connection : sqlite3.Connection
+            The connection of the writer thread.
+        results : list
+            The results, see add_game.
+
+        Returns
+        -------
+        None.
+
+        """
+        seats, turns = list(), list()
+        with connection:
+            cursor = connection.cursor()
+            for seed, policies, winner, n_turns, source, deck, n_pigs, reshuffles, \
+                    turn_rows in results:
+                cursor.execute(INSERT_GAME, (seed, source, deck, len(policies), n_pigs,
+                                             winner, n_turns, reshuffles))
+                game_id = cursor.lastrowid
+                seats.extend((game_id, seat, policy, seat == winner)
+                             for seat, policy in enumerate(policies))
+                turns.extend((game_id,) + row for row in turn_rows)
+            cursor.executemany(INSERT_SEAT, seats)
+            cursor.executemany(INSERT_TURN, turns)
+
+
+def open_database(path):
+    """
+    Opens the database in WAL mode, so reports can be read while the writer
+    writes, and creates the tables.
+
+    Parameters
+    ----------
+    path : string
+        Path of the database file.
+
+    Returns
+    -------
+    connection : sqlite3.Connection
+        The connection.
+
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class ResultDatabase:
+
+    def __init__(self, path):
+        # Reports over the results written by ResultWriter.
+        self.connection = open_database(path)
+
+    def get_win_rates(self):
+        """
+        Returns the win rate of every policy.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        win_rates : dict
+            policy -> (number of games, win rate).
+
+        """
+        rows = self.connection.execute(
+            "SELECT policy, COUNT(*), AVG(won) FROM seats GROUP BY policy ORDER BY policy")
+        return {policy: (n_games, win_rate) for policy, n_games, win_rate in rows}
+
+    def get_win_rates_by_deck(self):
+        """
+        Returns the win rate of every policy and seat for every card
+        composition.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        win_rates : dict
+            (deck, policy, seat) -> (number of games, win rate).
+
+        """
+        rows = self.connection.execute(
+            "SELECT games.deck, seats.policy, seats.seat, COUNT(*), AVG(seats.won) "
+            "FROM seats JOIN games ON games.id = seats.game_id "
+            "GROUP BY games.deck, seats.policy, seats.seat")
+        return {(deck, policy, seat): (n_games, win_rate)
+                for deck, policy, seat, n_games, win_rate in rows}
+
+    def get_turn_statistics(self):
+        """
+        Returns the mean number of turns and reshuffles for every card
+        composition.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        statistics : dict
+            deck -> (number of games, mean turns, mean reshuffles).
+
+        """
+        rows = self.connection.execute(
+            "SELECT deck, COUNT(*), AVG(turns), AVG(reshuffles) FROM games GROUP BY deck")
+        return {deck: (n_games, turns, reshuffles)
+                for deck, n_games, turns, reshuffles in rows}
+
+    def get_card_plays(self):
+        """
+        Returns how often every card type was played per game.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        plays : dict
+            card type -> plays per game.
+
+        """
+        n_games = self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0] or 1
+        rows = self.connection.execute(
+            "SELECT card, COUNT(*) FROM turns WHERE action = 'PLAY' GROUP BY card")
+        return {card: count / n_games for card, count in rows}
+
+    def close(self):
+        """
+        Closes the connection.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    from deck import Deck
+    from eventlog import EventLog
+    from game import Game
+    from greedybot import GreedyBot
+    from player import Player
+    from tablestate import TableState
+    import os
+    import random
+    import shutil
+    import tempfile
+    import time
+
+    class RandomBot:
+        def choose_for_game(self, game):
+            hand = [card.get_card_type() for card in game.active_player.get_cards_hand()]
+            return random.choice(TableState.from_game(game).get_options(hand))
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "results.db")
+    writer = ResultWriter(path)
+    writer.start()
+
+    print("\nSimulation: greedy against random")
+    policies = {"greedy": GreedyBot(), "random": RandomBot()}
+    deck = format_deck(Deck().get_card_counts())
+    put_time = 0.0
+    logs = list()
+    for seed in range(400):
+        random.seed(seed)
+        names = ["greedy", "random"] if seed % 2 else ["random", "greedy"]
+        log = EventLog()
+        game = Game()
+        game.output = lambda text: None
+        game.players = [Player(name) for name in names]
+        game.add_listener(log)
+        winner = game.run_bot_game([policies[name] for name in names])
+        start = time.perf_counter()
+        turn_rows, reshuffles = get_turn_rows(log.get_data())
+        writer.add_game(seed, names, winner, game.round_counter, deck=deck,
+                        n_pigs=game.number_of_pigs(), reshuffles=reshuffles,
+                        turn_rows=turn_rows)
+        put_time += time.perf_counter() - start
+        logs.append((seed, names, winner, game.round_counter, turn_rows, reshuffles))
+    print("%.1f µs per game for the simulation to hand over its result" % (put_time / 400 * 1e6))
+
+    print("\nBenchmark: writer throughput")
+    n_rows = writer.rows_written
+    start = time.perf_counter()
+    for i in range(25):
+        for seed, names, winner, turns, turn_rows, reshuffles in logs:
+            writer.add_game(seed, names, winner, turns, deck=deck, reshuffles=reshuffles,
+                            turn_rows=turn_rows)
+    writer.close()
+    elapsed = time.perf_counter() - start
+    print("%d rows, %d transactions, %.0f rows per second"
+          % (writer.rows_written, writer.transactions,
+             (writer.rows_written - n_rows) / elapsed))
+
+    database = ResultDatabase(path)
+    print("\nTest: every game is written")
+    print("(Expected value: %d). Value:" % (26 * 400),
+          database.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0])
+    print("Win rates:", database.get_win_rates())
+    print("Turns per deck:", list(database.get_turn_statistics().values()))
+    print("Plays per game:", {card: round(count, 2)
+                              for card, count in database.get_card_plays().items()})
+    database.close()
+
+    print("\nTest: two writers of the same file get different game ids")
+    writers = [ResultWriter(path), ResultWriter(path)]
+    for writer in writers:
+        writer.start()
+    for seed in range(200):
+        writers[seed % 2].add_game(seed, ["greedy", "random"], 0, 10)
+    for writer in writers:
+        writer.close()
+    database = ResultDatabase(path)
+    print("(Expected value: %d). Value:" % (26 * 400 + 200),
+          database.connection.execute("SELECT COUNT(DISTINCT id) FROM games").fetchone()[0])
+    print("(Expected value: 0). Value:", database.connection.execute(
+        "SELECT COUNT(*) FROM seats WHERE game_id NOT IN (SELECT id FROM games)").fetchone()[0])
+    database.close()
+
+    print("\nTest: the error of the writer thread is raised")
+    writer = ResultWriter(directory)
+    writer.start()
+    writer.thread.join()
+    try:
+        writer.add_game(0, ["greedy"], 0, 10)
+        print("Status: False")
+    except sqlite3.Error as error:
+        print("Status: True", error)
+    shutil.rmtree(directory)
@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+
+""" Router for a game server with several worker processes """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from server import GameServer
+from statesync import TEXT, encode_text
+
+import asyncio
+import multiprocessing
+
+
+def run_worker(n_players, idle_timeout, max_games, worker, n_workers, connection):
+    """
+    Runs one worker process: a GameServer on a free port of localhost. The
+    port is sent to the router through the pipe.
+
+    Parameters
+    ----------
+    n_players : int
+        Number of players per game.
+    idle_timeout : float
+        Seconds until an idle game is hibernated, None to keep all games in
+        memory.
+    max_games : int
+        Maximum number of games at the same time, None for no limit.
+    worker : int
+        Index of the worker.
+    n_workers : int
+        Number of workers, the game ids of the worker are worker + 1,
+        worker + 1 + n_workers, ...
+    connection : multiprocessing.connection.Connection
+        The pipe to the router.
+
+    Returns
+    -------
+    None.
+
+    """
+    async def serve():
+        server = GameServer(n_players, "127.0.0.1", 0, idle_timeout, max_games=max_games,
+                            id_offset=worker, id_stride=n_workers)
+        await server.start()
+        connection.send(server.port)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardRouter:
+    wait_text = "Warte auf weitere Spieler..."
+    # the worker has taken the group out of its lobby when it announces the
+    # game or tells the players that all tables are taken (see GameServer)
+    seated_texts = (b"Spiel ", b"Alle Tische sind besetzt")
+
+    def __init__(self, n_workers=2, n_players=2, host="127.0.0.1", port=8765,
+                 idle_timeout=None, max_games=None):
+        # Python runs the game logic of one process on one core, so the games
+        # are spread over n_workers processes, each with its own GameServer
+        # on localhost. The router does the name question itself and forwards
+        # every connection to a worker. The players of one game must be on
+        # the same worker, so the players wait in the lobby of the router
+        # until n_players are there. The group is sent to the worker with the
+        # fewest open connections, one player after the other, and the next
+        # group of this worker waits until the game is announced. If the
+        # worker cannot be reached, the players of the group wait again. The
+        # workers give the game ids worker + 1, worker + 1 + n_workers, ... and
+        # tell them the players, so "/watch <id>" is forwarded to the worker
+        # that owns the game. Every worker runs at most max_games games at
+        # the same time (see GameServer).
+        self.n_workers = n_workers
+        self.n_players = n_players
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_games = max_games
+        self.server = None
+        self.processes = list()
+        self.worker_ports = list()
+
+        # (reader, writer, name) of the waiting players
+        self.lobby = list()
+        # a group is sent to a worker at a time and the next group waits
+        # until the worker has seated it, so the players of two groups do not
+        # mix in the lobby of the worker
+        self.worker_locks = [asyncio.Lock() for i in range(n_workers)]
+        # open player connections, running and started games per worker
+        self.connections = [0] * n_workers
+        self.games = [0] * n_workers
+        self.games_started = [0] * n_workers
+
+    async def start(self):
+        """
+        Starts the worker processes and listens for connections.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        context = multiprocessing.get_context("spawn")
+        pipes = list()
+        for i in range(self.n_workers):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_worker, daemon=True,
+                                      args=(self.n_players, self.idle_timeout, self.max_games,
+                                            i, self.n_workers, sender))
+            process.start()
+            self.processes.append(process)
+            pipes.append(receiver)
+        loop = asyncio.get_running_loop()
+        for receiver in pipes:
+            self.worker_ports.append(await loop.run_in_executor(None, receiver.recv))
+        self.server = await asyncio.start_server(self.handle_connection,
+                                                 self.host, self.port, backlog=4096)
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    def choose_worker(self):
+        """
+        Returns the worker of the next group, the least loaded worker.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        worker : int
+            Index of the worker.
+
+        """
+        return min(range(self.n_workers), key=self.connections.__getitem__)
+
+    def get_watch_target(self, name):
+        """
+        Translates a "/watch [id]" answer of the router to a worker.
+
+        Parameters
+        ----------
+        name : string
+            The answer to the name question.
+
+        Returns
+        -------
+        (worker : int, name : string) : tuple
+            The worker and the answer for the worker.
+
+        """
+        game_id = name[len("/watch"):].strip()
+        if game_id.isdigit() and int(game_id) > 0:
+            return (int(game_id) - 1) % self.n_workers, "/watch " + game_id
+        worker = max(range(self.n_workers), key=self.games.__getitem__)
+        return worker, "/watch"
+
+    @staticmethod
+    def is_connected(member):
+        """
+        Checks if a waiting player is still connected.
+
+        Parameters
+        ----------
+        member : tuple
+            (reader, writer, name) of the player.
+
+        Returns
+        -------
+        connected : bool
+            False if the player has closed the connection.
+
+        """
+        reader, writer, name = member
+        return not reader.at_eof() and not writer.is_closing()
+
+    @staticmethod
+    async def read_question(reader):
+        """
+        Reads the lines of a worker until its name question.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection to the worker.
+
+        Returns
+        -------
+        asked : bool
+            False if the worker has closed the connection before.
+
+        """
+        while True:
+            line = await reader.readline()
+            if not line:
+                return False
+            if line.startswith(b"? "):
+                return True
+
+    @classmethod
+    async def read_seated(cls, reader, binary):
+        """
+        Reads the messages of a worker to a player until the group of the
+        player is seated (see seated_texts).
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection to the worker.
+        binary : bool
+            True if the player gets binary frames.
+
+        Returns
+        -------
+        data : bytes
+            The messages for the player without the wait text, the router
+            has told the player to wait already. None if the worker has
+            closed the connection before.
+
+        """
+        data = b""
+        while True:
+            if binary:
+                size = await reader.read(1)
+                if not size:
+                    return None
+                message = size + await reader.readexactly(size[0])
+                text = message[2:] if message[1] >> 6 == TEXT else b""
+            else:
+                message = await reader.readline()
+                if not message:
+                    return None
+                text = message
+                if message.rstrip() == cls.wait_text.encode():
+                    continue
+            data += message
+            if text.startswith(cls.seated_texts):
+                return data
+
+    @staticmethod
+    async def pipe(reader, writer):
+        """
+        Copies everything from a reader to a writer until the connection is
+        closed.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from one connection.
+        writer : asyncio.StreamWriter
+            Writes to the other connection.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Called for every new connection: asks for the name, puts a player
+        into the lobby and forwards a spectator to the worker of the game.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection of the client.
+        writer : asyncio.StreamWriter
+            Writes to the connection of the client.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            writer.write("Wilkommen bei Drecksau!\n? Was ist dein Name? \n".encode())
+            await writer.drain()
+            name = await reader.readline()
+        except (ConnectionError, OSError):
+            name = None
+        if not name:
+            writer.close()
+            return
+        if name.startswith(b"/watch"):
+            await self.forward_spectator(reader, writer, name.decode(errors="replace"))
+            return
+        # the worker tells the waiting players nothing, see forward_player
+        if name.startswith(b"/binary"):
+            writer.write(bytes([len(encode_text(self.wait_text))]) + encode_text(self.wait_text))
+        else:
+            writer.write((self.wait_text + "\n").encode())
+        self.lobby.append((reader, writer, name))
+        # like in the GameServer, the last player of a group runs its game
+        await asyncio.gather(*(self.play_group(group) for group in self.form_groups()))
+
+    def form_groups(self):
+        """
+        Takes the groups of n_players connected players out of the lobby.
+        Players who have left are removed.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        groups : list
+            The groups, lists of (reader, writer, name) of the players.
+
+        """
+        for member in self.lobby:
+            if not self.is_connected(member):
+                member[1].close()
+        self.lobby = [member for member in self.lobby if self.is_connected(member)]
+        groups = list()
+        while len(self.lobby) >= self.n_players:
+            groups.append(self.lobby[:self.n_players])
+            del self.lobby[:self.n_players]
+        return groups
+
+    async def play_group(self, group):
+        """
+        Sends a group of players to a worker and forwards their connections
+        until the game is over. If the worker cannot be reached, the players
+        who are still connected wait in the lobby again.
+
+        Parameters
+        ----------
+        group : list
+            (reader, writer, name) of the players.
+
+        Returns
+        -------
+        None.
+
+        """
+        worker = self.choose_worker()
+        # counted at once, so the next group goes to another worker
+        self.connections[worker] += len(group)
+        self.games[worker] += 1
+        links = list()
+        try:
+            async with self.worker_locks[worker]:
+                # the worker only gets the names when all players are
+                # connected, so it never seats a part of the group
+                for member in group:
+                    links.append(await asyncio.open_connection(
+                        "127.0.0.1", self.worker_ports[worker]))
+                    if not await self.read_question(links[-1][0]):
+                        raise ConnectionError("Worker " + str(worker) + " antwortet nicht")
+                for (reader, writer, name), (worker_reader, worker_writer) in zip(group, links):
+                    worker_writer.write(name)
+                    await worker_writer.drain()
+                # the lock is held until the group has left the lobby of the
+                # worker, the first player hears it like the others
+                first_data = await self.read_seated(links[0][0],
+                                                    group[0][2].startswith(b"/binary"))
+                if first_data is None:
+                    raise ConnectionError("Worker " + str(worker) + " antwortet nicht")
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            for worker_reader, worker_writer in links:
+                worker_writer.close()
+            self.connections[worker] -= len(group)
+            self.games[worker] -= 1
+            self.lobby[:0] = [member for member in group if self.is_connected(member)]
+            return
+        self.games_started[worker] += 1
+        try:
+            await asyncio.gather(*(self.forward_player(worker, member, link, data)
+                                   for member, link, data in zip(
+                                       group, links, [first_data] + [None] * len(group))))
+        finally:
+            self.games[worker] -= 1
+
+    async def forward_player(self, worker, member, link, data=None):
+        """
+        Forwards the connection of a player to the worker until it is closed.
+
+        Parameters
+        ----------
+        worker : int
+            Index of the worker.
+        member : tuple
+            (reader, writer, name) of the player.
+        link : tuple
+            (reader, writer) of the connection to the worker.
+        data : bytes
+            The messages of the worker that have been read already (see
+            read_seated), None if nothing has been read.
+
+        Returns
+        -------
+        None.
+
+        """
+        reader, writer, name = member
+        worker_reader, worker_writer = link
+        try:
+            if data is not None:
+                writer.write(data)
+            elif not name.startswith(b"/binary"):
+                # the player has already been told to wait by the router
+                line = await worker_reader.readline()
+                if line.rstrip() != self.wait_text.encode():
+                    writer.write(line)
+            await asyncio.gather(self.pipe(reader, worker_writer),
+                                 self.pipe(worker_reader, writer))
+        except (ConnectionError, OSError):
+            writer.close()
+            worker_writer.close()
+        finally:
+            self.connections[worker] -= 1
+
+    async def forward_spectator(self, reader, writer, name):
+        """
+        Forwards the connection of a spectator to the worker of the game.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection of the client.
+        writer : asyncio.StreamWriter
+            Writes to the connection of the client.
+        name : string
+            The answer "/watch [id]" of the spectator.
+
+        Returns
+        -------
+        None.
+
+        """
+        worker, watch = self.get_watch_target(name)
+        try:
+            worker_reader, worker_writer = await asyncio.open_connection(
+                "127.0.0.1", self.worker_ports[worker])
+            # the worker asks for the name again, the answer is already known
+            if not await self.read_question(worker_reader):
+                worker_writer.close()
+                writer.close()
+                return
+            worker_writer.write((watch + "\n").encode())
+            await asyncio.gather(self.pipe(reader, worker_writer),
+                                 self.pipe(worker_reader, writer))
+        except (ConnectionError, OSError):
+            writer.close()
+
+    def close(self):
+        """
+        Stops listening and terminates the workers.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.server is not None:
+            self.server.close()
+        for process in self.processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    import sys
+
+    async def connect(port, name):
+        # connects a text client and answers the name question
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while not (await reader.readline()).startswith(b"? "):
+            pass
+        writer.write((name + "\n").encode())
+        return reader, writer
+
+    async def read_until(reader, text):
+        # returns the first line that contains text, None at the end
+        while True:
+            line = (await reader.readline()).decode()
+            if not line or text in line:
+                return line or None
+
+    async def test():
+        router = ShardRouter(2, 2, "127.0.0.1", 0)
+        await router.start()
+
+        print("\nTest: a player who leaves the lobby does not get a seat")
+        reader, writer = await connect(router.port, "Anja")
+        writer.close()
+        await asyncio.sleep(0.1)
+        players = [await connect(router.port, name) for name in ("Lars", "Ricky")]
+        lines = [await read_until(reader, "Spiel ") for reader, writer in players]
+        print("(Expected value: True). Value:", lines[0] is not None and lines[0] == lines[1])
+        print("(Expected value: 1). Value:", sum(router.games_started))
+
+        print("\nTest: /watch with the id of the game goes to its worker")
+        game_id = lines[0].split()[1].rstrip(",")
+        reader, writer = await asyncio.open_connection("127.0.0.1", router.port)
+        await reader.readline()
+        await reader.readline()
+        writer.write(("/watch " + game_id + "\n").encode())
+        header = await reader.read(1)
+        data = await reader.readexactly(header[0])
+        print("(Expected value: True). Value:", b"gibt es nicht" not in data)
+        writer.close()
+        for reader, writer in players:
+            writer.close()
+        await asyncio.sleep(0.1)
+        print("(Expected value: [0, 0] [0, 0]). Value:", router.games, router.connections)
+        router.close()
+
+    if "--test" in sys.argv:
+        asyncio.run(test())
+        sys.exit()
+
+    # python router.py [port] [number of workers] [number of players per game]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    n_players = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    async def main():
+        router = ShardRouter(n_workers, n_players, "0.0.0.0", port)
+        await router.start()
+        print("Drecksau Router auf Port", port, "mit", n_workers, "Prozessen")
+        try:
+            async with router.server:
+                await router.server.serve_forever()
+        finally:
+            router.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,672 @@
+# -*- coding: utf-8 -*-
+
+""" Game server """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from botscheduler import BotScheduler, BotSeat
+from game import Game
+from hibernation import SessionStore
+from player import Player
+from spectator import SpectatorChannel
+from statesync import StateEncoder, SyncState, encode_question, encode_text
+
+import asyncio
+import math
+import tempfile
+import time
+
+
+class TokenBucket:
+    # Limits the answers of a player to rate per second on average, with
+    # bursts of up to burst answers. An answer beyond the limit is delayed
+    # until its token is available, so a flooding client slows down itself
+    # and not the games of the others.
+    __slots__ = ("rate", "burst", "tokens", "time")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.time = time.monotonic()
+
+    def take(self):
+        """
+        Takes a token.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        delay : float
+            Seconds to wait until the token is available, 0.0 if there was
+            one.
+
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.time) * self.rate) - 1
+        self.time = now
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class Seat:
+    # One connection of a player. The protocol is line based: the server
+    # sends text lines, a line starting with "? " is a question and the
+    # client answers with one line.
+    # A client that answers the name question with "/binary <name>" gets no
+    # text but binary frames instead: one byte length and one message of
+    # statesync. It can answer any question with "/resync" to get a keyframe.
+    # A client that answers "/watch [game id]" is a spectator of a running
+    # game and gets the binary frames without hand cards (see
+    # SpectatorChannel).
+    # A player whose unsent data grows above max_buffer bytes does not read
+    # and is disconnected (dropped is set), the answers are limited by the
+    # TokenBucket limiter.
+    __slots__ = ("reader", "writer", "name", "encoder", "max_buffer", "limiter",
+                 "dropped", "throttled")
+
+    def __init__(self, reader, writer, max_buffer=None, limiter=None):
+        self.reader = reader
+        self.writer = writer
+        self.name = None
+        self.encoder = None
+        self.max_buffer = max_buffer
+        self.limiter = limiter
+        self.dropped = False
+        self.throttled = 0
+
+    def write(self, data):
+        """
+        Writes data without waiting and disconnects the player if too much
+        data is waiting to be sent.
+
+        Parameters
+        ----------
+        data : bytes
+            The data.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.writer.is_closing():
+            return
+        self.writer.write(data)
+        if (self.max_buffer is not None
+                and self.writer.transport.get_write_buffer_size() > self.max_buffer):
+            # close would wait until the buffer is sent
+            self.dropped = True
+            self.writer.transport.abort()
+
+    def send(self, text):
+        """
+        Sends text to the player without waiting.
+
+        Parameters
+        ----------
+        text : string
+            The text, it can have several lines.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.encoder is None:
+            self.write((text + "\n").encode())
+
+    def send_frame(self, data):
+        """
+        Sends a binary message to the player without waiting.
+
+        Parameters
+        ----------
+        data : bytes
+            The message (see statesync).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.write(bytes([len(data)]) + data)
+
+    def send_notice(self, text):
+        """
+        Sends a message as text or, to a binary client, as TEXT frame.
+
+        Parameters
+        ----------
+        text : string
+            The message.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.encoder is not None:
+            self.send_frame(encode_text(text))
+        else:
+            self.send(text)
+
+    def sync(self, game, n_player):
+        """
+        Sends the changes of the game since the last sync to a binary client.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+        n_player : int
+            Index of the player of this seat.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.encoder is not None:
+            data = self.encoder.encode(SyncState.from_game(game, n_player))
+            if data is not None:
+                self.send_frame(data)
+
+    async def ask(self, prompt, prompt_key=None):
+        """
+        Sends a question and waits for the answer.
+
+        Parameters
+        ----------
+        prompt : string
+            The question, it can have several lines.
+        prompt_key : string
+            The key of the prompt in Game.prompts, needed for binary clients.
+
+        Returns
+        -------
+        answer : string
+            The answer of the player.
+
+        """
+        await self.send_question(prompt, prompt_key)
+        return await self.read_answer()
+
+    async def send_question(self, prompt, prompt_key=None):
+        """
+        Sends a question. The last line of the prompt is marked as question.
+
+        Parameters
+        ----------
+        prompt : string
+            The question, it can have several lines.
+        prompt_key : string
+            The key of the prompt in Game.prompts, needed for binary clients.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.encoder is not None:
+            self.send_frame(encode_question(prompt_key))
+        else:
+            text, newline, question = prompt.rpartition("\n")
+            if newline:
+                self.send(text)
+            self.send("? " + question)
+        await self.writer.drain()
+
+    async def read_answer(self):
+        """
+        Waits for the answer to the last question.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        answer : string
+            The answer of the player.
+
+        """
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Verbindung zu " + str(self.name) + " verloren")
+        if self.limiter is not None:
+            delay = self.limiter.take()
+            if delay:
+                self.throttled += 1
+                await asyncio.sleep(delay)
+        return line.decode(errors="replace").strip()
+
+    def close(self):
+        """
+        Closes the connection.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.writer.is_closing():
+            self.writer.close()
+
+
+class Hibernation(Exception):
+    # Raised out of Game.run_game_async when the active player has not
+    # answered the first question of his turn within the idle timeout. The
+    # answer is still read by the task answer.
+
+    def __init__(self, answer):
+        super().__init__("Spiel wird ausgelagert")
+        self.answer = answer
+
+
+class GameServer:
+
+    def __init__(self, n_players=2, host="127.0.0.1", port=8765, idle_timeout=None,
+                 store=None, n_bots=0, scheduler=None, max_games=None, max_queue=None,
+                 max_buffer=262144, answer_rate=None, answer_burst=10, id_offset=0,
+                 id_stride=1, speculator=None):
+        # Every connection asks for a name and waits in the lobby until
+        # n_players connections are waiting, then they play one Game. A game
+        # is one task, all games of the process share one event loop.
+        # If the active player does not answer within idle_timeout seconds at
+        # the start of his turn, the game is written to the SessionStore and
+        # removed from memory until the answer arrives. Without store the
+        # games are written to a temporary directory.
+        # n_bots of the n_players seats of every game are bots, which are
+        # decided in batches by the BotScheduler. With a Speculator a bot
+        # prepares its next turn while the player before it is thinking.
+        # At most max_games games run at the same time, the players of further
+        # games wait with an estimated waiting time. If max_queue players are
+        # waiting, new players are rejected. Every player can send
+        # answer_rate answers per second (see TokenBucket) and is
+        # disconnected if more than max_buffer bytes wait to be sent to him.
+        # The n-th game has the id id_offset + (n - 1) * id_stride + 1, so
+        # the workers of a ShardRouter give different ids. The players are
+        # told the id, spectators watch it with "/watch <id>".
+        self.n_players = n_players
+        self.host = host
+        self.port = port
+        self.lobby = list()
+        self.server = None
+        # maps the ids of the running games to their spectator channels
+        self.channels = dict()
+        self.spectators_dropped = 0
+        self.idle_timeout = idle_timeout
+        self.store = store
+        if idle_timeout is not None and store is None:
+            self.store = SessionStore(tempfile.mkdtemp(prefix="drecksau"))
+        self.n_bots = n_bots
+        self.scheduler = scheduler
+        if n_bots and scheduler is None:
+            self.scheduler = BotScheduler()
+        self.speculator = speculator
+        self.max_games = max_games
+        self.max_queue = max_queue
+        self.max_buffer = max_buffer
+        self.answer_rate = answer_rate
+        self.answer_burst = answer_burst
+        self.id_offset = id_offset
+        self.id_stride = id_stride
+        self.slots = asyncio.Semaphore(max_games) if max_games else None
+        # players whose games wait for a free slot
+        self.queued = 0
+        # moving average of the duration of the finished games
+        self.mean_game_time = None
+
+        self.games_started = 0
+        self.games_finished = 0
+        self.games_aborted = 0
+        self.games_hibernating = 0
+        self.hibernations = 0
+        self.players_rejected = 0
+        self.players_dropped = 0
+        self.answers_throttled = 0
+
+    async def handle_connection(self, reader, writer):
+        """
+        Called for every new connection: asks for the name of the player and
+        starts a game when the lobby is full.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            Reads from the connection.
+        writer : asyncio.StreamWriter
+            Writes to the connection.
+
+        Returns
+        -------
+        None.
+
+        """
+        limiter = None
+        if self.answer_rate:
+            limiter = TokenBucket(self.answer_rate, self.answer_burst)
+        seat = Seat(reader, writer, self.max_buffer, limiter)
+        try:
+            seat.send("Wilkommen bei Drecksau!")
+            seat.name = await seat.ask("Was ist dein Name? ") or "Spieler"
+            if seat.name.startswith("/binary"):
+                seat.name = seat.name[len("/binary"):].strip() or "Spieler"
+                seat.encoder = StateEncoder()
+            elif seat.name.startswith("/watch"):
+                self.add_spectator(seat, seat.name[len("/watch"):].strip())
+                return
+        except (ConnectionError, OSError):
+            seat.close()
+            return
+        if self.max_queue is not None and self.queued >= self.max_queue:
+            self.players_rejected += 1
+            seat.send_notice("Der Server ist voll, versuche es später nochmals")
+            try:
+                await writer.drain()
+            except (ConnectionError, OSError):
+                pass
+            seat.close()
+            return
+        seat.send("Warte auf weitere Spieler...")
+        self.lobby.append(seat)
+        n_humans = self.n_players - self.n_bots
+        if len(self.lobby) >= n_humans:
+            # players who left while waiting do not get a seat
+            for waiting in self.lobby:
+                if waiting.reader.at_eof():
+                    waiting.close()
+            self.lobby = [waiting for waiting in self.lobby if not waiting.writer.is_closing()]
+        if len(self.lobby) >= n_humans:
+            seats = self.lobby[:n_humans]
+            del self.lobby[:n_humans]
+            await self.admit(seats)
+
+    async def admit(self, seats):
+        """
+        Waits for a free slot and plays the game. The players are told how
+        long they probably have to wait.
+
+        Parameters
+        ----------
+        seats : list
+            The Seat objects of the human players.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.slots is None:
+            await self.run_session(seats)
+            return
+        if self.slots.locked():
+            self.queued += len(seats)
+            text = "Alle Tische sind besetzt"
+            if self.mean_game_time is not None:
+                # a slot becomes free every mean_game_time / max_games seconds
+                games_ahead = self.queued // len(seats)
+                text += ", geschätzte Wartezeit: %d s" % math.ceil(
+                    games_ahead * self.mean_game_time / self.max_games)
+            for seat in seats:
+                seat.send_notice(text)
+            try:
+                await self.slots.acquire()
+            finally:
+                self.queued -= len(seats)
+        else:
+            await self.slots.acquire()
+        try:
+            await self.run_session(seats)
+        finally:
+            self.slots.release()
+
+    def add_spectator(self, seat, game_id):
+        """
+        Adds a connection as spectator to a running game.
+
+        Parameters
+        ----------
+        seat : Seat
+            The connection.
+        game_id : string
+            The id of the game. If empty, the latest game is chosen.
+
+        Returns
+        -------
+        None.
+
+        """
+        channel = None
+        if game_id.isdigit():
+            channel = self.channels.get(int(game_id))
+        elif self.channels:
+            channel = self.channels[max(self.channels)]
+        if channel is None:
+            seat.send_frame(encode_text("Dieses Spiel gibt es nicht"))
+            seat.close()
+            return
+        channel.add(seat.writer)
+
+    async def run_session(self, seats):
+        """
+        Plays one game with the given connections and the bots of the
+        server. If a player leaves, the game is aborted for all players.
+
+        Parameters
+        ----------
+        seats : list
+            The Seat objects of the human players.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.games_started += 1
+        game_id = self.id_offset + (self.games_started - 1) * self.id_stride + 1
+        start = time.perf_counter()
+        channel = SpectatorChannel()
+        self.channels[game_id] = channel
+        game = Game()
+        for seat in seats:
+            game.players.append(Player(seat.name))
+        # the bots sit after the human players
+        bots = [BotSeat(self.scheduler, self.speculator) for i in range(self.n_bots)]
+        for i in range(self.n_bots):
+            game.players.append(Player("Bot " + str(i + 1)))
+
+        # a hibernated game is restored as a new Game object, so the seats
+        # are found by the index of the player
+        def output(text):
+            for seat in seats:
+                seat.send(text)
+
+        def tell(player, text):
+            n_player = game.players.index(player)
+            if n_player < len(seats):
+                seats[n_player].send(text)
+
+        def sync():
+            for n_player, seat in enumerate(seats):
+                seat.sync(game, n_player)
+            channel.publish(game)
+
+        prompt_keys = {prompt: key for key, prompt in game.prompts.items()}
+        # only the first question of a turn is asked before the game changes,
+        # so the game can only be hibernated there
+        turn_start = (game.prompts["play_or_change"], game.prompts["change_one_or_all"])
+        # the answer that woke up a hibernated game
+        woken_answer = list()
+
+        async def ask(player, prompt):
+            if woken_answer:
+                return woken_answer.pop()
+            # the state only changes between the questions
+            sync()
+            # the writes to the other players are not awaited, a player who
+            # does not read is disconnected by Seat.write
+            n_player = game.players.index(player)
+            if n_player >= len(seats):
+                return await bots[n_player - len(seats)].answer(game, prompt_keys[prompt])
+            seat = seats[n_player]
+            # a bot after this player prepares its turn once the question is sent
+            next_player = (n_player + 1) % len(game.players)
+            prepare = self.speculator is not None and prompt in turn_start \
+                and next_player >= len(seats)
+            while True:
+                await seat.send_question(prompt, prompt_keys.get(prompt))
+                if prepare:
+                    bots[next_player - len(seats)].prepare(game)
+                    prepare = False
+                if self.idle_timeout is not None and prompt in turn_start:
+                    answer = asyncio.ensure_future(seat.read_answer())
+                    done, pending = await asyncio.wait((answer,), timeout=self.idle_timeout)
+                    if pending:
+                        raise Hibernation(answer)
+                    answer = answer.result()
+                else:
+                    answer = await seat.read_answer()
+                if answer != "/resync" or seat.encoder is None:
+                    return answer
+                seat.encoder.force_keyframe()
+                seat.sync(game, n_player)
+
+        def send_text_frame(text):
+            for seat in seats:
+                if seat.encoder is not None:
+                    seat.send_frame(encode_text(text))
+
+        game.output = output
+        try:
+            for seat in seats:
+                seat.send_notice("Spiel %d, Zuschauer mit /watch %d" % (game_id, game_id))
+            output("\nLass uns beginnen:")
+            resume = False
+            while True:
+                try:
+                    await game.run_game_async(ask, tell, resume)
+                    break
+                except Hibernation as hibernation:
+                    answer = hibernation.answer
+                # nothing refers to the game anymore while it is on disk
+                self.store.save(game_id, game)
+                game = None
+                self.games_hibernating += 1
+                self.hibernations += 1
+                try:
+                    woken_answer.append(await answer)
+                finally:
+                    self.games_hibernating -= 1
+                game = self.store.load(game_id)
+                game.output = output
+                resume = True
+            self.games_finished += 1
+            game_time = time.perf_counter() - start
+            if self.mean_game_time is None:
+                self.mean_game_time = game_time
+            self.mean_game_time += 0.1 * (game_time - self.mean_game_time)
+            sync()
+            send_text_frame("Ende des Spiels")
+            channel.close("Ende des Spiels")
+        except (ConnectionError, OSError):
+            self.games_aborted += 1
+            output("Ein Spieler hat das Spiel verlassen. Ende des Spiels")
+            send_text_frame("Ein Spieler hat das Spiel verlassen. Ende des Spiels")
+            channel.close("Ein Spieler hat das Spiel verlassen. Ende des Spiels")
+        finally:
+            if self.store is not None:
+                self.store.delete(game_id)
+            del self.channels[game_id]
+            self.spectators_dropped += channel.dropped
+            # close sends the rest of the data without waiting for it
+            for seat in seats:
+                self.players_dropped += seat.dropped
+                self.answers_throttled += seat.throttled
+                seat.close()
+
+    async def start(self):
+        """
+        Starts listening for connections.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        # a large backlog, otherwise connections get lost when thousands of
+        # players connect at the same time
+        self.server = await asyncio.start_server(self.handle_connection,
+                                                 self.host, self.port, backlog=4096)
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """
+        Starts the server and runs until it is cancelled.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        """
+        Stops listening for new connections.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.server is not None:
+            self.server.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python server.py [port] [number of players per game] [idle timeout]
+    #                  [number of bots per game]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    n_players = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    idle_timeout = float(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] != "-" else None
+    n_bots = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    server = GameServer(n_players, "0.0.0.0", port, idle_timeout, n_bots=n_bots)
+    print("Drecksau Server auf Port", port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+""" Spectators of a game """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from statesync import StateEncoder, SyncState, encode_text
+
+
+class SpectatorChannel:
+
+    def __init__(self, max_buffer=65536):
+        # All spectators of a game see the same state, so every update is
+        # encoded once and the same frame is written to every spectator. The
+        # frames are never awaited: a spectator whose write buffer grows
+        # above max_buffer bytes does not read fast enough and is dropped, so
+        # the game loop never waits for a spectator.
+        self.max_buffer = max_buffer
+        self.encoder = StateEncoder()
+        self.writers = list()
+
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.dropped = 0
+
+    @staticmethod
+    def frame(data):
+        """
+        Adds the length byte to a message (see Seat.send_frame).
+
+        Parameters
+        ----------
+        data : bytes
+            The message.
+
+        Returns
+        -------
+        frame : bytes
+            The frame.
+
+        """
+        return bytes([len(data)]) + data
+
+    def add(self, writer):
+        """
+        Adds a spectator. He gets a keyframe of the current state, the next
+        update continues from it.
+
+        Parameters
+        ----------
+        writer : asyncio.StreamWriter
+            Writes to the connection of the spectator.
+
+        Returns
+        -------
+        None.
+
+        """
+        data = self.encoder.encode_keyframe()
+        if data is not None:
+            writer.write(self.frame(data))
+        self.writers.append(writer)
+
+    def broadcast(self, frame):
+        """
+        Writes a frame to all spectators and drops the slow ones.
+
+        Parameters
+        ----------
+        frame : bytes
+            The frame.
+
+        Returns
+        -------
+        None.
+
+        """
+        max_buffer = self.max_buffer
+        slow = False
+        for writer in self.writers:
+            if writer.is_closing():
+                slow = True
+                continue
+            writer.write(frame)
+            self.frames_sent += 1
+            if writer.transport.get_write_buffer_size() > max_buffer:
+                # close would keep the buffer until it is sent (see Seat.write)
+                writer.transport.abort()
+                self.dropped += 1
+                slow = True
+        if slow:
+            self.writers = [writer for writer in self.writers if not writer.is_closing()]
+
+    def publish(self, game):
+        """
+        Sends the changes of a game since the last update to all spectators.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+
+        Returns
+        -------
+        None.
+
+        """
+        data = self.encoder.encode(SyncState.from_game(game, None))
+        if data is not None:
+            self.frames_encoded += 1
+            self.broadcast(self.frame(data))
+
+    def close(self, text):
+        """
+        Sends a last text message and closes all spectator connections.
+        Connections that still have data to send are aborted.
+
+        Parameters
+        ----------
+        text : string
+            The message.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.broadcast(self.frame(encode_text(text)))
+        for writer in self.writers:
+            # a spectator who has not read everything yet would keep his
+            # buffer until it is sent, the others get the message
+            if writer.transport.get_write_buffer_size():
+                writer.transport.abort()
+            else:
+                writer.close()
+        self.writers = list()
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+
+""" Speculative precomputation of the next turn """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from greedybot import GreedyBot
+from player import Player
+from tablestate import TableState
+
+import threading
+import time
+
+
+class Speculation:
+    # The prepared next turn for one outcome of the current turn.
+    # frame: the text of Game.show_all_cards_on_table
+    # options: the options of the next player (see TableState.get_options)
+    # can_play: True if the next player can play a card
+    # compute_time: seconds it took to prepare this turn
+    __slots__ = ("frame", "options", "can_play", "compute_time")
+
+    def __init__(self, frame, options, can_play, compute_time):
+        self.frame = frame
+        self.options = options
+        self.can_play = can_play
+        self.compute_time = compute_time
+
+
+class Speculator:
+
+    def __init__(self, max_candidates=16):
+        # While the active player is thinking, a background thread prepares
+        # the next turn for the most likely outcomes of his turn. An outcome
+        # is the position of every pig on the table, so changing one or all
+        # cards is one outcome and every pig a card can be played on is one
+        # outcome. Only the hand of the next player is needed and it does not
+        # change during the current turn, so the preparation is exact. If the
+        # next seat is a bot, its decision is prepared the same way (see
+        # get_next_tables and BotSeat.prepare).
+        self.max_candidates = max_candidates
+        self.ranking_bot = GreedyBot()
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.prepared = dict()
+
+        self.lookups = 0
+        self.hits = 0
+        self.saved_time = 0.0
+
+    @staticmethod
+    def get_frame_key(players):
+        """
+        Returns the buckets of all pigs of all players in table order.
+
+        Parameters
+        ----------
+        players : list
+            List of Player objects.
+
+        Returns
+        -------
+        key : tuple
+            One tuple of buckets per player.
+
+        """
+        return tuple(tuple(TableState.pig_to_flags(pig) for pig in player.get_cards_table())
+                     for player in players)
+
+    def rank_candidates(self, key, active, hand):
+        """
+        Returns the outcomes of the current turn, the most likely first: the
+        move the GreedyBot would play, then changing cards (the tables stay
+        the same), then the other moves by the change of the table values.
+
+        Parameters
+        ----------
+        key : tuple
+            The buckets of all pigs (see get_frame_key).
+        active : int
+            Index of the active player.
+        hand : list
+            The key words of the hand cards of the active player.
+
+        Returns
+        -------
+        candidates : list
+            The buckets of all pigs after each outcome.
+
+        """
+        table = TableState([self.histogram(flags_list) for flags_list in key], active)
+        values = self.ranking_bot.bucket_values
+        greedy_option = self.ranking_bot.choose(table, hand)
+        scored = [(-1.0, key)]
+        for option in table.get_options(hand):
+            if option[0] != "PLAY":
+                continue
+            card_type, move = option[1], option[2]
+            transitions = TableState.transitions[card_type]
+            new_key = [list(flags_list) for flags_list in key]
+            score = 0.0
+            if move is None:
+                playable = TableState.playable[card_type]
+                for n_player in table.get_target_players(card_type):
+                    for i, flags in enumerate(key[n_player]):
+                        if playable[flags]:
+                            new_key[n_player][i] = transitions[flags][0]
+                new_keys = [new_key]
+            else:
+                n_player, flags = move
+                new_flags = transitions[flags][0]
+                score = values[new_flags] - values[flags]
+                if n_player != active:
+                    score = -score
+                new_keys = list()
+                for i, pig_flags in enumerate(key[n_player]):
+                    if pig_flags == flags:
+                        new_key[n_player][i] = new_flags
+                        new_keys.append(new_key)
+                        new_key = [list(flags_list) for flags_list in key]
+            if option == greedy_option:
+                score = 1e9
+            for new_key in new_keys:
+                scored.append((score, tuple(tuple(flags_list) for flags_list in new_key)))
+        # sorted is stable: pigs with lower numbers come first
+        scored.sort(key=lambda item: -item[0])
+        return [candidate for score, candidate in scored][:self.max_candidates]
+
+    @staticmethod
+    def histogram(flags_list):
+        """
+        Counts the pigs per bucket.
+
+        Parameters
+        ----------
+        flags_list : tuple
+            The buckets of the pigs of one player.
+
+        Returns
+        -------
+        histogram : list
+            Number of pigs per bucket.
+
+        """
+        histogram = [0] * TableState.n_buckets
+        for flags in flags_list:
+            histogram[flags] += 1
+        return histogram
+
+    def prepare(self, key, names, numbers, next_player, next_hand):
+        """
+        Prepares the next turn for one outcome of the current turn.
+
+        Parameters
+        ----------
+        key : tuple
+            The buckets of all pigs after the outcome.
+        names : list
+            The names of the players.
+        numbers : list
+            The pig numbers of every player in table order.
+        next_player : int
+            Index of the next player.
+        next_hand : list
+            The key words of the hand cards of the next player.
+
+        Returns
+        -------
+        speculation : Speculation
+            The prepared turn.
+
+        """
+        start = time.perf_counter()
+        texts = list()
+        for name, pig_numbers, flags_list in zip(names, numbers, key):
+            player = Player(name)
+            for n_pig, flags in zip(pig_numbers, flags_list):
+                player.add_card_to_table(TableState.flags_to_pig(flags, n_pig))
+            texts.append(player.get_cards_table_text())
+        table = TableState([self.histogram(flags_list) for flags_list in key], next_player)
+        options = table.get_options(next_hand)
+        can_play = any(option[0] == "PLAY" for option in options)
+        return Speculation("\n".join(texts), options, can_play, time.perf_counter() - start)
+
+    def get_next_tables(self, game):
+        """
+        Returns the tables at the start of the next turn for the most likely
+        outcomes of the current turn, e.g. to prepare the decision of a bot.
+        Runs in the calling thread.
+
+        Parameters
+        ----------
+        game : Game
+            The running game, the active player is thinking.
+
+        Returns
+        -------
+        (next_player : int, tables : list) : tuple
+            Index of the next player and the TableState of every outcome, the
+            most likely first.
+
+        """
+        players = game.players
+        active = players.index(game.active_player)
+        next_player = (active + 1) % len(players)
+        hand = [card.get_card_type() for card in game.active_player.get_cards_hand()]
+        candidates = self.rank_candidates(self.get_frame_key(players), active, hand)
+        # pigs in the same bucket give the same tables
+        tables = dict.fromkeys(
+            TableState([self.histogram(flags_list) for flags_list in key], next_player)
+            for key in candidates)
+        return next_player, list(tables)
+
+    def record_lookup(self, hit, saved_time=0.0):
+        """
+        Counts a lookup of a prepared turn.
+
+        Parameters
+        ----------
+        hit : bool
+            True if the turn was prepared.
+        saved_time : float
+            Seconds the preparation of this turn took.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.lookups += 1
+        if hit:
+            self.hits += 1
+            self.saved_time += saved_time
+
+    def run_speculation(self, candidates, names, numbers, next_player, next_hand,
+                        stop_event):
+        """
+        Prepares the next turn for the candidates in order until all are done
+        or the speculation is stopped. Runs in the background thread.
+
+        Parameters
+        ----------
+        candidates : list
+            The outcomes, the most likely first (see rank_candidates).
+        names : list
+            The names of the players.
+        numbers : list
+            The pig numbers of every player in table order.
+        next_player : int
+            Index of the next player.
+        next_hand : list
+            The key words of the hand cards of the next player.
+        stop_event : threading.Event
+            Set when the current turn is over.
+
+        Returns
+        -------
+        None.
+
+        """
+        for key in candidates:
+            if stop_event.is_set():
+                return
+            speculation = self.prepare(key, names, numbers, next_player, next_hand)
+            with self.lock:
+                if not stop_event.is_set():
+                    self.prepared[(next_player, key)] = speculation
+
+    def start(self, game):
+        """
+        Starts preparing the next turn of a running game. Everything the
+        background thread needs is copied from the game first.
+
+        Parameters
+        ----------
+        game : Game
+            The running game, the active player is thinking.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.stop()
+        players = game.players
+        active = players.index(game.active_player)
+        next_player = (active + 1) % len(players)
+        key = self.get_frame_key(players)
+        hand = [card.get_card_type() for card in game.active_player.get_cards_hand()]
+        next_hand = [card.get_card_type() for card in players[next_player].get_cards_hand()]
+        names = [player.get_name() for player in players]
+        numbers = [[pig.get_pig_number() for pig in player.get_cards_table()]
+                   for player in players]
+        candidates = self.rank_candidates(key, active, hand)
+        with self.lock:
+            self.prepared = dict()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run_speculation,
+            args=(candidates, names, numbers, next_player, next_hand, self.stop_event),
+            daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def lookup(self, game):
+        """
+        Returns the prepared turn for the actual state of a game at the start
+        of a turn. Work for all other outcomes is discarded.
+
+        Parameters
+        ----------
+        game : Game
+            The running game, the active player is the next player of the
+            last turn.
+
+        Returns
+        -------
+        speculation : Speculation
+            The prepared turn, None if this outcome was not prepared.
+
+        """
+        self.stop()
+        key = (game.players.index(game.active_player), self.get_frame_key(game.players))
+        with self.lock:
+            speculation = self.prepared.get(key)
+            self.prepared = dict()
+        self.record_lookup(speculation is not None,
+                           speculation.compute_time if speculation is not None else 0.0)
+        return speculation
+
+    def get_statistics(self):
+        """
+        Returns the hit rate of the speculation and the time it saved.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        statistics : dict
+            The statistics.
+
+        """
+        return {
+            "lookups"       : self.lookups,
+            "hits"          : self.hits,
+            "hit_rate"      : self.hits / self.lookups if self.lookups else 0.0,
+            "saved_time"    : self.saved_time,
+        }
+
+
+if __name__ == "__main__":
+    from botscheduler import BotScheduler, BotSeat
+    from game import Game
+    import asyncio
+    import builtins
+    import contextlib
+    import io
+    import random
+
+    class ScriptedPlayer:
+        # answers the questions of Game.run_game randomly, like a beginner
+        def __init__(self, names, thinking_time, max_answers, rng):
+            self.answers = ["2"] + names
+            self.thinking_time = thinking_time
+            self.max_answers = max_answers
+            self.rng = rng
+            self.n_answers = 0
+
+        def __call__(self, prompt=""):
+            self.n_answers += 1
+            if self.n_answers > self.max_answers:
+                raise EOFError()
+            if self.answers:
+                return self.answers.pop(0)
+            time.sleep(self.thinking_time)
+            if "Wo willst" in prompt:
+                return str(self.rng.randint(1, 5))
+            if "[1/2/3]" in prompt:
+                return str(self.rng.randint(1, 3))
+            return str(self.rng.choice((1, 1, 1, 2)))
+
+    random.seed(6)
+    rng = random.Random(6)
+    for speculate in (False, True):
+        speculator = Speculator() if speculate else None
+        game = Game(speculator=speculator)
+        builtins.input = ScriptedPlayer(["Anja", "Salah"], 0.002, 3000, rng)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                game.run_game()
+            except EOFError:
+                pass
+        print("\nSpeculation:", speculate, "Time: %.2f s" % (time.perf_counter() - start))
+        if speculate:
+            statistics = speculator.get_statistics()
+            print("Lookups:", statistics["lookups"], "Hit rate: %.0f%%"
+                  % (100 * statistics["hit_rate"]),
+                  "Latency saved: %.2f ms" % (1000 * statistics["saved_time"]))
+
+    print("\nTest: a bot prepares its turn while the player before it thinks")
+    random.seed(7)
+    speculator = Speculator()
+    seat = BotSeat(BotScheduler(), speculator)
+    bot = GreedyBot()
+    game = Game()
+    game.players = [Player("Anja"), Player("Bot 1")]
+    options = list()
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.init_cards_table()
+        game.init_cards_hand()
+        game.running = True
+        while game.running and len(options) < 30:
+            game.active_player = game.players[0]
+            seat.prepare(game)
+            game.execute_option(bot.choose_for_game(game))
+            game.check_winner()
+            if not game.running:
+                break
+            game.active_player = game.players[1]
+            asyncio.run(seat.answer(game, "play_or_change"))
+            options.append((seat.option, bot.choose_for_game(game)))
+            game.execute_option(seat.option)
+            game.check_winner()
+    print("Same decisions as the bot. (Expected value: True). Value:",
+          all(prepared == decided for prepared, decided in options))
+    print("All turns prepared. (Expected value: True). Value:",
+          speculator.hits == speculator.lookups == len(options) > 0)
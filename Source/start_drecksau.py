@@ -1,3 +1,6 @@
 from game import Game
-drecksau = Game()
+from hintengine import HintEngine
+import sys
+# python start_drecksau.py --hints shows the win probability of the moves
+drecksau = Game(HintEngine() if "--hints" in sys.argv else None)
 drecksau.run_game()
\ No newline at end of file
@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+
+""" Binary state synchronisation """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from tablestate import TableState
+
+
+# Every message is a bit string, the first 2 bits are the kind of the message.
+# DELTA:     seq (6), active (2), changed pigs (5) and per pig: pig (5),
+#            flags (4), changed hand cards (2) and per card: slot (2),
+#            card (3), draw size (8), discard size (8)
+# KEYFRAME:  seq (6), active (2), players (2), pigs per player (3), flags of
+#            every pig (4 each), hand size (2), cards (3 each), draw size (8),
+#            discard size (8)
+# QUESTION:  prompt (3), see prompt_keys
+# TEXT:      the rest of the message is UTF-8 text
+DELTA       = 0
+KEYFRAME    = 1
+QUESTION    = 2
+TEXT        = 3
+
+card_types = list(Card.action_card_types) + list(Card.upgrade_card_types)
+card_index = {card_type: i for i, card_type in enumerate(card_types)}
+prompt_keys = ["play_or_change", "change_one_or_all", "play_card", "change_card", "move"]
+
+
+class BitWriter:
+
+    def __init__(self):
+        self.value = 0
+        self.n_bits = 0
+
+    def write(self, value, n_bits):
+        """
+        Appends an unsigned number with a fixed number of bits.
+
+        Parameters
+        ----------
+        value : int
+            The number.
+        n_bits : int
+            Number of bits.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.value = (self.value << n_bits) | (value & ((1 << n_bits) - 1))
+        self.n_bits += n_bits
+
+    def to_bytes(self):
+        """
+        Returns the bits, filled up with zeros to full bytes.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        data : bytes
+            The message.
+
+        """
+        padding = -self.n_bits % 8
+        return (self.value << padding).to_bytes((self.n_bits + padding) // 8, "big")
+
+
+class BitReader:
+
+    def __init__(self, data):
+        self.value = int.from_bytes(data, "big")
+        self.n_bits = 8 * len(data)
+
+    def read(self, n_bits):
+        """
+        Reads the next unsigned number.
+
+        Parameters
+        ----------
+        n_bits : int
+            Number of bits.
+
+        Returns
+        -------
+        value : int
+            The number.
+
+        """
+        self.n_bits -= n_bits
+        if self.n_bits < 0:
+            raise ValueError("Nachricht ist zu kurz")
+        return (self.value >> self.n_bits) & ((1 << n_bits) - 1)
+
+
+class SyncState:
+    # What one player can see: the pigs of all players (buckets, see
+    # TableState), his own hand (indices of card_types), the number of cards
+    # in the draw deck and the discard pile and the active player.
+    __slots__ = ("active", "pigs", "hand", "draw_size", "discard_size")
+
+    def __init__(self, active, pigs, hand, draw_size, discard_size):
+        self.active = active
+        self.pigs = pigs
+        self.hand = hand
+        self.draw_size = draw_size
+        self.discard_size = discard_size
+
+    @classmethod
+    def from_game(cls, game, n_player):
+        """
+        Creates the state of a running game from the view of a player.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+        n_player : int
+            Index of the player, None for a spectator who sees no hand.
+
+        Returns
+        -------
+        state : SyncState
+            The state.
+
+        """
+        pigs = tuple(tuple(TableState.pig_to_flags(pig) for pig in player.get_cards_table())
+                     for player in game.players)
+        hand = ()
+        if n_player is not None:
+            hand = tuple(card_index[card.get_card_type()]
+                         for card in game.players[n_player].get_cards_hand())
+        active = 0
+        if game.active_player is not None:
+            active = game.players.index(game.active_player)
+        return cls(active, pigs, hand, len(game.deck.draw_deck), len(game.deck.discard_pile))
+
+    def __eq__(self, other):
+        return (isinstance(other, SyncState) and self.active == other.active
+                and self.pigs == other.pigs and self.hand == other.hand
+                and self.draw_size == other.draw_size
+                and self.discard_size == other.discard_size)
+
+
+class StateEncoder:
+
+    def __init__(self, keyframe_interval=32):
+        # Encodes the states that are sent to one client. Every message gets
+        # the next sequence number, after keyframe_interval deltas a keyframe
+        # is sent so that a client which missed a message recovers.
+        self.keyframe_interval = keyframe_interval
+        self.last_state = None
+        self.seq = 0
+        self.deltas_since_keyframe = 0
+        self.force = True
+
+        self.messages = 0
+        self.keyframes = 0
+        self.bytes_encoded = 0
+
+    def force_keyframe(self):
+        """
+        The next message is a keyframe, e.g. when the client asks for it.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.force = True
+
+    def encode(self, state):
+        """
+        Encodes a state as delta to the last state, or as keyframe.
+
+        Parameters
+        ----------
+        state : SyncState
+            The current state.
+
+        Returns
+        -------
+        data : bytes
+            The message, None if nothing has changed.
+
+        """
+        last = self.last_state
+        keyframe = (self.force or last is None
+                    or self.deltas_since_keyframe >= self.keyframe_interval
+                    or len(last.pigs) != len(state.pigs)
+                    or any(len(a) != len(b) for a, b in zip(last.pigs, state.pigs))
+                    or len(last.hand) != len(state.hand))
+        if not keyframe and state == last:
+            return None
+        if keyframe:
+            data = self.write_keyframe(state, self.seq)
+            self.deltas_since_keyframe = 0
+            self.keyframes += 1
+            self.force = False
+        else:
+            writer = BitWriter()
+            writer.write(DELTA, 2)
+            writer.write(self.seq, 6)
+            writer.write(state.active, 2)
+            n_pigs = len(state.pigs[0])
+            changed = [(n * n_pigs + i, flags)
+                       for n, (old, new) in enumerate(zip(last.pigs, state.pigs))
+                       for i, flags in enumerate(new) if flags != old[i]]
+            writer.write(len(changed), 5)
+            for pig, flags in changed:
+                writer.write(pig, 5)
+                writer.write(flags, 4)
+            slots = [(i, card) for i, card in enumerate(state.hand) if card != last.hand[i]]
+            writer.write(len(slots), 2)
+            for i, card in slots:
+                writer.write(i, 2)
+                writer.write(card, 3)
+            self.deltas_since_keyframe += 1
+            writer.write(min(state.draw_size, 255), 8)
+            writer.write(min(state.discard_size, 255), 8)
+            data = writer.to_bytes()
+        self.last_state = state
+        self.seq = (self.seq + 1) % 64
+        self.messages += 1
+        self.bytes_encoded += len(data)
+        return data
+
+    def encode_keyframe(self):
+        """
+        Encodes the last state again as keyframe with the sequence number of
+        the last message, e.g. for a client that joins later. The following
+        deltas fit to this keyframe.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        data : bytes
+            The message, None if no state was encoded yet.
+
+        """
+        if self.last_state is None:
+            return None
+        return self.write_keyframe(self.last_state, (self.seq - 1) % 64)
+
+    @staticmethod
+    def write_keyframe(state, seq):
+        """
+        Encodes a state as keyframe.
+
+        Parameters
+        ----------
+        state : SyncState
+            The state.
+        seq : int
+            The sequence number of the message.
+
+        Returns
+        -------
+        data : bytes
+            The message.
+
+        """
+        writer = BitWriter()
+        writer.write(KEYFRAME, 2)
+        writer.write(seq, 6)
+        writer.write(state.active, 2)
+        writer.write(len(state.pigs) - 1, 2)
+        writer.write(len(state.pigs[0]), 3)
+        for pigs in state.pigs:
+            for flags in pigs:
+                writer.write(flags, 4)
+        writer.write(len(state.hand), 2)
+        for card in state.hand:
+            writer.write(card, 3)
+        writer.write(min(state.draw_size, 255), 8)
+        writer.write(min(state.discard_size, 255), 8)
+        return writer.to_bytes()
+
+
+class StateDecoder:
+
+    def __init__(self):
+        # Decodes the messages on the client. If a delta does not follow the
+        # last message, the state is unknown until the next keyframe.
+        self.state = None
+        self.seq = None
+
+    def decode(self, data):
+        """
+        Applies a state message.
+
+        Parameters
+        ----------
+        data : bytes
+            A DELTA or KEYFRAME message.
+
+        Returns
+        -------
+        state : SyncState
+            The new state, None if a message was missed and a keyframe is
+            needed.
+
+        """
+        reader = BitReader(data)
+        kind = reader.read(2)
+        seq = reader.read(6)
+        active = reader.read(2)
+        if kind == KEYFRAME:
+            n_players = reader.read(2) + 1
+            n_pigs = reader.read(3)
+            pigs = tuple(tuple(reader.read(4) for i in range(n_pigs))
+                         for n in range(n_players))
+            hand = tuple(reader.read(3) for i in range(reader.read(2)))
+        elif kind == DELTA:
+            if self.state is None or seq != (self.seq + 1) % 64:
+                self.state = None
+                return None
+            pigs = [list(flags_list) for flags_list in self.state.pigs]
+            n_pigs = len(pigs[0])
+            for i in range(reader.read(5)):
+                pig = reader.read(5)
+                pigs[pig // n_pigs][pig % n_pigs] = reader.read(4)
+            pigs = tuple(tuple(flags_list) for flags_list in pigs)
+            hand = list(self.state.hand)
+            for i in range(reader.read(2)):
+                slot = reader.read(2)
+                hand[slot] = reader.read(3)
+            hand = tuple(hand)
+        else:
+            raise ValueError("Keine Zustandsnachricht")
+        draw_size = reader.read(8)
+        discard_size = reader.read(8)
+        self.seq = seq
+        self.state = SyncState(active, pigs, hand, draw_size, discard_size)
+        return self.state
+
+
+def encode_question(prompt_key):
+    """
+    Encodes a question to the player.
+
+    Parameters
+    ----------
+    prompt_key : string
+        The key of the prompt in Game.prompts.
+
+    Returns
+    -------
+    data : bytes
+        The message.
+
+    """
+    return bytes([(QUESTION << 6) | (prompt_keys.index(prompt_key) << 3)])
+
+
+def encode_text(text):
+    """
+    Encodes a text message. Longer texts are cut at a character boundary,
+    so the message fits into one frame.
+
+    Parameters
+    ----------
+    text : string
+        The text.
+
+    Returns
+    -------
+    data : bytes
+        The message.
+
+    """
+    return bytes([TEXT << 6]) + text.encode()[:254].decode(errors="ignore").encode()
+
+
+def get_kind(data):
+    """
+    Returns the kind of a message.
+
+    Parameters
+    ----------
+    data : bytes
+        The message.
+
+    Returns
+    -------
+    kind : int
+        DELTA, KEYFRAME, QUESTION or TEXT.
+
+    """
+    return data[0] >> 6
+
+
+if __name__ == "__main__":
+    from game import Game
+    from player import Player
+    import random
+
+    random.seed(3)
+    game = Game()
+    for name in ("Anja", "Salah"):
+        game.players.append(Player(name))
+    game.init_cards_table()
+    game.init_cards_hand()
+    game.active_player = game.players[0]
+
+    encoder = StateEncoder()
+    decoder = StateDecoder()
+    print("\nTest: keyframe")
+    state = SyncState.from_game(game, 0)
+    data = encoder.encode(state)
+    print("(Expected value: True). Value:", decoder.decode(data) == state, len(data), "bytes")
+
+    print("\nTest: delta after a played card")
+    game.execute_play(game.active_player.get_cards_hand()[0],
+                      [(game.players[0], game.players[0].get_cards_table()[2])])
+    game.active_player = game.players[1]
+    state = SyncState.from_game(game, 0)
+    data = encoder.encode(state)
+    print("(Expected value: True). Value:", decoder.decode(data) == state, len(data), "bytes")
+
+    print("\nTest: unchanged state is not sent")
+    print("(Expected value: None). Value:", encoder.encode(state))
+
+    print("\nTest: missed message")
+    game.players[1].get_cards_table()[0].make_dirty()
+    encoder.encode(SyncState.from_game(game, 0))
+    game.players[1].get_cards_table()[1].make_dirty()
+    print("(Expected value: None). Value:",
+          decoder.decode(encoder.encode(SyncState.from_game(game, 0))))
+    encoder.force_keyframe()
+    state = SyncState.from_game(game, 0)
+    print("(Expected value: True). Value:", decoder.decode(encoder.encode(state)) == state)
+
+    text_size = len("\n".join(player.get_cards_table_text() for player in game.players).encode())
+    print("\nFull table text: %d bytes" % text_size)
+
+    print("\nTest: long texts are cut at a character boundary")
+    data = encode_text("ä" * 200)
+    print("(Expected value: 255). Value:", len(data))
+    print("(Expected value: 127). Value:", len(data[1:].decode()))
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+""" Parallel sweep over deck compositions and pigs per player """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from game import Game
+from gameconfig import GameConfig
+from gamestats import GameResult, GameStatistics
+from greedybot import GreedyBot
+from player import Player
+from tablestate import TableState
+
+from itertools import product
+import multiprocessing
+import random
+
+
+class SweepBot(GreedyBot):
+    # GreedyBot that counts the turns in which it could not play a card (see
+    # Game.can_player_play_card)
+
+    def __init__(self):
+        super().__init__()
+        self.blocked_turns = 0
+
+    def choose_for_game(self, game):
+        """
+        Chooses the option of the active player and counts blocked turns.
+
+        Parameters
+        ----------
+        game : Game
+            The running game.
+
+        Returns
+        -------
+        option : tuple
+            The chosen option (see TableState.get_options).
+
+        """
+        table = TableState.from_game(game)
+        hand = [card.get_card_type() for card in game.active_player.get_cards_hand()]
+        if not any(table.can_play_card(card_type) for card_type in set(hand)):
+            self.blocked_turns += 1
+        return self.choose(table, hand)
+
+
+def play_games(config, n_players, first_seed, n_games, max_turns):
+    """
+    Plays bot games with a configuration. Runs in the worker processes.
+
+    Parameters
+    ----------
+    config : GameConfig
+        The deck composition and the pigs per player.
+    n_players : int
+        Number of players.
+    first_seed : int
+        Seed of the first game, the games have consecutive seeds.
+    n_games : int
+        Number of games.
+    max_turns : int
+        Games without a winner after this many turns are stopped.
+
+    Returns
+    -------
+    (config : GameConfig, statistics : GameStatistics) : tuple
+        The statistics of the games.
+
+    """
+    statistics = GameStatistics()
+    for seed in range(first_seed, first_seed + n_games):
+        random.seed(seed)
+        plays = dict()
+        reshuffles = list()
+
+        def listener(event, *args):
+            if event == "play":
+                plays[args[1]] = plays.get(args[1], 0) + 1
+            elif event == "reshuffle":
+                reshuffles.append(None)
+
+        game = Game(config=config)
+        game.output = lambda text: None
+        game.players = [Player("Bot " + str(i + 1)) for i in range(n_players)]
+        game.add_listener(listener)
+        bots = [SweepBot() for i in range(n_players)]
+        winner = game.run_bot_game(bots, max_turns)
+        statistics.add(GameResult(n_players, winner, game.round_counter, plays,
+                                  sum(bot.blocked_turns for bot in bots), len(reshuffles)))
+    return config, statistics
+
+
+def run_task(task):
+    """
+    Unpacks a task of the pool (see play_games).
+
+    Parameters
+    ----------
+    task : tuple
+        The arguments of play_games.
+
+    Returns
+    -------
+    (config : GameConfig, statistics : GameStatistics) : tuple
+        The statistics of the games.
+
+    """
+    return play_games(*task)
+
+
+def grid_configs(values, n_players=2, base=None):
+    """
+    Returns every combination of the given values. Combinations that are not
+    a valid GameConfig are skipped.
+
+    Parameters
+    ----------
+    values : dict
+        card type -> list of card counts, "pigs" -> list of numbers of pigs
+        for n_players.
+    n_players : int
+        Number of players of the sweep.
+    base : GameConfig
+        The values of the cards that are not in values.
+
+    Returns
+    -------
+    configs : list
+        The configurations.
+
+    """
+    base = base or GameConfig()
+    names = list(values)
+    configs = list()
+    for combination in product(*(values[name] for name in names)):
+        changes = dict(zip(names, combination))
+        pigs = {n_players: changes.pop("pigs")} if "pigs" in changes else None
+        try:
+            configs.append(base.replace(changes, pigs))
+        except ValueError:
+            pass
+    return configs
+
+
+def sample_configs(ranges, n_configs, n_players=2, base=None, rng=None):
+    """
+    Returns random configurations with values in the given ranges.
+
+    Parameters
+    ----------
+    ranges : dict
+        card type -> (lowest, highest) card count, "pigs" -> (lowest,
+        highest) number of pigs for n_players.
+    n_configs : int
+        Number of configurations.
+    n_players : int
+        Number of players of the sweep.
+    base : GameConfig
+        The values of the cards that are not in ranges.
+    rng : random.Random
+        Random number generator.
+
+    Returns
+    -------
+    configs : list
+        The configurations.
+
+    """
+    base = base or GameConfig()
+    rng = rng or random.Random()
+    configs = list()
+    while len(configs) < n_configs:
+        changes = {name: rng.randint(low, high) for name, (low, high) in ranges.items()}
+        pigs = {n_players: changes.pop("pigs")} if "pigs" in changes else None
+        try:
+            configs.append(base.replace(changes, pigs))
+        except ValueError:
+            pass
+    return configs
+
+
+class SweepRunner:
+
+    def __init__(self, n_workers=None, n_players=2, games_per_config=1000,
+                 games_per_task=250, max_turns=500):
+        # Plays games_per_config bot games per configuration on a pool of
+        # n_workers processes (default: one per core), which is reused for
+        # all configurations and sweeps. The games of a configuration are
+        # split into tasks of games_per_task games, so the cores stay busy
+        # until the end of the sweep. Every configuration uses the same
+        # seeds, so the configurations are compared on the same shuffles.
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.n_players = n_players
+        self.games_per_config = games_per_config
+        self.games_per_task = games_per_task
+        self.max_turns = max_turns
+        self.pool = multiprocessing.get_context("spawn").Pool(self.n_workers)
+
+    def run(self, configs):
+        """
+        Plays the games of all configurations. The statistics of a
+        configuration are yielded as soon as its games are played.
+
+        Parameters
+        ----------
+        configs : list
+            The configurations.
+
+        Yields
+        ------
+        (config : GameConfig, statistics : GameStatistics) : tuple
+            The statistics of a configuration.
+
+        """
+        tasks = list()
+        remaining = dict()
+        statistics = dict()
+        for config in configs:
+            key = config.get_key()
+            remaining[key] = 0
+            statistics[key] = GameStatistics()
+            for first_seed in range(0, self.games_per_config, self.games_per_task):
+                n_games = min(self.games_per_task, self.games_per_config - first_seed)
+                tasks.append((config, self.n_players, first_seed, n_games, self.max_turns))
+                remaining[key] += 1
+        for config, task_statistics in self.pool.imap_unordered(run_task, tasks):
+            key = config.get_key()
+            statistics[key].merge(task_statistics)
+            remaining[key] -= 1
+            if not remaining[key]:
+                yield config, statistics.pop(key)
+
+    def close(self):
+        """
+        Stops the worker processes.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.pool.close()
+        self.pool.join()
+
+
+def describe(config, base=None):
+    """
+    Returns the differences of a configuration to the default rules.
+
+    Parameters
+    ----------
+    config : GameConfig
+        The configuration.
+    base : GameConfig
+        The configuration to compare with.
+
+    Returns
+    -------
+    text : string
+        E.g. "MUD=25 pigs(2)=6", "Standard" without differences.
+
+    """
+    base = base or GameConfig()
+    changes = ["%s=%d" % (card_type, count) for card_type, count in config.card_counts.items()
+               if base.card_counts[card_type] != count]
+    changes += ["pigs(%d)=%d" % (n_players, n_pigs) for n_players, n_pigs in config.pigs.items()
+                if base.pigs[n_players] != n_pigs]
+    return " ".join(changes) or "Standard"
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python sweep.py [games per configuration] [--random <number of configurations>]
+    #                 [--workers <number of processes>] [--players <number of players>]
+    def get_option(name, default):
+        if name in sys.argv:
+            return int(sys.argv[sys.argv.index(name) + 1])
+        return default
+
+    games_per_config = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 500
+    n_players = get_option("--players", 2)
+    if "--random" in sys.argv:
+        configs = sample_configs({"MUD": (15, 27), "STORM": (0, 4), "STALL": (5, 13),
+                                  "pigs": (3, 7)},
+                                 get_option("--random", 10), n_players, rng=random.Random(1))
+    else:
+        configs = grid_configs({"MUD": (17, 21, 25), "STORM": (0, 1, 3),
+                                "pigs": (4, 5, 6)}, n_players)
+
+    runner = SweepRunner(get_option("--workers", None), n_players, games_per_config)
+    print("%d Konfigurationen mit je %d Spielen auf %d Prozessen"
+          % (len(configs), games_per_config, runner.n_workers))
+    print("%-28s %8s %7s %7s %9s %9s" % ("Konfiguration", "Sitz 1", "Züge", "p90",
+                                         "blockiert", "ohne Sieg"))
+    start = time.perf_counter()
+    for config, statistics in runner.run(configs):
+        report = statistics.get_report()
+        no_winner = statistics.n_games - sum(statistics.wins.values())
+        print("%-28s %8.3f %7.1f %7.0f %9.3f %9d"
+              % (describe(config), report["win_rate"][(n_players, 0)], report["turns_mean"],
+                 report["turns_quantiles"][0.9], report["blocked_turn_rate"], no_winner))
+    runner.close()
+    elapsed = time.perf_counter() - start
+    print("%.1f s, %.0f Spiele pro Sekunde" % (elapsed, len(configs) * games_per_config / elapsed))
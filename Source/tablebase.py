@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+
+""" Endgame tablebase """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from card import Card
+from deck import Deck
+from tablestate import TableState
+
+from array import array
+from itertools import combinations_with_replacement
+from math import factorial
+import mmap
+import os
+import struct
+
+
+class Tablebase:
+    # File layout: a header followed by one unsigned 16 bit value per
+    # position. The value is the win probability of the active player
+    # scaled to 0-65535. Positions are ordered by (table of the active
+    # player, table of the opponent, hand of the active player, hand of the
+    # opponent), the order of tables and hands is given by enumerate_tables
+    # and enumerate_hands.
+    magic           = b"DSTB"
+    version         = 1
+    header          = struct.Struct("<4sHHHII")
+    value           = struct.Struct("<H")
+    value_scale     = 65535
+    hand_size       = 3
+
+    # the card types a hand can contain, in a fixed order
+    card_types = list(Card.action_card_types) + list(Card.upgrade_card_types)
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_pigs, max_clean, n_tables, n_hands = \
+            self.header.unpack_from(self.map, 0)
+        if magic != self.magic or version != self.version:
+            raise ValueError(path + " is not a Drecksau tablebase")
+        self.n_pigs = n_pigs
+        self.max_clean = max_clean
+
+        tables = self.enumerate_tables(n_pigs, max_clean)
+        hands = self.enumerate_hands()
+        if len(tables) != n_tables or len(hands) != n_hands:
+            raise ValueError(path + " does not match the current rules")
+        self.table_index = {table: i for i, table in enumerate(tables)}
+        self.hand_index = {hand: i for i, hand in enumerate(hands)}
+        self.card_order = {card_type: i for i, card_type in enumerate(self.card_types)}
+        self.n_tables = n_tables
+        self.n_hands = n_hands
+
+    @classmethod
+    def enumerate_tables(cls, n_pigs, max_clean):
+        """
+        Returns all tables with n_pigs pigs of which at most max_clean are
+        clean. Only buckets which can occur in a game are used: a pig can only
+        have a door or a lightning conductor if it has a stall.
+
+        Parameters
+        ----------
+        n_pigs : int
+            Number of pigs on the table.
+        max_clean : int
+            Maximum number of clean pigs on the table.
+
+        Returns
+        -------
+        tables : list
+            List of histograms (see TableState).
+
+        """
+        buckets = [flags for flags in range(TableState.n_buckets)
+                   if flags & TableState.STALL
+                   or not flags & (TableState.DOOR | TableState.LIGHTNING_CONDUCTOR)]
+        tables = list()
+        for pigs in combinations_with_replacement(buckets, n_pigs):
+            table = [0] * TableState.n_buckets
+            for flags in pigs:
+                table[flags] += 1
+            if sum(table[0::2]) <= max_clean:
+                tables.append(tuple(table))
+        return tables
+
+    @classmethod
+    def enumerate_hands(cls, hand_size=None):
+        """
+        Returns all possible hands. A hand is a tuple of card types sorted in
+        the order of card_types.
+
+        Parameters
+        ----------
+        hand_size : int
+            Number of cards in a hand. If not given, hand_size is used.
+
+        Returns
+        -------
+        hands : list
+            List of hands.
+
+        """
+        if hand_size is None:
+            hand_size = cls.hand_size
+        return list(combinations_with_replacement(cls.card_types, hand_size))
+
+    def get_hand_key(self, hand):
+        """
+        Sorts the card types of a hand in the order of card_types.
+
+        Parameters
+        ----------
+        hand : list
+            The key words of the cards in a hand.
+
+        Returns
+        -------
+        hand : tuple
+            The sorted hand.
+
+        """
+        return tuple(sorted(hand, key=self.card_order.__getitem__))
+
+    def probe(self, state, hands):
+        """
+        Looks up the win probability of the active player.
+
+        Parameters
+        ----------
+        state : TableState
+            The tables of a game with two players.
+        hands : list
+            The hands of both players (list of card key words per player).
+
+        Returns
+        -------
+        win_probability : float
+            The win probability of the active player, None if the position is
+            not part of the tablebase.
+
+        """
+        if len(state.tables) != 2:
+            return None
+        active = state.active
+        table_active = self.table_index.get(state.tables[active])
+        table_opponent = self.table_index.get(state.tables[1 - active])
+        hand_active = self.hand_index.get(self.get_hand_key(hands[active]))
+        hand_opponent = self.hand_index.get(self.get_hand_key(hands[1 - active]))
+        if None in (table_active, table_opponent, hand_active, hand_opponent):
+            return None
+        index = ((table_active * self.n_tables + table_opponent) * self.n_hands
+                 + hand_active) * self.n_hands + hand_opponent
+        offset = self.header.size + index * self.value.size
+        return self.value.unpack_from(self.map, offset)[0] / self.value_scale
+
+    def probe_game(self, game):
+        """
+        Looks up the win probability of the active player of a running game.
+
+        Parameters
+        ----------
+        game : Game
+            A running game with two players.
+
+        Returns
+        -------
+        win_probability : float
+            The win probability of the active player, None if the position is
+            not part of the tablebase.
+
+        """
+        hands = [[card.get_card_type() for card in player.get_cards_hand()]
+                 for player in game.players]
+        return self.probe(TableState.from_game(game), hands)
+
+    def close(self):
+        """
+        Closes the memory map and the file.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.map.close()
+        self.file.close()
+
+
+class TablebaseGenerator:
+
+    def __init__(self, n_pigs=1, max_clean=None, fallback=0.5):
+        # The positions of a two player endgame are enumerated: both players
+        # have n_pigs pigs, at most max_clean of them clean. If max_clean is
+        # smaller than n_pigs, a move can leave the endgame (e.g. RAIN). Such
+        # positions get the win probability fallback for the player to move.
+        self.n_pigs = n_pigs
+        self.max_clean = n_pigs if max_clean is None else max_clean
+        self.fallback = fallback
+
+        # The draws are modelled as independent draws from the card
+        # distribution of a new deck.
+        card_counts = Deck().get_card_counts()
+        n_cards = sum(card_counts.values())
+        self.draw_probabilities = [card_counts[card_type] / n_cards
+                                   for card_type in Tablebase.card_types]
+
+        self.tables = Tablebase.enumerate_tables(self.n_pigs, self.max_clean)
+        self.hands = Tablebase.enumerate_hands()
+        self.pairs = Tablebase.enumerate_hands(Tablebase.hand_size - 1)
+        self.values = None
+
+    def compile(self):
+        """
+        Builds the index arrays for the value iteration. The options of a
+        position only depend on the tables and the hand of the active player,
+        so they are computed once per (table, table, hand) as templates. A
+        template entry references the expected value of the position after the
+        move:
+        >= 0 : index in the combined R/Q array (see solve)
+        -1   : the active player wins with this move
+        -2   : the move leaves the tablebase
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        templates : list
+            One list of references per (active table, opponent table, hand).
+
+        """
+        n_tables = len(self.tables)
+        n_hands = len(self.hands)
+        n_pairs = len(self.pairs)
+        table_index = {table: i for i, table in enumerate(self.tables)}
+        pair_index = {pair: i for i, pair in enumerate(self.pairs)}
+        card_order = {card_type: i for i, card_type in enumerate(Tablebase.card_types)}
+        n_r = n_tables * n_tables * n_hands * n_pairs
+
+        def remove_card(hand, card_type):
+            pair = list(hand)
+            pair.remove(card_type)
+            return pair_index[tuple(pair)]
+
+        # the hand index after adding a card type to a pair
+        self.pair_plus = list()
+        hand_index = {hand: i for i, hand in enumerate(self.hands)}
+        for pair in self.pairs:
+            self.pair_plus.append([
+                hand_index[tuple(sorted(pair + (card_type,), key=card_order.__getitem__))]
+                for card_type in Tablebase.card_types])
+
+        templates = list()
+        for t_active, table_active in enumerate(self.tables):
+            for t_opponent, table_opponent in enumerate(self.tables):
+                state = TableState([table_active, table_opponent], 0)
+                # R and Q are indexed from the view of the opponent, who moves
+                # next. The opponent hand is added in solve.
+                q_ref = n_r + (t_opponent * n_tables + t_active) * n_hands
+                for hand in self.hands:
+                    refs = list()
+                    for option in state.get_options(hand):
+                        if option[0] == "PLAY":
+                            new_state, destroyed_cards = state.play_card(option[1], option[2])
+                            if new_state.is_winner(0):
+                                refs.append(-1)
+                                continue
+                            new_active = table_index.get(new_state.tables[0])
+                            new_opponent = table_index.get(new_state.tables[1])
+                            if new_active is None or new_opponent is None:
+                                refs.append(-2)
+                                continue
+                            pair = remove_card(hand, option[1])
+                            refs.append(((new_opponent * n_tables + new_active)
+                                         * n_hands * n_pairs) + pair)
+                        elif state.is_winner(0):
+                            refs.append(-1)
+                        elif option[0] == "CHANGE":
+                            pair = remove_card(hand, option[1])
+                            refs.append(((t_opponent * n_tables + t_active)
+                                         * n_hands * n_pairs) + pair)
+                        else:
+                            refs.append(q_ref)
+                    templates.append(refs)
+        return templates
+
+    def solve(self, max_iterations=200, tolerance=1e-5):
+        """
+        Solves the endgame by value iteration. The value of a position is the
+        win probability of the active player if both players play optimally.
+
+        R[to, ta, ho, pair] : expected value of the position (to, ta, ho, hand)
+                              where hand is pair plus one drawn card
+        Q[to, ta, ho]       : expected value of the position (to, ta, ho, hand)
+                              where hand are three drawn cards
+
+        Parameters
+        ----------
+        max_iterations : int
+            Maximum number of iterations.
+        tolerance : float
+            The iteration stops, if no value changes more than tolerance.
+
+        Returns
+        -------
+        iterations : int
+            Number of iterations needed.
+
+        """
+        templates = self.compile()
+        n_tables = len(self.tables)
+        n_hands = len(self.hands)
+        n_pairs = len(self.pairs)
+        probabilities = self.draw_probabilities
+        pair_plus = self.pair_plus
+
+        hand_probabilities = list()
+        for hand in self.hands:
+            probability = factorial(len(hand))
+            for card_type in set(hand):
+                i = Tablebase.card_types.index(card_type)
+                probability *= probabilities[i] ** hand.count(card_type) \
+                    / factorial(hand.count(card_type))
+            hand_probabilities.append(probability)
+
+        n_blocks = n_tables * n_tables * n_hands
+        values = array("d", [0.5]) * (n_blocks * n_hands)
+        fallback = 1 - self.fallback
+
+        iteration = 0
+        for iteration in range(1, max_iterations + 1):
+            expected = array("d", bytes(8 * n_blocks * n_pairs))
+            for block in range(n_blocks):
+                base = block * n_hands
+                for pair in range(n_pairs):
+                    expected[block * n_pairs + pair] = sum(
+                        p * values[base + h] for p, h in zip(probabilities, pair_plus[pair]))
+            for block in range(n_blocks):
+                base = block * n_hands
+                expected.append(sum(
+                    p * values[base + h] for h, p in enumerate(hand_probabilities)))
+
+            delta = 0.0
+            position = 0
+            for refs in templates:
+                for hand_opponent in range(n_hands):
+                    best = 0.0
+                    for ref in refs:
+                        if ref == -1:
+                            best = 1.0
+                            break
+                        elif ref == -2:
+                            value = fallback
+                        elif ref < n_blocks * n_pairs:
+                            value = 1 - expected[ref + hand_opponent * n_pairs]
+                        else:
+                            value = 1 - expected[ref + hand_opponent]
+                        if value > best:
+                            best = value
+                    change = abs(best - values[position])
+                    if change > delta:
+                        delta = change
+                    values[position] = best
+                    position += 1
+            if delta < tolerance:
+                break
+        self.values = values
+        return iteration
+
+    def write(self, path):
+        """
+        Writes the solved values to a tablebase file. The file is written to a
+        temporary file first and renamed afterwards, so readers never see a
+        half written file.
+
+        Parameters
+        ----------
+        path : string
+            Path of the tablebase file.
+
+        Returns
+        -------
+        None.
+
+        """
+        scaled = array("H", (round(value * Tablebase.value_scale) for value in self.values))
+        if scaled.itemsize != 2:
+            raise RuntimeError("unsigned short has to be 2 bytes")
+        if struct.pack("=H", 1) != struct.pack("<H", 1):
+            scaled.byteswap()
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(Tablebase.header.pack(Tablebase.magic, Tablebase.version,
+                                             self.n_pigs, self.max_clean,
+                                             len(self.tables), len(self.hands)))
+            scaled.tofile(file)
+        os.replace(temp_path, path)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    print("\nTest: generate tablebase with 1 pig per player")
+    generator = TablebaseGenerator(n_pigs=1)
+    start = time.perf_counter()
+    iterations = generator.solve(max_iterations=30, tolerance=1e-4)
+    print("Positions:", len(generator.values), "Iterations:", iterations,
+          "Time: %.1f s" % (time.perf_counter() - start))
+
+    path = os.path.join(tempfile.mkdtemp(), "drecksau_1.dstb")
+    generator.write(path)
+    tablebase = Tablebase(path)
+
+    print("\nTest: method probe")
+    state = TableState.initial(2, 1)
+    hands = [("MUD", "RAIN", "STALL"), ("RAIN", "RAIN", "STALL")]
+    print("(Expected value: 1.0). Value:", tablebase.probe(state, hands))
+    hands = [("RAIN", "RAIN", "STALL"), ("MUD", "RAIN", "STALL")]
+    print("(Expected value: 0.0). Value:", tablebase.probe(state, hands))
+    print("(Expected value: None). Value:", tablebase.probe(TableState.initial(2, 2), hands))
+
+    n_probes = 100000
+    start = time.perf_counter()
+    for i in range(n_probes):
+        tablebase.probe(state, hands)
+    print("Probe time: %.2f µs" % ((time.perf_counter() - start) / n_probes * 1e6))
+    tablebase.close()
@@ -0,0 +1,509 @@
+# -*- coding: utf-8 -*-
+
+""" Table state """
+
+__author__     = 'agent'
+__copyright__  = 'Copyright 2022 Storm Hamsters'
+__credits__    = 'Anja Edelmann, Ricky Raths, Lars Schneckenburger, Salah Xaaji'
+__license__    = 'GPL'
+__version__    = '1.0'
+__created__    = '19.10.2026'
+__maintainer__ = 'agent'
+__email__      = 'agent@local'
+__status__     = 'done'
+
+
+from actioncard import ActionCard
+from upgradecard import UpgradeCard
+from pigcard import PigCard
+
+
+class TableState:
+    # Pigs on a table are interchangeable, so a table is fully described by
+    # the number of pigs in each of the 16 combinations of the pig attributes.
+    # The bits follow the order of PigCard.status_bool.
+    DIRTY                   = 1
+    STALL                   = 2
+    DOOR                    = 4
+    LIGHTNING_CONDUCTOR     = 8
+    n_buckets               = 16
+
+    # This dict maps the card types to the tables the card can be played on.
+    # OWN: table of the active player, OPPONENTS: all other tables,
+    # ALL: every table of the game.
+    card_targets = {
+        "MUD"                   : "OWN",
+        "RAIN"                  : "ALL",
+        "LIGHTNING"             : "OPPONENTS",
+        "FARMER_CLEANS"         : "OPPONENTS",
+        "STORM"                 : "ALL",
+        "STALL"                 : "OWN",
+        "LIGHTNING_CONDUCTOR"   : "OWN",
+        "ANNOY_FARMER"          : "OWN",
+    }
+
+    # These cards are activated on all possible pigs at once (see
+    # Game.play_card), all other cards on a single pig.
+    area_card_types = ("RAIN", "STORM")
+
+    # This dict maps the card types to the condition a pig has to fulfill so
+    # that the card can be played on it (see Game.mud, Game.rain, ...).
+    # 1: dirty, 2: stall, 4: door, 8: lightning conductor
+    card_conditions = {
+        "MUD"                   : lambda f: not f & 1,
+        "RAIN"                  : lambda f: f & 1 and not f & 2,
+        "LIGHTNING"             : lambda f: f & 2 and not f & 8,
+        "FARMER_CLEANS"         : lambda f: f & 1 and not f & 4,
+        "STORM"                 : lambda f: f & 2,
+        "STALL"                 : lambda f: not f & 2,
+        "LIGHTNING_CONDUCTOR"   : lambda f: f & 2 and not f & 8,
+        "ANNOY_FARMER"          : lambda f: f & 2 and not f & 4,
+    }
+
+    # filled by build_card_tables: for every card type a tuple with one entry
+    # per bucket.
+    # playable[card_type][flags] : bool
+    # transitions[card_type][flags] : (new flags, destroyed card types)
+    playable = dict()
+    transitions = dict()
+
+    def __init__(self, tables, active=0):
+        # tables contains one histogram per player. A histogram is a tuple
+        # with 16 entries, entry f is the number of pigs with the flags f.
+        self.tables = tuple(tuple(table) for table in tables)
+        self.active = active
+
+    @classmethod
+    def build_card_tables(cls):
+        """
+        Computes for every card type and every bucket if the card can be
+        played on a pig of this bucket and in which bucket the pig ends up.
+        The transitions are computed by activating the real ActionCard and
+        UpgradeCard objects on a PigCard, so the rules only exist once.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        None.
+
+        """
+        for card_type, condition in cls.card_conditions.items():
+            if card_type in ActionCard.action_card_types:
+                card = ActionCard(card_type)
+            else:
+                card = UpgradeCard(card_type)
+            playable = list()
+            transitions = list()
+            for flags in range(cls.n_buckets):
+                playable.append(bool(condition(flags)))
+                pig, destroyed_cards = card.activate_card(cls.flags_to_pig(flags))
+                transitions.append((cls.pig_to_flags(pig),
+                                    tuple(destroyed_cards or ())))
+            cls.playable[card_type] = tuple(playable)
+            cls.transitions[card_type] = tuple(transitions)
+
+    @classmethod
+    def pig_to_flags(cls, pig):
+        """
+        Returns the bucket of a pig card.
+
+        Parameters
+        ----------
+        pig : PigCard
+            An object of the class PigCard is given as input
+
+        Returns
+        -------
+        flags : int
+            The bucket (0-15) of the pig.
+
+        """
+        flags = 0
+        if pig.is_dirty():
+            flags |= cls.DIRTY
+        if pig.has_stall():
+            flags |= cls.STALL
+        if pig.has_door():
+            flags |= cls.DOOR
+        if pig.has_lightning_conductor():
+            flags |= cls.LIGHTNING_CONDUCTOR
+        return flags
+
+    @classmethod
+    def flags_to_pig(cls, flags, n_pig=1):
+        """
+        Creates a pig card with the attributes of a bucket.
+
+        Parameters
+        ----------
+        flags : int
+            The bucket (0-15) of the pig.
+        n_pig : int
+            Number of the pig. If not given, the number is set to 1.
+
+        Returns
+        -------
+        pig : PigCard
+            The newly created pig card.
+
+        """
+        pig = PigCard(n_pig)
+        pig.dirty = bool(flags & cls.DIRTY)
+        pig.stall = bool(flags & cls.STALL)
+        pig.door = bool(flags & cls.DOOR)
+        pig.lightning_conductor = bool(flags & cls.LIGHTNING_CONDUCTOR)
+        return pig
+
+    @classmethod
+    def initial(cls, n_players, n_pigs, active=0):
+        """
+        Returns the state at the start of a game: every player has n_pigs
+        clean pigs without any upgrades.
+
+        Parameters
+        ----------
+        n_players : int
+            Number of players in the game.
+        n_pigs : int
+            Number of pigs of every player (see Game.number_of_pigs).
+        active : int
+            Index of the active player. If not given, it is set to 0.
+
+        Returns
+        -------
+        state : TableState
+            The state at the start of the game.
+
+        """
+        table = [0] * cls.n_buckets
+        table[0] = n_pigs
+        return cls([table] * n_players, active)
+
+    @classmethod
+    def from_players(cls, players, active_player=None):
+        """
+        Creates the histograms of the tables of the given players.
+
+        Parameters
+        ----------
+        players : list
+            List of Player objects.
+        active_player : Player
+            The active player. If not given, the first player is active.
+
+        Returns
+        -------
+        state : TableState
+            The state of the tables.
+
+        """
+        tables = list()
+        for player in players:
+            table = [0] * cls.n_buckets
+            for pig in player.get_cards_table():
+                table[cls.pig_to_flags(pig)] += 1
+            tables.append(table)
+        active = 0
+        if active_player is not None:
+            active = players.index(active_player)
+        return cls(tables, active)
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        Creates the histograms of the tables of a running game.
+
+        Parameters
+        ----------
+        game : Game
+            The game, whose tables are converted.
+
+        Returns
+        -------
+        state : TableState
+            The state of the tables.
+
+        """
+        return cls.from_players(game.players, game.active_player)
+
+    def to_pigs(self, n_player):
+        """
+        Creates pig cards for the table of a player. As pigs are
+        interchangeable, the pigs are numbered by their bucket.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        pigs : list
+            List of PigCard objects.
+
+        """
+        pigs = list()
+        for flags, count in enumerate(self.tables[n_player]):
+            for i in range(count):
+                pigs.append(self.flags_to_pig(flags, len(pigs) + 1))
+        return pigs
+
+    def get_target_players(self, card_type):
+        """
+        Returns the indices of the players, whose tables a card can be played
+        on. The active player comes first, the opponents follow in the order
+        of the game (see Game.get_active_player_pigs and
+        Game.get_opponents_pigs).
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        target_players : list
+            The indices of the players.
+
+        """
+        targets = self.card_targets[card_type]
+        opponents = [i for i in range(len(self.tables)) if i != self.active]
+        if targets == "OWN":
+            return [self.active]
+        elif targets == "OPPONENTS":
+            return opponents
+        return [self.active] + opponents
+
+    def get_possible_moves_for_card(self, card_type):
+        """
+        Returns all the possible moves for a card. A move is a tuple of the
+        target player and the bucket of the target pig. All pigs in one bucket
+        are equal, therefore every bucket is one move.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        possible_moves : list
+            This list contains all the possible moves in form of a tuple. The
+            tuple contains the index of the player and the bucket of the pig.
+
+        """
+        playable = self.playable[card_type]
+        possible_moves = list()
+        for n_player in self.get_target_players(card_type):
+            table = self.tables[n_player]
+            for flags in range(self.n_buckets):
+                if table[flags] and playable[flags]:
+                    possible_moves.append((n_player, flags))
+        return possible_moves
+
+    def can_play_card(self, card_type):
+        """
+        Checks if a card can be played on any pig.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+
+        Returns
+        -------
+        bool
+            Indicates if there is a possible move for the card.
+
+        """
+        playable = self.playable[card_type]
+        for n_player in self.get_target_players(card_type):
+            table = self.tables[n_player]
+            for flags in range(self.n_buckets):
+                if table[flags] and playable[flags]:
+                    return True
+        return False
+
+    def play_card(self, card_type, move=None):
+        """
+        Activates a card and returns the resulting state. RAIN and STORM are
+        activated on all possible pigs, all other cards on one pig of the
+        bucket given in move.
+
+        Parameters
+        ----------
+        card_type : string
+            Key word of the card.
+        move : tuple
+            The index of the target player and the bucket of the target pig.
+            Not needed for RAIN and STORM.
+
+        Returns
+        -------
+        state : TableState
+            The state after the card has been played.
+        destroyed_cards : list
+            The key words of all upgrade cards that got destroyed.
+
+        """
+        transitions = self.transitions[card_type]
+        tables = [list(table) for table in self.tables]
+        destroyed_cards = list()
+        if card_type in self.area_card_types:
+            playable = self.playable[card_type]
+            for n_player in self.get_target_players(card_type):
+                old_table = self.tables[n_player]
+                table = tables[n_player]
+                for flags in range(self.n_buckets):
+                    count = old_table[flags]
+                    if count and playable[flags]:
+                        new_flags, destroyed = transitions[flags]
+                        table[flags] -= count
+                        table[new_flags] += count
+                        destroyed_cards.extend(destroyed * count)
+        else:
+            n_player, flags = move
+            new_flags, destroyed = transitions[flags]
+            tables[n_player][flags] -= 1
+            tables[n_player][new_flags] += 1
+            destroyed_cards.extend(destroyed)
+        return TableState(tables, self.active), destroyed_cards
+
+    def clean_pigs(self, n_player):
+        """
+        Returns the number of clean pigs of a player.
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player.
+
+        Returns
+        -------
+        n_clean : int
+            Number of clean pigs.
+
+        """
+        table = self.tables[n_player]
+        return sum(table[flags] for flags in range(0, self.n_buckets, 2))
+
+    def is_winner(self, n_player=None):
+        """
+        Checks if a player has only dirty pigs (see Game.check_winner).
+
+        Parameters
+        ----------
+        n_player : int
+            Index of the player. If not given, the active player is checked.
+
+        Returns
+        -------
+        bool
+            Indicates if the player has won.
+
+        """
+        if n_player is None:
+            n_player = self.active
+        return self.clean_pigs(n_player) == 0
+
+    def get_options(self, hand):
+        """
+        Returns all the options of the active player for a given hand, like
+        they are offered in Game.run_game. If a card of the hand can be played,
+        the player can play a card or change one card, otherwise he can change
+        one card or all cards. Equal cards in the hand lead to the same
+        options, so every option is only returned once.
+
+        An option is one of the following tuples:
+        ("PLAY", card_type, move) : play a card, move is None for RAIN/STORM
+        ("CHANGE", card_type)     : change one card
+        ("CHANGE_ALL",)           : change all cards
+
+        Parameters
+        ----------
+        hand : tuple
+            The key words of the cards in the hand of the active player.
+
+        Returns
+        -------
+        options : list
+            List of the option tuples.
+
+        """
+        card_types = sorted(set(hand), key=hand.index)
+        options = list()
+        for card_type in card_types:
+            if card_type in self.area_card_types:
+                if self.can_play_card(card_type):
+                    options.append(("PLAY", card_type, None))
+            else:
+                for move in self.get_possible_moves_for_card(card_type):
+                    options.append(("PLAY", card_type, move))
+        can_play = bool(options)
+        for card_type in card_types:
+            options.append(("CHANGE", card_type))
+        if not can_play:
+            options.append(("CHANGE_ALL",))
+        return options
+
+    def next_turn(self):
+        """
+        Returns the same tables with the next player being active.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        state : TableState
+            The state for the next turn.
+
+        """
+        return TableState(self.tables, (self.active + 1) % len(self.tables))
+
+    def __eq__(self, other):
+        return (isinstance(other, TableState) and self.active == other.active
+                and self.tables == other.tables)
+
+    def __hash__(self):
+        return hash((self.tables, self.active))
+
+    def __repr__(self):
+        return "TableState(" + repr(self.tables) + ", " + str(self.active) + ")"
+
+
+TableState.build_card_tables()
+
+
+if __name__ == "__main__":
+    state = TableState.initial(2, 5)
+
+    print("\nTest: method get_possible_moves_for_card")
+    print("(Expected value: [(0, 0)]). Value:", state.get_possible_moves_for_card("MUD"))
+    print("(Expected value: []). Value:", state.get_possible_moves_for_card("RAIN"))
+
+    print("\nTest: method play_card (MUD, STALL)")
+    state, destroyed_cards = state.play_card("MUD", (0, 0))
+    state, destroyed_cards = state.play_card("STALL", (0, 0))
+    state, destroyed_cards = state.play_card("STALL", (0, TableState.DIRTY))
+    print("(Expected value: 4 clean pigs). Value:", state.clean_pigs(0))
+    print("(Expected value: [(0, 2), (0, 3)]). Value:", state.next_turn().get_possible_moves_for_card("LIGHTNING"))
+
+    print("\nTest: method play_card (STORM)")
+    state, destroyed_cards = state.play_card("STORM")
+    print("(Expected value: ['STALL', 'STALL']). Value:", destroyed_cards)
+    print("(Expected value: False). Value:", state.can_play_card("STORM"))
+
+    print("\nTest: method is_winner")
+    for i in range(4):
+        state, destroyed_cards = state.play_card("MUD", (0, 0))
+    print("(Expected value: True). Value:", state.is_winner())
+    print("(Expected value: False). Value:", state.next_turn().is_winner())
+
+    print("\nTest: method to_pigs")
+    for pig in state.to_pigs(0)[:2]:
+        print("Schwein " + str(pig.get_pig_number()) + ": " + ", ".join(pig.get_current_status()))
@@ -15,10 +15,12 @@ __status__     = 'done'
 
 class Validator:
 
-    def __init__(self):
+    def __init__(self, output=print):
         # parameters
         self.min_players = 2
         self.max_players = 4
+        # function that shows the error messages to the player
+        self.output = output
     
     def number_of_players(self, input_player):
         """
@@ -44,7 +46,7 @@ class Validator:
             else:
                 raise
         except:
-            print("Fehler: Anzahl der Spieler ist ungültig! (Mögliche Anzahl: 2-4).")
+            self.output("Fehler: Anzahl der Spieler ist ungültig! (Mögliche Anzahl: 2-4).")
         return validation
 
     def choose_play_or_change_card(self, input_player):
@@ -71,7 +73,7 @@ class Validator:
             else:
                 raise
         except:
-            print("Fehler: Wähle eine Karte wechseln (1) oder alle Karten wechseln (2).")
+            self.output("Fehler: Wähle eine Karte wechseln (1) oder alle Karten wechseln (2).")
         return validation
 
     def move_is_possible(self, possible_moves):
@@ -93,7 +95,7 @@ class Validator:
         if possible_moves:
             validation = True
         else:
-            print("Karte kann nicht platziert werden, da keine passende Karte auf dem Brett liegt.")
+            self.output("Karte kann nicht platziert werden, da keine passende Karte auf dem Brett liegt.")
         return validation
 
     def choose_card(self, input_player):
@@ -119,7 +121,7 @@ class Validator:
             else:
                 raise
         except:
-            print("Fehler: Wähle eine gültige Karte (1-3)")
+            self.output("Fehler: Wähle eine gültige Karte (1-3)")
         return validation
 
     def choose_move(self, input_player, possible_moves):
@@ -148,7 +150,7 @@ class Validator:
             else:
                 raise
         except:
-            print("Fehler: Wähle deinen Zug")
+            self.output("Fehler: Wähle deinen Zug")
         return validation
 
     def choose_to_change_one_or_all_cards(self, input_player):
@@ -175,7 +177,7 @@ class Validator:
             else:
                 raise
         except:
-            print("Fehler: Wähle eine Karte wechseln (1) oder alle Karten wechseln (2)")
+            self.output("Fehler: Wähle eine Karte wechseln (1) oder alle Karten wechseln (2)")
         return validation
 
 